@@ -35,6 +35,50 @@ try:
 except Exception:
     GOLDEN_SENTENCES_100: list[str] = []
 
+# V45.0：MP3 帧级工具箱（时长/拼接/静音补齐不再 fork ffmpeg/ffprobe）
+from bot_logic import mp3_frames
+# V45.1：进程级指标 + 额度感知 TTS 路由（共享熔断器）
+from bot_logic import metrics
+from bot_logic.tts_router import TTS_ROUTER
+# V45.2：edge-tts 主备音色对冲执行（共享延迟直方图 + 每音色熔断）
+from bot_logic.edge_hedge import hedged_edge_tts
+# V45.3：离线本地 TTS 梯队（piper / espeak-ng，静音兜底之前）
+from bot_logic.local_tts import synth_local_mp3
+# V45.5：工厂素材持久化索引（SQLite，增量刷新，替代逐次 rglob）
+from bot_logic import media_index
+# V45.6：共享 ffprobe 元数据缓存（按 路径+大小+mtime 持久化）
+from bot_logic import probe_cache
+# V45.7：素材目录实时监听（inotify / 轮询兜底）→ 按行业内存池
+from bot_logic import fs_watcher
+# V45.8：入库夹层（720p30 闭合 GOP）——渲染优先吃夹层，免 4K 解码与重滤镜
+from bot_logic import mezzanine
+# V45.9：2 秒闭合 GOP 预切片库（concat 直拼，背景轨免重编码）
+from bot_logic import clip_bank
+# V46.0：战备仓零拷贝搬运（硬链接 → reflink → 符号链接 → 复制）
+from bot_logic import staging
+# V46.1：每次渲染独占战备仓工位 + 启动清理崩溃残留
+from bot_logic import workspace
+# V46.2：行业渐变底图一次生成、落盘缓存（替代逐帧 geq）
+from bot_logic import gradient
+# V46.4：背景 jpg 导出缓存（命中硬链接，免 ffmpeg）
+from bot_logic import bg_cache
+# V46.5：中文字体启动解析（WATERMARK_FONT → fontconfig → assets/fonts → Windows）
+from bot_logic import fonts
+# V46.6：FFmpeg 能力矩阵（按构建能力单发最优滤镜图）
+from bot_logic import ffmpeg_caps
+# V46.7：字幕写 ASS，libass 单滤镜烧录
+from bot_logic import ass_subs
+# V46.8：水印预渲染 RGBA 精灵（overlay 合成，免每帧 drawtext）
+from bot_logic import watermark
+# V46.9：ffmpeg 进度感知执行器（停滞击杀 + 时长伸缩时限 + stderr 环形缓冲）
+from bot_logic import ffmpeg_runner
+# V47.1：CPU 感知渲染调度（cgroup 配额 → 每路 -threads 预算，按线程准入）
+from bot_logic import render_scheduler
+# V47.2：动态缝合每条唯一素材只开一个输入（split + trim 取片）
+from bot_logic import dedup_inputs
+# V47.3：长渲染分块并行编码（同参闭合 GOP 分块 + -c copy 拼接）
+from bot_logic import chunked_render
+
 # python-telegram-bot (v20+)：SaaS 监听引擎（可选入口；缺依赖则在 main_saas 中报错）
 try:
     from telegram import Update
@@ -97,6 +141,22 @@ def _start_minimal_health_server() -> None:
         class _H(BaseHTTPRequestHandler):
             def do_GET(self):  # type: ignore
                 try:
+                    # V45.1：/metrics 导出进程内指标（TTS 路由回退比例/节省时间等）
+                    if str(self.path or "").startswith("/metrics"):
+                        body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode("utf-8")
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/json; charset=utf-8")
+                        self.end_headers()
+                        self.wfile.write(body)
+                        return
+                    # V46.9：/jobs 导出渲染任务进度（工序 / 已出片秒数 / 倍速 / 百分比）
+                    if str(self.path or "").startswith("/jobs"):
+                        body = json.dumps(ffmpeg_runner.snapshot(), ensure_ascii=False).encode("utf-8")
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/json; charset=utf-8")
+                        self.end_headers()
+                        self.wfile.write(body)
+                        return
                     self.send_response(200)
                     self.send_header("Content-Type", "text/plain; charset=utf-8")
                     self.end_headers()
@@ -327,10 +387,8 @@ def firecontrol_preflight_or_die() -> Path:
         return root
     
     try:
-        has_mp4 = False
-        for _ in root.rglob("*.mp4"):
-            has_mp4 = True
-            break
+        # V45.5：走素材索引（首次全量建库，之后只 stat 变化目录）
+        has_mp4 = media_index.get_index(root).count(exts={".mp4"}) > 0
         if not has_mp4:
             # V29.0：本地环境仅警告，不停机
             print(f"[警告] 目标分仓 mp4=0，建议上传素材：{root}")
@@ -877,61 +935,118 @@ def strip_function_words_v142(text: str) -> str:
     return t
 
 
-def split_text_for_tts(text: str, max_chars: int = 80) -> list[str]:
-    """超过 max_chars 时按句子/换行切割，降低 ElevenLabs 复读幻觉概率。
-
-    V7.8：每个 chunk 末尾强制追加物理停顿，强化节奏并降低复读幻觉。
-    """
-    if not text:
-        return []
-
-    # V14.2/V15.6：八十字硬锁——TTS 自动截断（硬熔断到 max_chars=80）
-    max_chars = int(max_chars) if int(max_chars) > 0 else 80
-    t = str(text).strip()
-    if len(t) > max_chars:
-        cut = t[:max_chars]
-        m = max(cut.rfind("。"), cut.rfind("！"), cut.rfind("？"), cut.rfind("\n"))
-        if m >= int(max_chars * 0.6):
-            t = cut[: m + 1]
-        else:
-            t = cut
-
-    if len(t) <= max_chars:
-        # 单段也追加停顿
-        pause = "... ... "
-        return [t if t.rstrip().endswith("... ...") else f"{t.rstrip()} {pause}"]
-
-    parts = re.split(r"(?<=[。！？!?])|\n+", t)
-    chunks: list[str] = []
-    buf = ""
-    for p in parts:
-        p = p.strip()
-        if not p:
+# V45.4：TTS 分段规划器（按供应商上限装箱，最少请求数）
+# 单请求字符上限（ElevenLabs 远高于 80 字；预留停顿标记余量）
+ELEVEN_TTS_MAX_CHARS = int((os.getenv("ELEVEN_TTS_MAX_CHARS") or "").strip() or 2500)
+# V14.2/V15.6 八十字硬锁保留为脚本总量上限（0 = 关闭）
+TTS_SCRIPT_MAX_CHARS = int((os.getenv("TTS_SCRIPT_MAX_CHARS") or "").strip() or 80)
+# 支持 previous_text / next_text 拼接上下文的模型（eleven_v3 不支持）
+ELEVEN_CONTEXT_MODELS = {"eleven_multilingual_v2", "eleven_turbo_v2_5", "eleven_flash_v2_5"}
+# 默认 eleven_v3（最高宪法）；切到上面任一模型即自动带跨段上下文
+ELEVEN_TTS_MODEL_ID = (os.getenv("ELEVEN_TTS_MODEL_ID") or "").strip() or "eleven_v3"
+
+_TTS_PAUSE = "... ... "
+# 旧版八十字硬锁：先截断到 80 字再整段合成，故恒为 1 发
+_LEGACY_TTS_MAX_CHARS = 80
+
+
+def _truncate_tts_script(t: str, cap: int) -> str:
+    """八十字硬锁的截断规则：超过 cap 时优先停在句末（句末位置不足 60% 则硬切）。"""
+    if cap <= 0 or len(t) <= cap:
+        return t
+    cut = t[:cap]
+    m = max(cut.rfind("。"), cut.rfind("！"), cut.rfind("？"), cut.rfind("\n"))
+    return cut[: m + 1] if m >= int(cap * 0.6) else cut
+
+
+def _tts_sentence_units(text: str, max_chars: int) -> list[str]:
+    """切成句子单元：句末标点 / 停顿标记 / 换行；超长单句再按逗号、最后按字数硬切。"""
+    raw = re.split(r"(?<=[。！？!?])|(?<=\.\.\. \.\.\.)|\n+", text)
+    units: list[str] = []
+    for r in raw:
+        r = (r or "").strip()
+        if not r:
             continue
-        if not buf:
-            buf = p
+        if len(r) <= max_chars:
+            units.append(r)
             continue
-        if len(buf) + len(p) <= max_chars:
-            buf = f"{buf}{p}"
-        else:
+        buf = ""
+        for piece in re.split(r"(?<=[，,；;、])", r):
+            if len(buf) + len(piece) <= max_chars:
+                buf += piece
+                continue
+            if buf:
+                units.append(buf)
+            while len(piece) > max_chars:
+                units.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            buf = piece
+        if buf.strip():
+            units.append(buf.strip())
+    return units
+
+
+def _pack_tts_units(units: list[str], max_chars: int) -> list[str]:
+    """贪心装箱：相邻句子在不超上限时合并（中文无需空格拼接）。"""
+    chunks: list[str] = []
+    buf = ""
+    for u in units:
+        # 停顿标记后补回空格，保持 "... ... " 原样
+        sep = " " if buf.endswith("...") else ""
+        if buf and len(buf) + len(sep) + len(u) > max_chars:
             chunks.append(buf)
-            buf = p
+            buf = u
+        else:
+            buf = f"{buf}{sep}{u}"
     if buf:
         chunks.append(buf)
+    return chunks
 
-    # 末尾强制停顿（避免 ElevenLabs 长段落复读）
-    pause = "... ... "
-    paused_chunks: list[str] = []
+
+def plan_tts_chunks(
+    text: str,
+    *,
+    max_chars: int | None = None,
+    script_max_chars: int | None = None,
+    model_id: str = ELEVEN_TTS_MODEL_ID,
+) -> tuple[list[dict], int]:
+    """
+    V45.4：最少请求数分段规划。
+    返回 (请求列表, 旧版 80 字硬锁实际发出的请求数)；每个请求为
+    {"text": 带停顿标记的分段, "previous_text": ..., "next_text": ...}（上下文仅限支持的模型）。
+    """
+    t = str(text or "").strip()
+    if not t:
+        return [], 0
+    limit = int(max_chars or ELEVEN_TTS_MAX_CHARS)
+    cap = TTS_SCRIPT_MAX_CHARS if script_max_chars is None else int(script_max_chars)
+    # 旧版按原文先截断到 80 字再整段 1 发（与脚本总量上限无关）
+    legacy_requests = 1 if _truncate_tts_script(t, _LEGACY_TTS_MAX_CHARS) else 0
+    t = _truncate_tts_script(t, cap)
+
+    # 每段末尾追加停顿标记，装箱时先扣掉标记长度
+    body_limit = max(20, limit - len(_TTS_PAUSE) - 1)
+    units = _tts_sentence_units(t, body_limit)
+    chunks = _pack_tts_units(units, body_limit)
+
+    texts: list[str] = []
     for c in chunks:
         c2 = c.strip()
         if not c2:
             continue
-        if not c2.endswith("... ..."):
-            # 控制长度，避免追加后超过太多
-            c2 = (c2[: max(0, max_chars - len(pause) - 1)]).rstrip()
-            c2 = f"{c2} {pause}"
-        paused_chunks.append(c2)
-    return paused_chunks
+        texts.append(c2 if c2.endswith("... ...") else f"{c2} {_TTS_PAUSE}")
+
+    with_context = model_id in ELEVEN_CONTEXT_MODELS
+    plan: list[dict] = []
+    for i, c in enumerate(texts):
+        req: dict = {"text": c}
+        if with_context:
+            if i > 0:
+                req["previous_text"] = texts[i - 1]
+            if i + 1 < len(texts):
+                req["next_text"] = texts[i + 1]
+        plan.append(req)
+    return plan, legacy_requests
 
 
 def inject_logical_pauses(text: str) -> str:
@@ -1004,10 +1119,14 @@ def v10_wrap_short_lines(text: str, *, max_len: int = 12, protect_terms: list[st
 
 
 def concat_mp3_ffmpeg(segment_paths: list[Path], output_path: Path) -> None:
-    """用 FFmpeg 合并 MP3 片段（优先 copy，失败则重编码）。"""
+    """合并 MP3 片段：V45.0 优先纯 Python 帧级拼接；格式不一致再走 FFmpeg（copy → 重编码）。"""
     if not segment_paths:
         raise ValueError("没有可合并的音频片段")
 
+    # V45.0：同格式片段直接帧级拼接（零子进程）
+    if mp3_frames.concat_mp3_frames(segment_paths, output_path):
+        return
+
     list_file = output_path.with_suffix(".tmp")
     try:
         with open(list_file, "w", encoding="utf-8") as f:
@@ -1064,6 +1183,9 @@ def ensure_mp3_44100(audio_path: Path) -> None:
     try:
         if not audio_path or not audio_path.exists():
             return
+        # V45.0：帧头已是 44.1kHz 立体声则跳过重编码（省一次 ffmpeg fork）
+        if not mp3_frames.needs_resample(audio_path, sample_rate=44100, channels=2):
+            return
         tmp = audio_path.with_suffix(".44100.tmp.mp3")
         cmd = [
             "ffmpeg",
@@ -1088,9 +1210,12 @@ def ensure_mp3_44100(audio_path: Path) -> None:
 
 
 def _generate_silent_mp3_ffmpeg(mp3_path: Path, *, seconds: float = 6.0) -> None:
-    """极简兜底：用 FFmpeg 生成静音 mp3（无额外 Python 依赖）。"""
+    """极简兜底：生成静音 mp3（V45.0 优先预编码静音帧直写，失败再用 FFmpeg）。"""
     mp3_path.parent.mkdir(parents=True, exist_ok=True)
     sec = max(1.0, float(seconds))
+    # V45.0：静音帧直写即为 44.1kHz 立体声 128k，无需 ensure_mp3_44100 二次重编码
+    if mp3_frames.write_silent_mp3(mp3_path, seconds=sec):
+        return
     cmd = [
         "ffmpeg",
         "-y",
@@ -1117,6 +1242,7 @@ def _generate_silent_mp3_ffmpeg(mp3_path: Path, *, seconds: float = 6.0) -> None
 async def tts_fallback_to_mp3(text: str, mp3_path: Path, *, industry: str = "") -> None:
     """
     V13.9：副火控音频（edge-tts 优先，静音 mp3 兜底）。
+    V45.3：edge-tts 与静音之间插入离线本地 TTS（断网仍有人声）。
     静默产出 mp3，供后续视频缝合使用。
     """
     t = (text or "").strip()
@@ -1125,22 +1251,34 @@ async def tts_fallback_to_mp3(text: str, mp3_path: Path, *, industry: str = "")
 
     # 1) edge-tts（在线、质量更稳）
     try:
-        import edge_tts  # type: ignore
-
         voice = (os.getenv("EDGE_TTS_VOICE") or "").strip() or "zh-CN-YunxiNeural"
         rate = "+18%"
         volume = (os.getenv("EDGE_TTS_VOLUME") or "").strip() or "+0%"
-        comm = edge_tts.Communicate(text=t, voice=voice, rate=rate, volume=volume)
-        mp3_path.parent.mkdir(parents=True, exist_ok=True)
         # V44.4：15 秒硬超时，防止微软服务卡死阻塞全线
-        await asyncio.wait_for(comm.save(str(mp3_path)), timeout=15.0)
+        # V45.2：主音色超 p90 未返回即对冲备音色，总上限仍为 15 秒
+        won = await hedged_edge_tts(
+            t,
+            mp3_path,
+            voices=[voice, "zh-CN-XiaoxiaoNeural"],
+            rate=rate,
+            volume=volume,
+            deadline_s=15.0,
+        )
         ensure_mp3_44100(mp3_path)
-        print(f"   [音频] 已降级为 edge-tts: {mp3_path.name}")
+        print(f"   [音频] 已降级为 edge-tts({won}): {mp3_path.name}")
         return
     except Exception:
         pass
 
-    # 2) 生存兜底：静音 mp3（避免因为 TTS 失败导致整条链路炸膛）
+    # 2) 离线本地 TTS（零网络，延迟只受本机 CPU 约束）
+    try:
+        engine = await synth_local_mp3(t, mp3_path)
+        print(f"   [音频] 已降级为本地 TTS({engine}): {mp3_path.name}")
+        return
+    except Exception as e:
+        print(f"   [音频] 本地 TTS 不可用，转静音兜底: {str(e)[:120]}")
+
+    # 3) 生存兜底：静音 mp3（避免因为 TTS 失败导致整条链路炸膛）
     try:
         # 粗略估算口播时长：每秒约 4 字，上限 12 秒
         est = min(12.0, max(4.0, len(t) / 4.0))
@@ -1148,29 +1286,19 @@ async def tts_fallback_to_mp3(text: str, mp3_path: Path, *, industry: str = "")
         print(f"   [音频] 已降级为静音 mp3: {mp3_path.name}")
         return
     except Exception:
-        raise RuntimeError("fallback tts failed (edge-tts + silent mp3)")
+        raise RuntimeError("fallback tts failed (edge-tts + local tts + silent mp3)")
 
 
 async def tts_edge_force_mp3(text: str, mp3_path: Path, *, voices: list[str]) -> None:
-    """V14.2：强制 edge-tts（指定音色列表依次尝试）。"""
+    """V14.2：强制 edge-tts（指定音色列表）。V45.2：改为主备对冲，先成功者胜出。"""
     t = (text or "").strip()
     if not t:
         raise RuntimeError("edge tts text empty")
-    import edge_tts  # type: ignore
 
     mp3_path.parent.mkdir(parents=True, exist_ok=True)
-    last: Exception | None = None
-    for v in voices:
-        try:
-            comm = edge_tts.Communicate(text=t, voice=v)
-            # V44.4：15 秒硬超时，防止微软服务卡死阻塞全线
-            await asyncio.wait_for(comm.save(str(mp3_path)), timeout=15.0)
-            ensure_mp3_44100(mp3_path)
-            return
-        except Exception as e:
-            last = e
-            continue
-    raise RuntimeError(f"edge-tts failed: {last}")
+    # V44.4：15 秒硬超时（V45.2：全部音色合计 15 秒，而非每音色 15 秒串行）
+    await hedged_edge_tts(t, mp3_path, voices=list(voices), deadline_s=15.0)
+    ensure_mp3_44100(mp3_path)
 
 # === 行业痛点场景库（八大主权战区） ===
 INDUSTRY_PAIN_SCENES = {
@@ -1311,20 +1439,32 @@ class VisualEngine:
         self._factory_files: list[Path] = []
         self._factory_indexed = False
         self._factory_cache: dict[str, list[Path]] = {}
+        # V45.7：内存池版本号（监听线程每次增删 +1，版本变化才重建本地列表）
+        self._asset_pools_version = -1
+        self._factory_pools_version = -1
+
+    def _live_pools(self, root: Path) -> "fs_watcher.MediaPools | None":
+        """V45.7：取根目录的实时内存池（后台监听保鲜）；失败返回 None。"""
+        try:
+            if not root.exists() or not root.is_dir():
+                return None
+            return fs_watcher.live_pools(root)
+        except Exception:
+            return None
 
     def _ensure_index(self) -> None:
-        """构建本地素材索引，避免 FileNotFoundError；无素材则保持空索引。"""
-        if self._indexed:
+        """构建本地素材索引，避免 FileNotFoundError；无素材则保持空索引。
+        V45.7：由实时内存池派生，素材增删后自动重建（不再一次性冻结）。"""
+        pools = self._live_pools(self.visuals_dir)
+        if pools is None:
+            self._indexed = True
+            return
+        if self._indexed and pools.version == self._asset_pools_version:
             return
         self._indexed = True
+        self._asset_pools_version = pools.version
         try:
-            if not self.visuals_dir.exists():
-                return
-            exts = {".jpg", ".jpeg", ".png", ".webp"}
-            for p in self.visuals_dir.rglob("*"):
-                if p.is_file() and p.suffix.lower() in exts:
-                    folder = p.parent.name
-                    self._asset_index.append((folder, p))
+            self._asset_index = [(p.parent.name, p) for p in pools.files(exts=media_index.IMAGE_EXTS)]
         except Exception:
             # 索引失败也不阻塞生产线
             self._asset_index = []
@@ -1341,22 +1481,20 @@ class VisualEngine:
         return []
 
     def _ensure_factory_index(self) -> None:
-        """构建 Jiumo_Auto_Factory 索引：收集图片/视频文件，不阻塞生产线。"""
-        if self._factory_indexed:
+        """构建 Jiumo_Auto_Factory 索引：收集图片/视频文件，不阻塞生产线。
+        V45.7：由实时内存池派生，池版本变化即重建（行业匹配缓存同步失效）。"""
+        roots = self._resolve_factory_dirs()
+        pools = self._live_pools(roots[0]) if roots else None
+        version = pools.version if pools is not None else -1
+        if self._factory_indexed and version == self._factory_pools_version:
             return
         self._factory_indexed = True
+        self._factory_pools_version = version
         self._factory_files = []
         self._factory_cache = {}
-        exts = {".jpg", ".jpeg", ".png", ".webp", ".mp4", ".mov", ".m4v", ".webm"}
         try:
-            roots = self._resolve_factory_dirs()
-            for root in roots:
-                for p in root.rglob("*"):
-                    try:
-                        if p.is_file() and p.suffix.lower() in exts:
-                            self._factory_files.append(p)
-                    except Exception:
-                        continue
+            if pools is not None:
+                self._factory_files = pools.files(exts=media_index.MEDIA_EXTS)
         except Exception:
             # 索引失败也不阻塞生产线
             self._factory_files = []
@@ -1366,6 +1504,8 @@ class VisualEngine:
         """
         V7.9：实时物理索引（严禁缓存）。
         强制深入 Jiumo_Auto_Factory/{industry}/ 子目录，随机抓取一张图片。
+        V45.5：改查 SQLite 素材索引——每次查询前增量刷新（只 stat 变化目录），新素材落盘即可命中。
+        V45.7：改取实时内存池（监听线程推送增删），零扫描。
         """
         ind = (industry or "").strip()
         if not ind:
@@ -1395,17 +1535,10 @@ class VisualEngine:
         candidates_video: list[Path] = []
         candidates_image: list[Path] = []
         try:
-            for p in ind_dir.rglob("*"):
-                try:
-                    if not p.is_file():
-                        continue
-                    suf = p.suffix.lower()
-                    if suf in exts_video:
-                        candidates_video.append(p)
-                    elif suf in exts_image:
-                        candidates_image.append(p)
-                except Exception:
-                    continue
+            pools = fs_watcher.live_pools(root)
+            ind_rel = self.INDUSTRY_MAP.get(ind, ind)
+            candidates_video = pools.files(under=ind_rel, exts=exts_video)
+            candidates_image = pools.files(under=ind_rel, exts=exts_image)
         except Exception:
             return None
 
@@ -1416,13 +1549,7 @@ class VisualEngine:
 
         # V13.9：视觉强制匹配——行业目录为空时，仍尝试在工厂根目录搜任意视频
         try:
-            any_videos: list[Path] = []
-            for p in root.rglob("*"):
-                try:
-                    if p.is_file() and p.suffix.lower() in exts_video:
-                        any_videos.append(p)
-                except Exception:
-                    continue
+            any_videos = fs_watcher.live_pools(root).files(exts=exts_video)
             if any_videos:
                 return random.choice(any_videos)
         except Exception:
@@ -1592,7 +1719,8 @@ class VisualEngine:
                 root0 = roots[0] if roots else None
                 sm_dir = (root0 / "自媒体") if root0 else None
                 if sm_dir and sm_dir.exists() and sm_dir.is_dir():
-                    vids = [p for p in sm_dir.rglob("*") if p.is_file() and p.suffix.lower() in {".mp4", ".mov", ".m4v", ".webm"}]
+                    # V45.5：素材索引查询（替代 rglob 全量扫描）；V45.7：实时内存池
+                    vids = fs_watcher.live_pools(root0).files(under="自媒体", exts=media_index.VIDEO_EXTS)
                     if not vids:
                         print(f"[视觉][V15.1] 自媒体视频池为空：{sm_dir.resolve()}")
                         # V38.0：云端空仓生存协议——不抛错、不停机，允许 gradient 兜底
@@ -1784,16 +1912,60 @@ def _v11_ghostify_vf(vf: str) -> str:
     return ",".join([x for x in chain if x]).strip(",")
 
 
+def _still_fps() -> int:
+    """
+    V46.3：静态底图渲染帧率（JUNSHI_STILL_FPS，默认 10；0 = 关闭静帧模式，沿用 30fps 常规编码）。
+    画面只有水印 1Hz 脉动与字幕切换，10fps 足够平滑，字幕切换误差 ≤ 0.1 秒。
+    """
+    try:
+        n = int((os.getenv("JUNSHI_STILL_FPS") or "").strip() or 10)
+    except Exception:
+        n = 10
+    return max(0, min(30, n))
+
+
+# 工业去重滤镜链（按统帅指令）：逐段滤镜缝合 / concat 降级 / 分块编码共用
+DYN_SEG_FILTER = (
+    "hflip,"
+    "scale=trunc(1.2*iw/2)*2:trunc(1.2*ih/2)*2,"
+    "crop=1280:720:(iw-1280)/2:(ih-720)/2,"
+    "eq=contrast=1.3:saturation=0.5:brightness=-0.05,"
+    # V13.8：强制对齐像素宽高比，防止分辨率不一导致 concat 炸膛
+    "setsar=1,fps=30,format=yuv420p"
+)
+
+
 def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
-    """FFmpeg 暴力缝合 + 质量压制 + V7.0 语义视觉对齐（安全抽象背景优先）"""
+    """FFmpeg 暴力缝合 + 质量压制 + V7.0 语义视觉对齐（安全抽象背景优先）
+    V46.0：外层统计本次渲染的战备仓搬运字节数与耗时。
+    V46.1：每次渲染独占工位（战备仓下 job-*），并发渲染互不覆盖/误删输入。
+    V46.9：ffmpeg 进度按成品文件名挂到任务状态（/jobs）。
+    V47.0：同步入口（CLI / 压测线程用），内部跑 video_stitcher_async。"""
+    return asyncio.run(video_stitcher_async(audio_path, output_path, visual_profile))
+
+
+async def video_stitcher_async(audio_path, output_path, visual_profile: dict | None = None, *, on_progress=None):
+    """
+    V47.0：asyncio 原生缝合——ffmpeg 走 create_subprocess_exec，渲染全程不占执行器线程；
+    调用方任务被取消时 ffmpeg 子进程 SIGTERM → SIGKILL，工位照常回收。
+    on_progress：进度事件回调（dict：stage / out_time_s / speed / percent / done），可为协程函数。
+    """
+    job_tag = Path(str(output_path)).name
+    with staging.track_staging() as stage_stats, workspace.render_workspace(tag=job_tag) as staging_dir, ffmpeg_runner.job(job_tag, on_progress=on_progress):
+        try:
+            return await _video_stitcher_impl(audio_path, output_path, visual_profile, staging_dir=staging_dir)
+        finally:
+            if stage_stats.files:
+                print(f"[战备仓] {stage_stats.summary()}")
+
+
+async def _video_stitcher_impl(audio_path, output_path, visual_profile: dict | None = None, *, staging_dir: Path):
+    """video_stitcher 主体（在独占工位 staging_dir 内执行）。
+    V47.0：ffmpeg 编码全部 await；探测 / 选片 / 精灵等短任务丢给 to_thread，不阻塞事件循环。"""
     visual_profile = visual_profile or {}
 
     # V22.5：云端战备仓自动创建（Linux 环境 /tmp，Windows C:/）
-    is_cloud = os.path.exists("/tmp")  # Linux/云端环境检测
-    if is_cloud:
-        staging_dir = Path("/tmp/Junshi_Staging")
-    else:
-        staging_dir = Path("C:/Junshi_Staging")
+    # V46.1：根目录由 workspace.staging_root() 决定，这里只拿到本次渲染的独占工位
     staging_dir.mkdir(parents=True, exist_ok=True)
     # V32.0：FFmpeg 算力全开（云端 ultrafast）
     preset = "ultrafast" if IS_CLOUD_ENV else "veryfast"
@@ -1802,7 +1974,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
     def _p(x: str | Path) -> str:
         """
         物理路径归一化（战备仓专用）：
-        所有文件已搬运至战备仓（Linux: /tmp/Junshi_Staging, Windows: C:/Junshi_Staging）
+        所有文件已搬运至战备仓工位（Linux: /tmp/Junshi_Staging/job-*, Windows: C:/Junshi_Staging/job-*）
         路径纯英文，无需复杂转义
         """
         try:
@@ -1810,10 +1982,10 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         except Exception:
             return str(x).replace("\\", "/")
 
-    # V17.0：音频搬运至战备仓
+    # V17.0：音频搬运至战备仓（V46.0：优先链接，免整文件复制；V47.0：跨盘回退整文件复制时不占事件循环）
     staging_audio = staging_dir / "a.mp3"
     try:
-        shutil.copy2(audio_path, staging_audio)
+        await asyncio.to_thread(staging.stage_file, audio_path, staging_audio)
         audio_path = _p(staging_audio)
     except Exception as e:
         print(f"[警告] 音频搬运失败，使用原路径: {e}")
@@ -1842,24 +2014,11 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         visual_profile["watermark_text"] = watermark_text
     except Exception:
         pass
-    font_candidates = []
-    env_font = os.getenv("WATERMARK_FONT")
-    if env_font:
-        font_candidates.append(env_font)
-    # Windows 常见中文字体
-    font_candidates.extend([
-        "C:/Windows/Fonts/msyh.ttc",
-        "C:/Windows/Fonts/simhei.ttf",
-        "C:/Windows/Fonts/simsun.ttc",
-    ])
-    fontfile = None
-    for fp in font_candidates:
-        try:
-            if fp and os.path.exists(fp):
-                fontfile = fp
-                break
-        except Exception:
-            continue
+    # V46.5：字体启动时解析一次（含 Linux fontconfig），首个 drawtext 方案即可命中
+    # V47.0：首次解析 / 探测会起 fc-match、ffmpeg 子进程，放到线程里
+    fontfile = await asyncio.to_thread(fonts.resolve_cjk_font)
+    # V46.6：能力矩阵决定滤镜图（无 drawtext 不出字版；无 fribidi/harfbuzz 不开 text_shaping）
+    caps = await asyncio.to_thread(ffmpeg_caps.get_caps)
 
     # 构建 drawtext（字体缺失则降级重试，但不准停止生产）
     # 说明：drawtext 对冒号敏感；fontfile 盘符 ":" 必须转义；text 单引号做转义
@@ -1871,8 +2030,37 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
     box = "1"
     boxcolor = "black@0.30"
 
+    # V46.8：水印精灵（按行业 + 字体缓存）；每次渲染搬进工位一次
+    wm_sprite_memo: dict[str, str] = {}
+
+    def _wm_sprite_fragment(kind: str) -> str:
+        """kind="pulse"：呼吸透明度循环片（静态底图）；kind="still"：alpha=0.75 静态 PNG。失败返回 ""。"""
+        if kind in wm_sprite_memo:
+            return wm_sprite_memo[kind]
+        frag = ""
+        try:
+            if caps.drawtext and fontfile:
+                if kind == "pulse":
+                    loop_fps = _still_fps() or 30
+                    sprite = watermark.pulse_sprite(watermark_text, fontfile, fps=loop_fps, fontsize=int(fontsize), alpha_expr=alpha_expr, boxcolor=boxcolor)
+                else:
+                    loop_fps = None
+                    sprite = watermark.still_sprite(watermark_text, fontfile, fontsize=int(fontsize), alpha=0.75, boxcolor=boxcolor)
+                if sprite is not None:
+                    staged_wm = staging_dir / f"wm_{kind}{sprite.suffix}"
+                    staging.stage_file(sprite, staged_wm)
+                    frag = watermark.overlay_fragment(Path(_p(staged_wm)), loop_fps=loop_fps)
+        except Exception as e:
+            print(f"[水印] 精灵不可用，回退 drawtext: {e}")
+            frag = ""
+        wm_sprite_memo[kind] = frag
+        return frag
+
     vf_candidates: list[str] = []
-    if fontfile:
+    wm_pulse_frag = await asyncio.to_thread(_wm_sprite_fragment, "pulse")
+    if wm_pulse_frag:
+        vf_candidates.append(f"{vf},{wm_pulse_frag}")
+    if fontfile and caps.drawtext:
         # V17.1：字体文件路径简化（无需复杂转义）
         ff_fontfile = _p(fontfile).replace(":", "\\:")
         drawtext = (
@@ -1881,7 +2069,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             f"fontcolor=white:alpha='{alpha_expr}':box={box}:boxcolor={boxcolor}:boxborderw=12"
         )
         vf_candidates.append(f"{vf},{drawtext}")
-    else:
+    elif caps.font_by_name:
         # 尝试用字体名（某些 FFmpeg/系统可用），失败则会自动降级到无水印版本
         drawtext = (
             f"drawtext=font='Microsoft YaHei':text='{safe_text}':"
@@ -1896,7 +2084,11 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
     vf_candidates.append("scale=1280:720")
 
     def _probe_duration_seconds(p: str) -> float | None:
-        """用 ffprobe 取音频时长，失败则返回 None。"""
+        """取音频时长：V45.0 mp3 优先帧头计时，其余/失败再用 ffprobe；都失败返回 None。"""
+        if str(p).lower().endswith(".mp3"):
+            d_frames = mp3_frames.mp3_duration_seconds(p)
+            if d_frames:
+                return max(0.1, d_frames)
         try:
             r = subprocess.run(
                 ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", p],
@@ -1914,7 +2106,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         except Exception:
             return None
 
-    dur = _probe_duration_seconds(audio_path)
+    dur = await asyncio.to_thread(_probe_duration_seconds, audio_path)
     if not dur:
         dur = 10.0
 
@@ -1940,36 +2132,6 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         except Exception:
             return JIUMO_FACTORY_DIR_FALLBACK.resolve()
 
-    def _probe_video_wh(p: Path) -> tuple[int, int]:
-        try:
-            r = subprocess.run(
-                [
-                    "ffprobe",
-                    "-v",
-                    "error",
-                    "-select_streams",
-                    "v:0",
-                    "-show_entries",
-                    "stream=width,height",
-                    "-of",
-                    "csv=p=0:s=x",
-                    str(p),
-                ],
-                capture_output=True,
-                timeout=10,
-                encoding="utf-8",
-                errors="ignore",
-            )
-            if r.returncode != 0:
-                return (0, 0)
-            s = (r.stdout or "").strip()
-            if "x" not in s:
-                return (0, 0)
-            w, h = s.split("x", 1)
-            return (int(w), int(h))
-        except Exception:
-            return (0, 0)
-
     def _pick_video_pool_for_industry(industry_name: str | None) -> list[Path]:
         # V15.0：视频缝合优先级（总装点火）
         # 只要音频已落地，优先扫描工厂根目录下的“自媒体/”视频池（统帅阵地：G:\...\自媒体）
@@ -1978,13 +2140,8 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                 root = _resolve_factory_root()
                 selfmedia_dir = root / "自媒体"
                 if selfmedia_dir.exists() and selfmedia_dir.is_dir():
-                    pool_sm: list[Path] = []
-                    for p in selfmedia_dir.rglob("*"):
-                        try:
-                            if p.is_file() and p.suffix.lower() in video_exts:
-                                pool_sm.append(p)
-                        except Exception:
-                            continue
+                    # V45.5：素材索引查询（替代 rglob 全量扫描）；V45.7：实时内存池
+                    pool_sm = fs_watcher.live_pools(root).files(under="自媒体", exts=video_exts)
                     if pool_sm:
                         return pool_sm
         except Exception:
@@ -2002,13 +2159,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             if forced_subdir:
                 ind_dir = (root / forced_subdir)
                 if ind_dir.exists() and ind_dir.is_dir():
-                    pool: list[Path] = []
-                    for p in ind_dir.rglob("*"):
-                        try:
-                            if p.is_file() and p.suffix.lower() in video_exts:
-                                pool.append(p)
-                        except Exception:
-                            continue
+                    pool = fs_watcher.live_pools(root).files(under=forced_subdir, exts=video_exts)
                     if pool:
                         return pool
             if industry_name:
@@ -2019,13 +2170,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                     mapped = None
                 ind_dir = (root / (mapped or industry_name))
                 if ind_dir.exists() and ind_dir.is_dir():
-                    pool: list[Path] = []
-                    for p in ind_dir.rglob("*"):
-                        try:
-                            if p.is_file() and p.suffix.lower() in video_exts:
-                                pool.append(p)
-                        except Exception:
-                            continue
+                    pool = fs_watcher.live_pools(root).files(under=str(mapped or industry_name), exts=video_exts)
                     if pool:
                         return pool
         except Exception:
@@ -2033,18 +2178,13 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         # V14.4：素材库增强——子目录为空时，自动在工厂根目录搜任意 4K 视频作为替补素材
         try:
             root = _resolve_factory_root()
-            pool_all: list[Path] = []
+            idx = media_index.get_index(root)
+            pool_all: list[Path] = fs_watcher.live_pools(root).files(exts=video_exts)
             pool_4k: list[Path] = []
-            for p in root.rglob("*"):
-                try:
-                    if not (p.is_file() and p.suffix.lower() in video_exts):
-                        continue
-                    pool_all.append(p)
-                except Exception:
-                    continue
             # 过滤 4K（支持 portrait 2160x3840）
-            for p in pool_all[:200]:
-                w, h = _probe_video_wh(p)
+            # V45.5：宽高已入索引则零探测；未探测的补一次 ffprobe 并回写
+            for p, info in idx.probe_missing(pool_all[:200]).items():
+                w, h = int(info.get("width") or 0), int(info.get("height") or 0)
                 if (max(w, h) >= 3840) and (min(w, h) >= 2160):
                     pool_4k.append(p)
             if len(pool_4k) >= 4:
@@ -2063,27 +2203,9 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         return []
 
     def _probe_video_duration_seconds(p: Path) -> float:
+        # V45.6：命中探测缓存零 fork；失败返回 0.0
         try:
-            r = subprocess.run(
-                [
-                    "ffprobe",
-                    "-v",
-                    "error",
-                    "-show_entries",
-                    "format=duration",
-                    "-of",
-                    "default=noprint_wrappers=1:nokey=1",
-                    str(p),
-                ],
-                capture_output=True,
-                timeout=10,
-                encoding="utf-8",
-                errors="ignore",
-            )
-            if r.returncode != 0:
-                return 0.0
-            s = (r.stdout or "").strip()
-            return max(0.0, float(s)) if s else 0.0
+            return probe_cache.probe_duration(p)
         except Exception:
             return 0.0
 
@@ -2117,6 +2239,29 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             return s2
         return s2[:width] + "\n" + s2[width : width * 2]
 
+    def _log_attempts(stage: str, n: int) -> None:
+        """V46.6：记录成功渲染所用的 ffmpeg 尝试次数（>1 即有白跑）。"""
+        print(f"[火控] {stage} 第 {n} 次尝试成功" + (f"（白跑 {n - 1} 次）" if n > 1 else ""))
+        metrics.incr("render.attempts", n)
+        metrics.incr("render.attempts_wasted", n - 1)
+
+    def _subtitle_cues(total_dur: float, subtitle_text: str) -> list[tuple[float, float, str]]:
+        """字幕时间轴：均分时长，每条最多 2 行（drawtext / ASS 共用）。"""
+        units = _split_subtitle_units(subtitle_text)
+        if not units:
+            return []
+        # 取前 12 条，避免滤镜链过长炸膛
+        units = units[:12]
+        n = len(units)
+        step = max(0.2, float(total_dur) / n)
+        cues: list[tuple[float, float, str]] = []
+        for i, u in enumerate(units):
+            start = i * step
+            end = min(float(total_dur), (i + 1) * step)
+            # V13.8：字幕遮挡控制——最多 2 行
+            cues.append((start, end, _wrap_two_lines(u, width=18)))
+        return cues
+
     def _build_subtitle_drawtexts(
         total_dur: float,
         subtitle_text: str,
@@ -2127,20 +2272,8 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         fontsize: int = 44,
         y_expr: str = "h-(text_h)-70",
     ) -> str:
-        units = _split_subtitle_units(subtitle_text)
-        if not units:
-            return ""
-        # 取前 12 条，避免滤镜链过长炸膛
-        units = units[:12]
-        n = len(units)
-        step = max(0.2, float(total_dur) / n)
-
         draws: list[str] = []
-        for i, u in enumerate(units):
-            start = i * step
-            end = min(float(total_dur), (i + 1) * step)
-            # V13.8：字幕遮挡控制——最多 2 行
-            txt = _wrap_two_lines(u, width=18)
+        for start, end, txt in _subtitle_cues(total_dur, subtitle_text):
             safe = _escape_drawtext_text(txt)
             shaping_part = "text_shaping=1:" if text_shaping else ""
             draws.append(
@@ -2161,6 +2294,51 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             )
         return "," + ",".join(draws) if draws else ""
 
+    ass_memo: dict[tuple, str] = {}
+
+    def _build_subtitle_ass(
+        total_dur: float,
+        subtitle_text: str,
+        *,
+        fontsize: int = 44,
+        y_expr: str = "h-(text_h)-70",
+    ) -> str:
+        """
+        V46.7：字幕写入工位内 subs.ass，返回 ",subtitles=..." 片段（与 drawtext 片段同样带前导逗号）。
+        无 libass / 无字幕 / y 表达式无法映射时返回 ""（调用方走 drawtext）。
+        """
+        if not caps.libass:
+            return ""
+        key = (round(float(total_dur), 3), subtitle_text, int(fontsize), y_expr)
+        if key in ass_memo:
+            return ass_memo[key]
+        frag = ""
+        try:
+            layout = ass_subs.layout_from_y_expr(y_expr)
+            cues = _subtitle_cues(total_dur, subtitle_text)
+            if layout and cues:
+                ass_path = staging_dir / f"subs{len(ass_memo)}.ass"
+                ass_subs.write_ass(
+                    ass_path,
+                    cues,
+                    fontname=fonts.font_family(fontfile) or "Microsoft YaHei",
+                    fontsize=int(fontsize),
+                    alignment=layout[0],
+                    margin_v=layout[1],
+                )
+                fontsdir = Path(fontfile).parent if fontfile else None
+                frag = "," + ass_subs.subtitles_filter(Path(_p(ass_path)), fontsdir=fontsdir)
+        except Exception as e:
+            print(f"[字幕] ASS 生成失败，回退 drawtext: {e}")
+            frag = ""
+        ass_memo[key] = frag
+        return frag
+
+    # V45.8：本次动态缝合命中的夹层（_build_dynamic_video_cmd 填充，concat 降级复用）
+    mezz_map: dict[Path, tuple[Path, bool]] = {}
+    # V47.3：本次动态缝合的战备仓副本（原始路径 -> 工位内路径；_build_dynamic_video_cmd 填充，分块编码复用）
+    dyn_staged: dict[Path, Path] = {}
+
     def _build_dynamic_video_cmd(industry_name: str | None) -> tuple[list[str], list[str], list[tuple[Path, float, float]]]:
         """
         V17.0：多素材切片缝合（战备仓物理脱敏）
@@ -2186,8 +2364,12 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         else:
             sources = pool[:]
 
-        # 探测时长
-        sd_map: dict[Path, float] = {p: _probe_video_duration_seconds(p) for p in sources}
+        # 探测时长（V45.6：缓存批量查询，未命中并发探测）
+        try:
+            probed = probe_cache.probe_many(sources)
+        except Exception:
+            probed = {}
+        sd_map: dict[Path, float] = {p: (probed[p].duration if p in probed else 0.0) for p in sources}
 
         # 构建切片计划：每段 3-5 秒，循环使用素材，填满音频
         segs: list[tuple[Path, float, float]] = []
@@ -2228,48 +2410,63 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             print(f"[警告] 切片计划为空，视频缝合将使用静态背景")
             return ([], [], [])
 
+        # V47.2：输入去重——每条素材一个输入，段起点按素材时间轴单调重排（JUNSHI_DEDUP_INPUTS=0 回退）
+        dedup_plan: list[dedup_inputs.SourceInput] = []
+        if dedup_inputs.enabled():
+            segs, dedup_plan = dedup_inputs.plan(segs, sd_map)
+
+        # V45.8：夹层优先——已转码的 720p30 夹层替代 4K 原片（源 -> (夹层, 是否已烘焙调色)）
+        for src in set([s[0] for s in segs]):
+            try:
+                m = mezzanine.find_mezzanine(src)
+            except Exception:
+                m = None
+            if m is not None:
+                mezz_map[src] = m
+        if mezz_map:
+            print(f"[夹层] 命中 {len(mezz_map)}/{len(set([s[0] for s in segs]))} 条素材")
+
         # V17.0：视频素材搬运至战备仓（物理脱敏）
         staging_sources: dict[Path, Path] = {}  # 原始路径 -> 战备仓路径
         for i, src in enumerate(set([s[0] for s in segs]), 1):
             staging_video = staging_dir / f"v{i}.mp4"
             try:
-                shutil.copy2(src, staging_video)
+                how = staging.stage_file(mezz_map[src][0] if src in mezz_map else src, staging_video)
                 staging_sources[src] = staging_video
-                print(f"[战备仓] 已搬运素材 {i}/{len(set([s[0] for s in segs]))}: {src.name}")
+                print(f"[战备仓] 已搬运素材 {i}/{len(set([s[0] for s in segs]))}（{how}）: {src.name}")
             except Exception as e:
                 # V29.0：素材搬运失败，静默警告（严禁停机）
                 print(f"[警告] 无法复制素材 {src.name}，原因={e}，跳过此素材")
         
+        dyn_staged.update(staging_sources)
+
         # 更新 segs 为战备仓路径
         segs_staging = [(staging_sources[src], start, seg_d) for src, start, seg_d in segs]
 
         # 输入：每段素材一个 input（允许循环），最后再加音频
+        # V47.2：去重模式下每条唯一素材一个 input（-ss 到首段、-t 截到末段）
         cmd_base: list[str] = ["ffmpeg", "-y", "-nostdin"]
-        for src, start, seg_d in segs_staging:
-            cmd_base.extend(
-                [
-                    "-stream_loop",
-                    "-1",
-                    "-ss",
-                    f"{start:.3f}",
-                    "-t",
-                    f"{seg_d:.3f}",
-                    "-i",
-                    _p(src),
-                ]
-            )
+        if dedup_plan:
+            cmd_base.extend(dedup_inputs.input_args(dedup_plan, lambda src: _p(staging_sources[src])))
+            print(f"[缝合] 输入去重: {len(segs)} 段 → {len(dedup_plan)} 个输入")
+        else:
+            for src, start, seg_d in segs_staging:
+                cmd_base.extend(
+                    [
+                        "-stream_loop",
+                        "-1",
+                        "-ss",
+                        f"{start:.3f}",
+                        "-t",
+                        f"{seg_d:.3f}",
+                        "-i",
+                        _p(src),
+                    ]
+                )
         cmd_base.extend(["-i", audio_path])
 
         # 滤镜链：逐段去重滤镜 + concat + 水印 + 字幕
-        # 工业去重滤镜链（按统帅指令）
-        seg_filter = (
-            "hflip,"
-            "scale=trunc(1.2*iw/2)*2:trunc(1.2*ih/2)*2,"
-            "crop=1280:720:(iw-1280)/2:(ih-720)/2,"
-            "eq=contrast=1.3:saturation=0.5:brightness=-0.05,"
-            # V13.8：强制对齐像素宽高比，防止分辨率不一导致 concat 炸膛
-            "setsar=1,fps=30,format=yuv420p"
-        )
+        seg_filter = DYN_SEG_FILTER
 
         # 字体规格（可用 fontfile 或 fontname）
         if fontfile:
@@ -2303,25 +2500,33 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         # V14.2：字幕逻辑固化——短文案字体放大至 60，位置上移至画面中心偏下
         # V14.3：字幕位置下调，避免遮挡核心视觉
         y_v142 = "h-150"
-        sub_draw_file = _build_subtitle_drawtexts(float(dur), subtitle_text, font_spec=font_spec_file, text_shaping=True, max_lines=2, fontsize=60, y_expr=y_v142)
-        sub_draw_name = _build_subtitle_drawtexts(float(dur), subtitle_text, font_spec=font_spec_name, text_shaping=True, max_lines=2, fontsize=60, y_expr=y_v142)
-        sub_draw_file_plain = _build_subtitle_drawtexts(float(dur), subtitle_text, font_spec=font_spec_file, text_shaping=False, max_lines=2, fontsize=60, y_expr=y_v142)
-        sub_draw_name_plain = _build_subtitle_drawtexts(float(dur), subtitle_text, font_spec=font_spec_name, text_shaping=False, max_lines=2, fontsize=60, y_expr=y_v142)
+        # V46.7：字幕优先 ASS（一个 subtitles 滤镜），drawtext 链只作运行期兜底
+        sub_ass = _build_subtitle_ass(float(dur), subtitle_text, fontsize=60, y_expr=y_v142)
 
-        # filter_complex 候选（字体文件/字体名/无 drawtext）
+        # filter_complex 候选（ASS / 字体文件 / 字体名 / 无 drawtext）
         vfc_prefix: list[str] = []
-        for i in range(len(segs)):
-            vfc_prefix.append(f"[{i}:v]{seg_filter}[v{i}]")
+        if dedup_plan:
+            # V47.2：split → trim/setpts → 逐段滤镜（只滤被截取的帧）
+            vfc_prefix.extend(
+                dedup_inputs.filter_prefix(
+                    dedup_plan, lambda src: mezzanine.render_filter(mezz_map[src][1]) if src in mezz_map else seg_filter
+                )
+            )
+        else:
+            for i, (src, _start, _seg_d) in enumerate(segs):
+                # V45.8：夹层输入只剩 hflip（+ 未烘焙时的调色），与 seg_filter 像素等价
+                f_i = mezzanine.render_filter(mezz_map[src][1]) if src in mezz_map else seg_filter
+                vfc_prefix.append(f"[{i}:v]{f_i}[v{i}]")
         concat_in = "".join([f"[v{i}]" for i in range(len(segs))])
         vfc_prefix.append(f"{concat_in}concat=n={len(segs)}:v=1:a=0[vcat]")
 
-        fc_file = ";".join(vfc_prefix + [f"[vcat]{wm_draw_file}{sub_draw_file}[vout]"])
-        fc_name = ";".join(vfc_prefix + [f"[vcat]{wm_draw_name}{sub_draw_name}[vout]"])
-        fc_file_plain = ";".join(vfc_prefix + [f"[vcat]{wm_draw_file}{sub_draw_file_plain}[vout]"])
-        fc_name_plain = ";".join(vfc_prefix + [f"[vcat]{wm_draw_name}{sub_draw_name_plain}[vout]"])
+        def _fc_draw(font_spec_x: str, wm_x: str, shaping: bool) -> str:
+            sub_x = _build_subtitle_drawtexts(float(dur), subtitle_text, font_spec=font_spec_x, text_shaping=shaping, max_lines=2, fontsize=60, y_expr=y_v142)
+            return ";".join(vfc_prefix + [f"[vcat]{wm_x}{sub_x}[vout]"])
+
         fc_nodraw = ";".join(vfc_prefix + ["[vcat]scale=1280:720,setsar=1[vout]"])
 
-        audio_in_idx = len(segs)
+        audio_in_idx = len(dedup_plan) if dedup_plan else len(segs)
         cmd_tail = [
             "-map",
             "[vout]",
@@ -2345,16 +2550,254 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             output_path,
         ]
         # cmd_base 不含 filter_complex，本函数外层会插入
-        return (cmd_base + cmd_tail, [fc_file, fc_name, fc_file_plain, fc_name_plain, fc_nodraw], segs)
+        # V46.5：有字体文件时不再试字体名（Linux 上必败，白跑一遍渲染）
+        # V46.6：按能力矩阵只出一版最优图；其余仅作运行期错误兜底
+        # V46.7：首发 ASS 字幕图；drawtext 字幕链退居兜底（按需构建）
+        # V46.8：水印首选预渲染精灵 overlay，drawtext 水印退居兜底
+        draw_ok = caps.drawtext and bool(fontfile or caps.font_by_name)
+        font_spec_best = font_spec_file if fontfile else font_spec_name
+        wm_best = wm_draw_file if fontfile else wm_draw_name
+        wm_sprite = _wm_sprite_fragment("still")
+        wm_heads = ([wm_sprite] if wm_sprite else []) + ([wm_best] if draw_ok else [])
+        fc_all: list[str] = []
+        if sub_ass:
+            for head in wm_heads or ["scale=1280:720,setsar=1"]:
+                fc_all.append(";".join(vfc_prefix + [f"[vcat]{head}{sub_ass}[vout]"]))
+        if draw_ok:
+            for head in wm_heads:
+                for shaping in ([caps.text_shaping] if caps.known else [True, False]):
+                    fc_all.append(_fc_draw(font_spec_best, head, shaping))
+        fc_all.append(fc_nodraw)
+        return (cmd_base + cmd_tail, list(dict.fromkeys(fc_all)), segs)
+
+    async def _overlay_mux_pass(video_input_args: list[str], *, sub_kwargs: dict | None = None) -> bool:
+        """
+        V45.9：叠加混音工序（水印 + 字幕 + 音频，唯一一次视频编码）。
+        video_input_args：背景视频输入参数（成片 -i 或 concat demuxer 清单）。
+        """
+        # 字幕使用同一套 drawtext（优先 text_shaping=1，失败则降级）
+        # V17.1：字幕字体路径简化
+        if fontfile:
+            ff_fontfile2 = _p(fontfile).replace(":", "\\:")
+            font_spec2 = f"fontfile='{ff_fontfile2}':"
+        else:
+            font_spec2 = "font='Microsoft YaHei':"
+
+        wm2_draw = (
+            "drawtext="
+            f"{font_spec2}"
+            f"text='{safe_text}':"
+            f"x={x_expr}:y={y_expr}:fontsize={fontsize}:"
+            f"fontcolor=white:alpha='0.75':box={box}:boxcolor={boxcolor}:boxborderw=12"
+        )
+        # V46.8：水印首选预渲染精灵
+        wm2_sprite = await asyncio.to_thread(_wm_sprite_fragment, "still")
+        wm2 = wm2_sprite or wm2_draw
+        subtitle_text2 = str(visual_profile.get("subtitle_text") or "")
+        sk = dict(sub_kwargs or {})
+        draw_ok2 = caps.drawtext and bool(fontfile or caps.font_by_name)
+        # V46.7：字幕优先 ASS（libass 单滤镜）；无 libass 才展开 drawtext 链
+        # V47.0：ASS 落盘 + fc-scan 取字体族名放到线程里
+        sub_ass2 = await asyncio.to_thread(
+            _build_subtitle_ass, float(dur), subtitle_text2, fontsize=int(sk.get("fontsize", 44)), y_expr=str(sk.get("y_expr", "h-(text_h)-70"))
+        )
+        if sub_ass2:
+            sub2 = sub_ass2
+        elif draw_ok2:
+            sub2 = _build_subtitle_drawtexts(float(dur), subtitle_text2, font_spec=font_spec2, text_shaping=caps.text_shaping, max_lines=2, **sk)
+        else:
+            sub2 = ""
+        vf2 = f"scale=1280:720,setsar=1,{wm2}{sub2}" if draw_ok2 else f"scale=1280:720,setsar=1{sub2}"
+
+        cmd_final = [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            *video_input_args,
+            "-i",
+            audio_path,
+            "-shortest",
+            "-t",
+            f"{float(dur):.3f}",
+            "-vf",
+            vf2,
+            "-c:v",
+            "libx264",
+            "-preset",
+            preset,
+            "-crf",
+            "24",
+            "-pix_fmt",
+            "yuv420p",
+            "-c:a",
+            "aac",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+        rf = await ffmpeg_runner.run_async(cmd_final, expected_s=float(dur), stage="叠加混音")
+        if rf.returncode == 0:
+            _log_attempts("叠加混音", 1)
+            return True
+        # V46.6：首发已是无 text_shaping / 无字版，降级重跑只会同样失败
+        # V46.7：首发为 ASS 时，降级改走 drawtext 字幕链
+        if not draw_ok2 or not (sub_ass2 or wm2_sprite or caps.text_shaping):
+            return False
+
+        # 降级：不启用 text_shaping（ASS 失败时按能力矩阵选）
+        sub2b = _build_subtitle_drawtexts(float(dur), subtitle_text2, font_spec=font_spec2, text_shaping=(caps.text_shaping if sub_ass2 else False), max_lines=2, **sk)
+        vf2b = f"scale=1280:720,setsar=1,{wm2_draw}{sub2b}"
+        cmd_final2 = list(cmd_final)
+        try:
+            i_vf = cmd_final2.index("-vf")
+            cmd_final2[i_vf + 1] = vf2b
+        except Exception:
+            pass
+        rf2 = await ffmpeg_runner.run_async(cmd_final2, expected_s=float(dur), stage="叠加混音")
+        if rf2.returncode == 0:
+            _log_attempts("叠加混音", 2)
+        return rf2.returncode == 0
+
+    async def _clip_bank_render(industry_name: str | None) -> bool:
+        """
+        V45.9：预切片库缝合——2 秒闭合 GOP 小片（已带 hflip + 调色）按 concat demuxer 顺序读，
+        背景轨零滤镜、单解码器；只编码叠加与混音。片库未覆盖则返回 False 回退逐段滤镜。
+        V47.0：选片 + 搬运在工作线程里做完，编码在事件循环内 await。
+        """
+        def _stage_plan() -> Path | None:
+            pool = _pick_video_pool_for_industry(industry_name)
+            if not pool:
+                return None
+            sources = random.sample(pool, min(10, len(pool)))
+            plan = clip_bank.plan_from_bank(sources, total_s=float(dur))
+            if not plan:
+                return None
+            # V17.0：小片搬运至战备仓（物理脱敏；同一小片只搬一次）
+            clips_dir = staging_dir / "clips"
+            clips_dir.mkdir(parents=True, exist_ok=True)
+            staged: dict[Path, Path] = {}
+            for c, _d in plan:
+                if c in staged:
+                    continue
+                dst = clips_dir / f"c{len(staged) + 1:04d}.mp4"
+                staging.stage_file(c, dst)
+                staged[c] = dst
+            list_file = staging_dir / "clips.txt"
+            clip_bank.write_concat_list([staged[c] for c, _d in plan], list_file)
+            print(f"[片库] 命中 {len(plan)} 片（{len(staged)} 个唯一小片），concat 直拼")
+            return list_file
+
+        list_file = await asyncio.to_thread(_stage_plan)
+        if list_file is None:
+            return False
+        # V14.2/V14.3：字幕规格与动态缝合主路径一致
+        return await _overlay_mux_pass(
+            ["-f", "concat", "-safe", "0", "-i", _p(list_file)],
+            sub_kwargs={"fontsize": 60, "y_expr": "h-150"},
+        )
+
+    async def _chunked_dynamic_render(segs: list[tuple[Path, float, float]], fc_list: list[str]) -> bool:
+        """
+        V47.3：长渲染分块并行编码——切片计划按段边界切 K 块，各块同参编码（闭合 GOP）并在块内
+        按全片时间轴烧录水印 / 字幕，concat demuxer -c copy 拼接后只混音频。不分块 / 失败返回 False。
+        """
+        k = chunked_render.chunk_count(float(dur), len(segs))
+        if k < 2 or any(src not in dyn_staged for src, _start, _d in segs):
+            return False
+        chunks = chunked_render.split_plan([d for _src, _start, d in segs], k)
+
+        def _in_path(src: Path) -> str:
+            # V17.0：与单进程缝合同一份战备仓副本（夹层命中时即夹层副本）
+            return _p(dyn_staged[src])
+
+        def _filter_of(src: Path) -> str:
+            return mezzanine.render_filter(mezz_map[src][1]) if src in mezz_map else DYN_SEG_FILTER
+
+        # 叠加链沿用动态缝合的候选顺序（ASS / 精灵 / drawtext / 无字）
+        tails = [fc.split("[vcat];[vcat]", 1)[1] for fc in fc_list if "[vcat];[vcat]" in fc]
+        chunk_dir = staging_dir / "chunks"
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        print(f"[分块] {len(segs)} 段 → {len(chunks)} 块并行编码")
+        for attempt, tail in enumerate(tails, 1):
+            cmds: list[list[str]] = []
+            outs: list[Path] = []
+            for ci, ch in enumerate(chunks, 1):
+                part = segs[ch.first:ch.last]
+                inputs = dedup_inputs.group_fixed(part)
+                chains = dedup_inputs.filter_prefix(inputs, _filter_of)
+                chains.append("".join(f"[v{i}]" for i in range(len(part))) + f"concat=n={len(part)}:v=1:a=0[vcat]")
+                chains.append("[vcat]" + chunked_render.shift_tail(tail, ch.offset_s))
+                out = chunk_dir / f"chunk_{ci:02d}.mp4"
+                outs.append(out)
+                cmds.append(
+                    [
+                        "ffmpeg", "-y", "-nostdin", "-hide_banner",
+                        *dedup_inputs.input_args(inputs, _in_path),
+                        "-filter_complex", ";".join(chains),
+                        "-map", "[vout]",
+                        "-t", f"{ch.dur_s:.3f}",
+                        *chunked_render.encode_args(preset),
+                        _p(out),
+                    ]
+                )
+            if not await chunked_render.run_parallel(cmds, expected=[ch.dur_s for ch in chunks]):
+                continue
+            list_file = chunk_dir / "chunks.txt"
+            clip_bank.write_concat_list(outs, list_file)
+            cmd_join = [
+                "ffmpeg", "-y", "-nostdin", "-hide_banner",
+                "-f", "concat", "-safe", "0", "-i", _p(list_file),
+                "-i", audio_path,
+                "-map", "0:v", "-map", "1:a",
+                "-c:v", "copy", "-c:a", "aac",
+                "-shortest", "-t", f"{float(dur):.3f}",
+                "-movflags", "+faststart",
+                output_path,
+            ]
+            rj = await ffmpeg_runner.run_async(cmd_join, expected_s=float(dur), stage="分块拼接")
+            if rj.returncode == 0:
+                _log_attempts("分块编码", attempt)
+                return True
+            print(f"[分块] 拼接失败: {(rj.stderr or '')[-300:]}")
+            return False
+        return False
 
     # === V13.5 动态视频缝合分支 ===
     bg_is_video = (bg_type == "video") or (bg_path and Path(str(bg_path)).suffix.lower() in video_exts) or (str(bg_path).startswith("FORCE_"))
     if bg_is_video:
         ind_name = str(visual_profile.get("_industry") or "").strip() or _extract_industry_from_watermark(str(watermark_text))
-        cmd_dyn, fc_candidates, dyn_segs = _build_dynamic_video_cmd(ind_name or None)
+        # V45.9：预切片库优先（JUNSHI_CLIP_BANK=0 关闭）
+        if (os.getenv("JUNSHI_CLIP_BANK") or "1").strip() != "0":
+            try:
+                if await _clip_bank_render(ind_name or None):
+                    print(f"[视频] 片库直拼成功: {os.path.basename(output_path)}")
+                    try:
+                        if staging_dir.exists():
+                            shutil.rmtree(staging_dir, ignore_errors=True)
+                            print("[战备仓] 已清空")
+                    except Exception:
+                        pass
+                    return True, False
+            except Exception as e:
+                print(f"[片库] 直拼失败，回退逐段滤镜缝合: {e}")
+        cmd_dyn, fc_candidates, dyn_segs = await asyncio.to_thread(_build_dynamic_video_cmd, ind_name or None)
+        # V47.3：长音频优先分块并行编码；不满足条件 / 失败回退单进程逐段滤镜缝合
+        if cmd_dyn and fc_candidates and dyn_segs:
+            try:
+                if await _chunked_dynamic_render(dyn_segs, fc_candidates):
+                    print(f"[视频] 分块并行缝合成功: {os.path.basename(output_path)}")
+                    try:
+                        if staging_dir.exists():
+                            shutil.rmtree(staging_dir, ignore_errors=True)
+                            print("[战备仓] 已清空")
+                    except Exception:
+                        pass
+                    return True, False
+            except Exception as e:
+                print(f"[分块] 分块编码失败，回退单进程缝合: {e}")
         if cmd_dyn and fc_candidates:
             last_result = None
-            for fc in fc_candidates:
+            for attempt, fc in enumerate(fc_candidates, 1):
                 cmd_try = list(cmd_dyn)
                 # 插入 filter_complex
                 try:
@@ -2366,10 +2809,11 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                 try:
                     # V16.1：强制阻塞缝合自检——打印完整命令供统帅核查
                     print(f"[FFmpeg 动态缝合 CMD] {' '.join(cmd_try[:50])}...")  # 截断显示，避免过长
-                    result = subprocess.run(cmd_try, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+                    result = await ffmpeg_runner.run_async(cmd_try, expected_s=float(dur), stage="动态缝合")
                     last_result = (cmd_try, result)
                     if result.returncode == 0:
                         print(f"[视频] 动态缝合成功: {os.path.basename(output_path)}")
+                        _log_attempts("动态缝合", attempt)
                         # V17.0：缝合成功后清空战备仓
                         try:
                             if staging_dir.exists():
@@ -2378,12 +2822,13 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                         except Exception:
                             pass
                         return True, False
-                except subprocess.TimeoutExpired:
-                    last_result = (cmd_try, None)
+                except subprocess.TimeoutExpired as e:
+                    # V46.9：停滞/超时击杀保留 stderr 尾部，失败日志照常输出
+                    last_result = (cmd_try, e)
                     continue
 
             # V13.8：二级火控预案——concat demuxer 降级方案
-            def _concat_demuxer_fallback(segs: list[tuple[Path, float, float]]) -> bool:
+            async def _concat_demuxer_fallback(segs: list[tuple[Path, float, float]]) -> bool:
                 if not segs:
                     return False
                 try:
@@ -2394,16 +2839,13 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
 
                 # 1) 每段素材先做“逐段滤镜 + 统一编码”输出为临时片段
                 seg_paths: list[Path] = []
-                seg_filter2 = (
-                    "hflip,"
-                    "scale=trunc(1.2*iw/2)*2:trunc(1.2*ih/2)*2,"
-                    "crop=1280:720:(iw-1280)/2:(ih-720)/2,"
-                    "eq=contrast=1.3:saturation=0.5:brightness=-0.05,"
-                    "setsar=1,fps=30,format=yuv420p"
-                )
                 for i, (src, start, seg_d) in enumerate(segs, 1):
                     out_seg = tmp_dir / f"seg_{i:03d}.mp4"
                     seg_paths.append(out_seg)
+                    # V45.8：夹层优先
+                    seg_in, seg_vf = src, DYN_SEG_FILTER
+                    if src in mezz_map:
+                        seg_in, seg_vf = mezz_map[src][0], mezzanine.render_filter(mezz_map[src][1])
                     cmd_seg = [
                         "ffmpeg",
                         "-y",
@@ -2415,10 +2857,10 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                         "-t",
                         f"{seg_d:.3f}",
                         "-i",
-                        _p(src),
+                        _p(seg_in),
                         "-an",
                         "-vf",
-                        seg_filter2,
+                        seg_vf,
                         "-c:v",
                         "libx264",
                         "-preset",
@@ -2437,7 +2879,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                         "0",
                         _p(out_seg),
                     ]
-                    rseg = subprocess.run(cmd_seg, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+                    rseg = await ffmpeg_runner.run_async(cmd_seg, expected_s=float(seg_d), stage=f"降级分段{i}")
                     if rseg.returncode != 0:
                         return False
 
@@ -2452,7 +2894,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
 
                 joined = tmp_dir / "joined.mp4"
                 cmd_join = ["ffmpeg", "-y", "-nostdin", "-hide_banner", "-f", "concat", "-safe", "0", "-i", _p(list_file), "-c", "copy", _p(joined)]
-                rj = subprocess.run(cmd_join, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+                rj = await ffmpeg_runner.run_async(cmd_join, expected_s=float(dur), stage="降级拼接")
                 if rj.returncode != 0:
                     # 兜底：重编码 join
                     cmd_join2 = [
@@ -2477,75 +2919,15 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                         "30",
                         _p(joined),
                     ]
-                    rj2 = subprocess.run(cmd_join2, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+                    rj2 = await ffmpeg_runner.run_async(cmd_join2, expected_s=float(dur), stage="降级拼接")
                     if rj2.returncode != 0:
                         return False
 
-                # 3) 最后一步：水印 + 字幕 + 音频混缩 输出成品
-                # 字幕使用同一套 drawtext（优先 text_shaping=1，失败则降级）
-                # V17.1：字幕字体路径简化
-                if fontfile:
-                    ff_fontfile2 = _p(fontfile).replace(":", "\\:")
-                    font_spec2 = f"fontfile='{ff_fontfile2}':"
-                else:
-                    font_spec2 = "font='Microsoft YaHei':"
-
-                wm2 = (
-                    "drawtext="
-                    f"{font_spec2}"
-                    f"text='{safe_text}':"
-                    f"x={x_expr}:y={y_expr}:fontsize={fontsize}:"
-                    f"fontcolor=white:alpha='0.75':box={box}:boxcolor={boxcolor}:boxborderw=12"
-                )
-                subtitle_text2 = str(visual_profile.get("subtitle_text") or "")
-                sub2 = _build_subtitle_drawtexts(float(dur), subtitle_text2, font_spec=font_spec2, text_shaping=True, max_lines=2)
-                vf2 = f"scale=1280:720,setsar=1,{wm2}{sub2}"
-
-                cmd_final = [
-                    "ffmpeg",
-                    "-y",
-                    "-hide_banner",
-                    "-i",
-                    _p(joined),
-                    "-i",
-                    audio_path,
-                    "-shortest",
-                    "-t",
-                    f"{float(dur):.3f}",
-                    "-vf",
-                    vf2,
-                    "-c:v",
-                    "libx264",
-                    "-preset",
-                    preset,
-                    "-crf",
-                    "24",
-                    "-pix_fmt",
-                    "yuv420p",
-                    "-c:a",
-                    "aac",
-                    "-movflags",
-                    "+faststart",
-                    output_path,
-                ]
-                rf = subprocess.run(cmd_final, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
-                if rf.returncode == 0:
-                    return True
-
-                # 降级：不启用 text_shaping
-                sub2b = _build_subtitle_drawtexts(float(dur), subtitle_text2, font_spec=font_spec2, text_shaping=False, max_lines=2)
-                vf2b = f"scale=1280:720,setsar=1,{wm2}{sub2b}"
-                cmd_final2 = list(cmd_final)
-                try:
-                    i_vf = cmd_final2.index("-vf")
-                    cmd_final2[i_vf + 1] = vf2b
-                except Exception:
-                    pass
-                rf2 = subprocess.run(cmd_final2, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
-                return rf2.returncode == 0
+                # 3) 最后一步：水印 + 字幕 + 音频混缩 输出成品（V45.9：与预切片库共用叠加混音工序）
+                return await _overlay_mux_pass(["-i", _p(joined)])
 
             try:
-                if dyn_segs and _concat_demuxer_fallback(dyn_segs):
+                if dyn_segs and await _concat_demuxer_fallback(dyn_segs):
                     print(f"[视频] 动态缝合降级（concat）成功: {os.path.basename(output_path)}")
                     # V17.0：缝合成功后清空战备仓
                     try:
@@ -2595,19 +2977,27 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
     except Exception:
         pass
 
+    # V46.3：静态底图（纯色/渐变/图片）专用编码——低帧率输入 + -tune stillimage + faststart（Telegram 边下边播）
+    still_fps = _still_fps()
+    still_rate = str(still_fps or 30)
+    still_enc = ["-r", still_rate, "-tune", "stillimage", "-g", str(still_fps * 2), "-movflags", "+faststart"] if still_fps else []
+    if still_fps:
+        print(f"[视频] 静帧模式: {still_fps}fps")
+
     # 默认安全：抽象背景（规避门牌/车牌/品牌logo）
     if bg.get("type") == "color":
         color = bg.get("color") or "black"
         # 注意：这里的 -vf 会在后面按 vf_candidates 重试替换
         cmd = [
             "ffmpeg",
-            "-f", "lavfi", "-i", f"color=c={color}:s=1280x720" + (f":d={dur:.3f}" if dur else ""),
+            "-f", "lavfi", "-i", f"color=c={color}:s=1280x720:r={still_rate}" + (f":d={dur:.3f}" if dur else ""),
             "-i", audio_path,
             "-shortest",
             *(["-t", f"{dur:.3f}"] if dur else []),
             "-c:v", "libx264",
             "-preset", "ultrafast" if IS_CLOUD_ENV else "veryfast",
             "-crf", "28",
+            *still_enc,
             "-vf", vf,
             "-c:a", "aac",
             "-pix_fmt", "yuv420p",
@@ -2616,25 +3006,31 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
     elif bg.get("type") == "gradient":
         c_from = bg.get("from") or "#050505"
         c_to = bg.get("to") or "#202020"
-        r1, g1, b1 = VisualEngine._hex_to_rgb(c_from)
-        r2, g2, b2 = VisualEngine._hex_to_rgb(c_to)
-        # geq 生成横向渐变：从左到右 c_from -> c_to
-        grad = (
-            f"geq="
-            f"r='(1-(X/W))*{r1} + (X/W)*{r2}':"
-            f"g='(1-(X/W))*{g1} + (X/W)*{g2}':"
-            f"b='(1-(X/W))*{b1} + (X/W)*{b2}'"
-        )
-        vf2 = f"{grad},{vf}"
+        # V46.2：缓存渐变 PNG 静帧循环输入；缓存不可用才回退逐帧 geq（从左到右 c_from -> c_to）
+        # V47.0：首次生成 PNG（PIL / ffmpeg）与搬运都在线程里跑
+        grad_png = await asyncio.to_thread(gradient.gradient_png, c_from, c_to)
+        if grad_png is not None:
+            staging_grad = staging_dir / "bg.png"
+            try:
+                await asyncio.to_thread(staging.stage_file, grad_png, staging_grad)
+                grad_png = staging_grad
+            except Exception:
+                pass
+            grad_input = ["-loop", "1", "-framerate", still_rate, *(["-t", f"{dur:.3f}"] if dur else []), "-i", _p(grad_png)]
+            vf2 = vf
+        else:
+            grad_input = ["-f", "lavfi", "-i", f"color=c=black:s=1280x720:r={still_rate}" + (f":d={dur:.3f}" if dur else "")]
+            vf2 = f"{gradient.geq_filter(c_from, c_to)},{vf}"
         cmd = [
             "ffmpeg",
-            "-f", "lavfi", "-i", "color=c=black:s=1280x720" + (f":d={dur:.3f}" if dur else ""),
+            *grad_input,
             "-i", audio_path,
             "-shortest",
             *(["-t", f"{dur:.3f}"] if dur else []),
             "-c:v", "libx264",
             "-preset", "ultrafast" if IS_CLOUD_ENV else "veryfast",
             "-crf", "28",
+            *still_enc,
             "-vf", vf2,
             "-c:a", "aac",
             "-pix_fmt", "yuv420p",
@@ -2652,7 +3048,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
             # V17.0：背景图搬运至战备仓
             staging_bg = staging_dir / f"bg{Path(bg_image).suffix}"
             try:
-                shutil.copy2(bg_image, staging_bg)
+                await asyncio.to_thread(staging.stage_file, bg_image, staging_bg)
                 bg_image_safe = _p(staging_bg)
             except Exception as e:
                 # V29.0：搬运失败，静默警告（严禁停机）
@@ -2665,6 +3061,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                 "-y",
                 "-nostdin",
                 "-loop", "1",
+                "-framerate", still_rate,
                 *(["-t", f"{dur:.3f}"] if dur else []),
                 "-i", bg_image_safe,
                 "-i", audio_path,
@@ -2673,6 +3070,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                 "-c:v", "libx264",
                 "-preset", preset,
                 "-crf", "28",
+                *still_enc,
                 "-vf", vf,
                 "-c:a", "aac",
                 "-pix_fmt", "yuv420p",
@@ -2685,12 +3083,13 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
                 "-y",
                 "-nostdin",
                 "-f", "lavfi",
-                "-i", f"color=c=black:s=1280x720:d={dur:.3f}",
+                "-i", f"color=c=black:s=1280x720:r={still_rate}:d={dur:.3f}",
                 "-i", audio_path,
                 "-shortest",
                 "-c:v", "libx264",
                 "-preset", preset,
                 "-crf", "28",
+                *still_enc,
                 "-vf", vf,
                 "-c:a", "aac",
                 "-pix_fmt", "yuv420p",
@@ -2700,7 +3099,7 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
 
     try:
         last_result = None
-        for vf_try in vf_candidates:
+        for attempt, vf_try in enumerate(vf_candidates, 1):
             # 替换命令中的 -vf 参数值
             cmd_try = list(cmd)
             try:
@@ -2711,10 +3110,11 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
 
             # V16.1：强制阻塞缝合自检——打印完整命令供统帅核查
             print(f"[FFmpeg CMD] {' '.join(cmd_try)}")
-            result = subprocess.run(cmd_try, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+            result = await ffmpeg_runner.run_async(cmd_try, expected_s=float(dur), stage="静态底图")
             last_result = (cmd_try, result)
             if result.returncode == 0:
                 print(f"[视频] 缝合成功: {os.path.basename(output_path)}")
+                _log_attempts("静态底图", attempt)
                 # V17.0：缝合成功后清空战备仓
                 try:
                     if staging_dir.exists():
@@ -2750,8 +3150,8 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         except Exception:
             pass
         return False, False
-    except subprocess.TimeoutExpired:
-        print("[错误] 视频渲染超时（120秒），本发跳过视频")
+    except subprocess.TimeoutExpired as e:
+        print(f"[错误] 视频渲染超时（{e}），本发跳过视频")
         # V17.0：失败时也清空战备仓
         try:
             if staging_dir.exists():
@@ -2770,12 +3170,27 @@ def video_stitcher(audio_path, output_path, visual_profile: dict | None = None):
         return False, False
 
 
+def _bg_pick_fontfile() -> str | None:
+    """export_background_jpg 水印字体（V46.5：与 video_stitcher 共用启动解析结果）。"""
+    return fonts.resolve_cjk_font()
+
+
+def _bg_gradient_colors(industry: str, bg: dict) -> tuple[str, str]:
+    """无图兜底的渐变起止色：本次 bg 为渐变则沿用，否则取行业主题色。"""
+    if str(bg.get("type") or "").lower() == "gradient":
+        return bg.get("from") or "#050505", bg.get("to") or "#202020"
+    g_base = VisualEngine.INDUSTRY_THEME_COLORS.get(industry, "#0a0a0a")
+    return VisualEngine._shade(g_base, 0.75), VisualEngine._shade(g_base, 1.25)
+
+
 def export_background_jpg(*, industry: str, visual_profile: dict | None, output_jpg: Path) -> bool:
     """
     V8.0：导出“本次使用的背景图”到 jpg，供 Telegram 消息③投递与物理验收。
     - 若有真实素材图：转码/缩放为 jpg。
-    - 若无素材图：生成黑底 jpg，并尽最大努力叠加水印（失败则降级纯黑）。
+    - 若无素材图：生成行业渐变底 jpg（V46.2 缓存），并尽最大努力叠加水印（失败则降级纯黑）。
+    V46.4：产物由（源图指纹、行业、字体、渐变色）唯一决定——命中缓存直接硬链接，未命中才跑 ffmpeg。
     """
+    output_jpg = Path(output_jpg)
     try:
         output_jpg.parent.mkdir(parents=True, exist_ok=True)
     except Exception:
@@ -2785,28 +3200,30 @@ def export_background_jpg(*, industry: str, visual_profile: dict | None, output_
     bg = (vp.get("bg") or {}) if isinstance(vp, dict) else {}
     bg_type = (bg.get("type") or "").lower()
     bg_path = bg.get("path") if isinstance(bg, dict) else None
+    src = bg_cache.source_stamp(bg_path) if bg_type == "image" else None
+    fontfile = _bg_pick_fontfile()
+    key = bg_cache.make_key(
+        source=src,
+        industry=str(industry),
+        font=bg_cache.source_stamp(fontfile) or fontfile,
+        gradient=None if src else list(_bg_gradient_colors(industry, bg)),
+    )
+    return bg_cache.fetch_or_render(
+        key,
+        output_jpg,
+        lambda out: _render_background_jpg(industry=industry, bg=bg, fontfile=fontfile, output_jpg=out),
+    )
 
-    def _pick_fontfile() -> str | None:
-        env_font = os.getenv("WATERMARK_FONT")
-        candidates = []
-        if env_font:
-            candidates.append(env_font)
-        candidates.extend([
-            "C:/Windows/Fonts/msyh.ttc",
-            "C:/Windows/Fonts/simhei.ttf",
-            "C:/Windows/Fonts/simsun.ttc",
-        ])
-        for fp in candidates:
-            try:
-                if fp and os.path.exists(fp):
-                    return fp
-            except Exception:
-                continue
-        return None
+
+def _render_background_jpg(*, industry: str, bg: dict, fontfile: str | None, output_jpg: Path) -> bool:
+    """export_background_jpg 的实际 ffmpeg 渲染（缓存未命中时调用）。"""
+    bg_type = (bg.get("type") or "").lower()
+    bg_path = bg.get("path") if isinstance(bg, dict) else None
 
     def _run(cmd: list[str]) -> bool:
         try:
-            r = subprocess.run(cmd, capture_output=True, timeout=120, encoding="utf-8", errors="ignore")
+            # V46.9：单帧导出也走进度执行器（卡死即击杀，不再白等 120 秒）
+            r = ffmpeg_runner.run(cmd, expected_s=None, stage="底图导出")
             return r.returncode == 0
         except Exception:
             return False
@@ -2828,11 +3245,18 @@ def export_background_jpg(*, industry: str, visual_profile: dict | None, output_
         if _run(cmd):
             return True
 
-    # 2) 无图：生成黑底 + 尝试水印
+    # 2) 无图：生成底图 + 尝试水印
+    # V46.2：底图取行业渐变缓存（与视频兜底同一张），缓存不可用才用纯黑
+    g_from, g_to = _bg_gradient_colors(industry, bg)
+    grad_png = gradient.gradient_png(g_from, g_to)
+    if grad_png is not None:
+        base_input = ["-i", grad_png.as_posix()]
+    else:
+        base_input = ["-f", "lavfi", "-i", "color=c=black:s=1280x720"]
+
     # V14.3：彻底移除“自愈”字样
     text = f"{industry} · 核心拆解"
     safe_text = str(text).replace("'", "\\'")
-    fontfile = _pick_fontfile()
     if fontfile:
         ff_fontfile = str(fontfile).replace("\\", "/").replace(":", "\\\\:")
         vf = (
@@ -2843,8 +3267,7 @@ def export_background_jpg(*, industry: str, visual_profile: dict | None, output_
         cmd = [
             "ffmpeg",
             "-y",
-            "-f", "lavfi",
-            "-i", "color=c=black:s=1280x720",
+            *base_input,
             "-frames:v", "1",
             "-vf", vf,
             "-q:v", "3",
@@ -2853,7 +3276,12 @@ def export_background_jpg(*, industry: str, visual_profile: dict | None, output_
         if _run(cmd):
             return True
 
-    # 3) 最终兜底：纯黑 jpg
+    # 3) 无字体/水印失败：渐变底图直出
+    if grad_png is not None:
+        if _run(["ffmpeg", "-y", *base_input, "-frames:v", "1", "-q:v", "3", str(output_jpg)]):
+            return True
+
+    # 4) 最终兜底：纯黑 jpg
     cmd = [
         "ffmpeg",
         "-y",
@@ -3263,7 +3691,7 @@ async def generate_blood_bullet(
     folder,
     semaphore=None,
     visual_engine: VisualEngine | None = None,
-    render_semaphore: asyncio.Semaphore | None = None,
+    render_semaphore: "asyncio.Semaphore | render_scheduler.RenderScheduler | None" = None,
 ):
     """V3 血弹生产线 - 全量变量预初始化，严禁块外引用块内变量"""
 
@@ -3385,6 +3813,23 @@ async def generate_blood_bullet(
     bombs_path = script_dir / bf
     # V15.8：中文标签仅用于 Telegram caption，不污染物理磁盘
     display_name = f"【行业拆解】_{industry}_{ts}"
+    # V46.4：背景 jpg 导出与 DeepSeek 请求并行（两者互不依赖），拿到文案后再收口
+    bg_export_task: asyncio.Task | None = None
+
+    async def _join_bg_export() -> None:
+        nonlocal bg_export_task
+        task, bg_export_task = bg_export_task, None
+        if task is None:
+            return
+        try:
+            ok_bg, orig_bg_type = await task
+            # V8.1：视频合成瞬间必须引用“成功发送的那张 jpg 零件”
+            if ok_bg and bg_jpg_path.exists() and orig_bg_type != "video":
+                visual_profile["bg"] = {"type": "image", "path": str(bg_jpg_path)}
+        except Exception:
+            # 背景导出失败不阻塞生产线（视频仍可走渐变/视频兜底）
+            pass
+
     if v8_mode:
         bg_jpg_path = (image_dir / f"{name}.jpg")
         try:
@@ -3395,13 +3840,16 @@ async def generate_blood_bullet(
                 orig_bg_type = str((orig_bg or {}).get("type") or "").lower()
             except Exception:
                 orig_bg_type = ""
-            ok_bg = export_background_jpg(industry=industry, visual_profile=visual_profile, output_jpg=bg_jpg_path)
-            # V8.1：视频合成瞬间必须引用“成功发送的那张 jpg 零件”
-            if ok_bg and bg_jpg_path.exists() and orig_bg_type != "video":
-                visual_profile["bg"] = {"type": "image", "path": str(bg_jpg_path)}
+
+            def _export_bg(profile_snapshot: dict, bg_type_snapshot: str) -> tuple[bool, str]:
+                return export_background_jpg(industry=industry, visual_profile=profile_snapshot, output_jpg=bg_jpg_path), bg_type_snapshot
+
+            bg_export_task = asyncio.create_task(
+                asyncio.to_thread(_export_bg, copy.deepcopy(visual_profile or {}), orig_bg_type)
+            )
         except Exception:
             # 背景导出失败不阻塞生产线（视频仍可走渐变/视频兜底）
-            pass
+            bg_export_task = None
 
     # V8.4：血肉炸弹落盘（给 SaaS/封面文案复用）
     try:
@@ -3416,93 +3864,98 @@ async def generate_blood_bullet(
 
     try:
         # === 1. DeepSeek 文案（爆款 5 步公式） ===
-        seed_ns = time.time_ns()
-        seed_headers = {"X-Seed-NS": str(seed_ns)}
-        flesh_bombs_text = "\n".join([f"- {x}" for x in flesh_bombs_list if x])
-        prompt_template = {
-            "model": "deepseek-chat",
-            "temperature": 0.9,
-            "top_p": 0.95,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": render_system_prompt(
-                        seed_ns=seed_ns,
-                        jiumo_slogan=jiumo_slogan,
-                        lexicon_category=lexicon_category,
-                        lexicon_keywords=lexicon_keywords,
-                        nightmare_keywords=nightmare_keywords,
-                        flesh_bombs=flesh_bombs_text,
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": "\n".join([
-                        f"目标行业：{industry}",
-                        # V44.3：顶级操盘手身份主权注入
-                        "你现在的身份是：一个顶级的短视频操盘手专家，专门为百万级账号策划爆款脚本。",
-                        "你的任务是策划一套能够突破百万播放量的爆款脚本，每个字都必须精准刺穿用户的认知防线。",
-                        f"V10.0 风格引擎：{v10_style_prompt}（只按风格写，不要输出风格名称）",
-                        f"V10.0 攻击角度：{v10_angle}（本篇只允许一个角度，禁止复刻上一次句式）",
-                        f"深夜噩梦场景：{pain_scene}",
-                        f"融合关键词：{hook}、{pain}、{ending}",
-                        f"核心锚点（必须全部出现）：{anchors_text}",
-                        f"核心爆破点（必须全部出现）：{lexicon_keywords}",
-                        f"行业噩梦关键词组（必须全部出现）：{nightmare_keywords}",
-                        f"行业物理碎片（必须在①②③论证中原样引用至少1条）：\n{flesh_bombs_text}",
-                        # V44.3：说人话死令——绝对禁止学术装逼
-                        "【语气死令：绝对禁止学术装逼】",
-                        "- 严禁使用诸如'赛博'、'底层逻辑'、'结构性'、'能级'等拗口的互联网黑话或学术名词！",
-                        "- 必须用最接地气、最口语化的'人话'写！",
-                        "- 像一个冷酷的老板在酒桌上教训人，一针见血，字字扎心。",
-                        "- 用短句！用大白话！拒绝长篇大论的复杂定语！",
-                        (
-                            "V10.0 禁词熔断：严禁出现这些词及其变体："
-                            "骗局、割韭菜、暴利、套路、揭秘、底层、诱导、微信、赚钱、上岸、真相。"
-                        ),
-                        (
-                            "V13.91 战术减重死命令：文案总长度严禁超过150字符。"
-                            "每句话控制在8-10字以内。只要精华，删除废话。"
-                            "严禁出现：首先、总之、真相是。"
-                        ),
-                        (
-                            "V14.1 百字核平：输出必须是直击灵魂的短句。"
-                            "总字数严禁超过80字。"
-                            "剔除所有形容词，只留动词和名词。"
-                        ),
-                        (
-                            "V10.0 短句断行：每句不超过10字，尽量不用逻辑连词（因为/所以/但是/然而/同时/如果/那么/然后）。"
-                            "每句尽量独立成行。"
-                        ),
-                        (
-                            f"V10.0 主语破甲弹：开头15字内必须出现其一并作为主语，且紧跟 ... ... 停顿："
-                            f"{v10_subject_piercers[0]} / {v10_subject_piercers[1]}"
-                        ) if len(v10_subject_piercers) == 2 else "",
-                        f"白酒垂直关键词（必须包含）：{baijiu_keyword}" if baijiu_keyword else "",
-                        (
-                            "V8.7 自媒体/做IP 特规：你会收到 10 枚破甲弹词。"
-                            "必须在①②③论证中引用其中至少 3 枚，并倒推每枚背后的商业定性。"
-                            "若出现“赛博地主”，必须讨论“数字收租/数字收租模型”。"
-                        ) if str(industry).strip() in ["自媒体", "做IP", "IP"] else "",
-                        # V44.3：核心爆款要求
-                        "核心要求：",
-                        "- 观点极端犀利，节奏连环刺激，剔除所有文学修饰废话。",
-                        "- 必须含：深度干货、情绪钩子、引起阶级共鸣的真实场景。",
-                        "- 结尾硬锁死：以一个让人停止刷屏的'金句'作为灵魂升华。",
-                        "要求：狠、短、可拍、可上屏。每段开头必须先抛一个生肉关键词，再接一句场景。",
-                        "严禁套话，禁止泛泛而谈，必须贴合实际行业痛点，让看到的人产生强烈的自我代入感。"
-                    ]).strip()
-                }
-            ]
-        }
-        prompt_payload = copy.deepcopy(prompt_template)
+        try:
+            seed_ns = time.time_ns()
+            seed_headers = {"X-Seed-NS": str(seed_ns)}
+            flesh_bombs_text = "\n".join([f"- {x}" for x in flesh_bombs_list if x])
+            prompt_template = {
+                "model": "deepseek-chat",
+                "temperature": 0.9,
+                "top_p": 0.95,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": render_system_prompt(
+                            seed_ns=seed_ns,
+                            jiumo_slogan=jiumo_slogan,
+                            lexicon_category=lexicon_category,
+                            lexicon_keywords=lexicon_keywords,
+                            nightmare_keywords=nightmare_keywords,
+                            flesh_bombs=flesh_bombs_text,
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": "\n".join([
+                            f"目标行业：{industry}",
+                            # V44.3：顶级操盘手身份主权注入
+                            "你现在的身份是：一个顶级的短视频操盘手专家，专门为百万级账号策划爆款脚本。",
+                            "你的任务是策划一套能够突破百万播放量的爆款脚本，每个字都必须精准刺穿用户的认知防线。",
+                            f"V10.0 风格引擎：{v10_style_prompt}（只按风格写，不要输出风格名称）",
+                            f"V10.0 攻击角度：{v10_angle}（本篇只允许一个角度，禁止复刻上一次句式）",
+                            f"深夜噩梦场景：{pain_scene}",
+                            f"融合关键词：{hook}、{pain}、{ending}",
+                            f"核心锚点（必须全部出现）：{anchors_text}",
+                            f"核心爆破点（必须全部出现）：{lexicon_keywords}",
+                            f"行业噩梦关键词组（必须全部出现）：{nightmare_keywords}",
+                            f"行业物理碎片（必须在①②③论证中原样引用至少1条）：\n{flesh_bombs_text}",
+                            # V44.3：说人话死令——绝对禁止学术装逼
+                            "【语气死令：绝对禁止学术装逼】",
+                            "- 严禁使用诸如'赛博'、'底层逻辑'、'结构性'、'能级'等拗口的互联网黑话或学术名词！",
+                            "- 必须用最接地气、最口语化的'人话'写！",
+                            "- 像一个冷酷的老板在酒桌上教训人，一针见血，字字扎心。",
+                            "- 用短句！用大白话！拒绝长篇大论的复杂定语！",
+                            (
+                                "V10.0 禁词熔断：严禁出现这些词及其变体："
+                                "骗局、割韭菜、暴利、套路、揭秘、底层、诱导、微信、赚钱、上岸、真相。"
+                            ),
+                            (
+                                "V13.91 战术减重死命令：文案总长度严禁超过150字符。"
+                                "每句话控制在8-10字以内。只要精华，删除废话。"
+                                "严禁出现：首先、总之、真相是。"
+                            ),
+                            (
+                                "V14.1 百字核平：输出必须是直击灵魂的短句。"
+                                "总字数严禁超过80字。"
+                                "剔除所有形容词，只留动词和名词。"
+                            ),
+                            (
+                                "V10.0 短句断行：每句不超过10字，尽量不用逻辑连词（因为/所以/但是/然而/同时/如果/那么/然后）。"
+                                "每句尽量独立成行。"
+                            ),
+                            (
+                                f"V10.0 主语破甲弹：开头15字内必须出现其一并作为主语，且紧跟 ... ... 停顿："
+                                f"{v10_subject_piercers[0]} / {v10_subject_piercers[1]}"
+                            ) if len(v10_subject_piercers) == 2 else "",
+                            f"白酒垂直关键词（必须包含）：{baijiu_keyword}" if baijiu_keyword else "",
+                            (
+                                "V8.7 自媒体/做IP 特规：你会收到 10 枚破甲弹词。"
+                                "必须在①②③论证中引用其中至少 3 枚，并倒推每枚背后的商业定性。"
+                                "若出现“赛博地主”，必须讨论“数字收租/数字收租模型”。"
+                            ) if str(industry).strip() in ["自媒体", "做IP", "IP"] else "",
+                            # V44.3：核心爆款要求
+                            "核心要求：",
+                            "- 观点极端犀利，节奏连环刺激，剔除所有文学修饰废话。",
+                            "- 必须含：深度干货、情绪钩子、引起阶级共鸣的真实场景。",
+                            "- 结尾硬锁死：以一个让人停止刷屏的'金句'作为灵魂升华。",
+                            "要求：狠、短、可拍、可上屏。每段开头必须先抛一个生肉关键词，再接一句场景。",
+                            "严禁套话，禁止泛泛而谈，必须贴合实际行业痛点，让看到的人产生强烈的自我代入感。"
+                        ]).strip()
+                    }
+                ]
+            }
+            prompt_payload = copy.deepcopy(prompt_template)
 
-        ds = await client.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers={"Authorization": f"Bearer {DEEPSEEK_API_KEY}", **seed_headers},
-            json=prompt_payload,
-            timeout=120.0
-        )
+            ds = await client.post(
+                "https://api.deepseek.com/v1/chat/completions",
+                headers={"Authorization": f"Bearer {DEEPSEEK_API_KEY}", **seed_headers},
+                json=prompt_payload,
+                timeout=120.0
+            )
+        finally:
+            # V46.4：并行的背景导出在此收口（后续视觉联动 / 视频合成依赖其结果）；
+            # 文案请求超时 / 断连 / 取消同样收口，不留后台线程继续写已失败血弹的 jpg
+            await _join_bg_export()
 
         if ds.status_code != 200:
             err = f"DeepSeek API 失败: {ds.status_code}"
@@ -3638,28 +4091,50 @@ async def generate_blood_bullet(
             print(f"   [警告] 文案归档失败: {e}")
 
         # === 2. 音频引擎（ElevenLabs 主火控 + V13.9 副火控） ===
-        segments = split_text_for_tts(clean_text, max_chars=80)
+        # V45.4：按供应商上限装箱（替代 80 字硬锁），与旧版实际请求数对照记账
+        tts_plan, tts_legacy_requests = plan_tts_chunks(clean_text, model_id=ELEVEN_TTS_MODEL_ID)
+        segments = [x["text"] for x in tts_plan]
+        metrics.incr("tts.plan_requests", len(tts_plan))
+        metrics.incr("tts.legacy_requests", tts_legacy_requests)
+        if len(tts_plan) != tts_legacy_requests:
+            print(f"   [音频] 分段规划: {len(tts_plan)} 发（旧版 80 字硬锁 {tts_legacy_requests} 发）")
         seg_paths: list[Path] = []
         used_fallback_tts = False
+        tts_route = None
         try:
+            # V45.1：额度感知路由——熔断中/额度不足直接走副火控，不再白打一发 401/429
+            tts_route = await TTS_ROUTER.route(client, ELEVENLABS_API_KEY, sum(len(x) for x in segments))
+            if tts_route.engine != "eleven":
+                raise ElevenQuotaExceeded(
+                    f"ElevenLabs 路由熔断: {tts_route.reason}",
+                    status_code=tts_route.status_code,
+                )
+
             if len(segments) > 1:
                 print(f"   [音频] 文案过长，分段合成: {len(segments)} 段")
 
-            for si, seg in enumerate(segments, 1):
+            for si, seg_req in enumerate(tts_plan, 1):
                 seg_path = audio_dir / f"{name}.seg{si}.tmp.mp3"
                 seg_paths.append(seg_path)
 
+                el_payload = {
+                    "text": seg_req["text"],
+                    "model_id": ELEVEN_TTS_MODEL_ID,
+                    "voice_settings": {
+                        "stability": ELEVEN_STABILITY,
+                        "similarity_boost": ELEVEN_SIMILARITY_BOOST
+                    }
+                }
+                # V45.4：跨段韵律衔接（仅支持的模型才带上下文）
+                for ctx_key in ("previous_text", "next_text"):
+                    if seg_req.get(ctx_key):
+                        el_payload[ctx_key] = seg_req[ctx_key]
+
+                el_t0 = time.monotonic()
                 el_resp = await client.post(
                     f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}",
                     headers={"xi-api-key": ELEVENLABS_API_KEY, "X-Seed-NS": str(time.time_ns())},
-                    json={
-                        "text": seg,
-                        "model_id": "eleven_v3",
-                        "voice_settings": {
-                            "stability": ELEVEN_STABILITY,
-                            "similarity_boost": ELEVEN_SIMILARITY_BOOST
-                        }
-                    },
+                    json=el_payload,
                     timeout=120.0
                 )
 
@@ -3672,6 +4147,12 @@ async def generate_blood_bullet(
                     low = err.lower()
                     # V13.9/V13.91：额度熔断识别（quota_exceeded/credit/insufficient/401/429）
                     if ("quota" in low) or ("exceeded" in low) or ("insufficient" in low) or ("credit" in low) or (el_resp.status_code in (401, 429)):
+                        # V45.1：首个额度错误即熔断，后续血弹直接走副火控
+                        TTS_ROUTER.record_quota_error(
+                            tts_route,
+                            int(el_resp.status_code),
+                            elapsed_s=time.monotonic() - el_t0,
+                        )
                         raise ElevenQuotaExceeded(err, status_code=int(el_resp.status_code))
                     raise Exception(err)
 
@@ -3691,6 +4172,8 @@ async def generate_blood_bullet(
             else:
                 concat_mp3_ffmpeg(seg_paths, audio_path)
 
+            TTS_ROUTER.record_success(tts_route)
+
             # V8.1：音频质量锁死（44.1kHz）
             ensure_mp3_44100(audio_path)
 
@@ -3732,6 +4215,11 @@ async def generate_blood_bullet(
             else:
                 await tts_fallback_to_mp3(clean_text, audio_path, industry=str(industry))
             print(f"   [音频] 已降级，继续生产线: {af}")
+        except Exception:
+            # V45.1：非额度错误——退还预扣额度；若为半开探测则重新冷却
+            if tts_route is not None and tts_route.engine == "eleven":
+                TTS_ROUTER.record_error(tts_route)
+            raise
         finally:
             # V8.0：严禁发送后删除临时文件（用于统帅验收零件）
             if not v8_mode:
@@ -3744,21 +4232,34 @@ async def generate_blood_bullet(
 
         # === 3. 视频缝合 ===
         # V15.7：阻塞式缝合（宁可慢 5 秒，确保成品物理产出）
+        # V47.0：缝合直接 await（asyncio 子进程，不占执行器线程）；本任务被取消时 ffmpeg 随之终止
+        render_marks: set[tuple[str, int]] = set()
+
+        def _render_progress(ev: dict) -> None:
+            pct = ev.get("percent")
+            if pct is None:
+                return
+            mark = int(float(pct) // 25) * 25
+            key = (str(ev.get("stage") or ""), mark)
+            if mark and key not in render_marks:
+                render_marks.add(key)
+                print(f"   [缝合] {key[0]} {mark}%（{ev.get('speed') or '?'}x）")
+
         try:
             if render_semaphore:
                 async with render_semaphore:
-                    video_ok, _ = await asyncio.to_thread(
-                        video_stitcher,
+                    video_ok, _ = await video_stitcher_async(
                         str(audio_path),
                         str(video_path),
                         visual_profile=visual_profile,
+                        on_progress=_render_progress,
                     )
             else:
-                video_ok, _ = await asyncio.to_thread(
-                    video_stitcher,
+                video_ok, _ = await video_stitcher_async(
                     str(audio_path),
                     str(video_path),
                     visual_profile=visual_profile,
+                    on_progress=_render_progress,
                 )
             if not video_ok:
                 err = "视频缝合失败"
@@ -3843,11 +4344,15 @@ async def generate_blood_bullet(
                     # 消息②：mp3
                     await tg_send_mp3(client, str(audio_path), caption=f"{industry} 音频零件")
                     # 消息③：背景 jpg（若不存在则临时生成兜底图）
+                    await _join_bg_export()
                     if bg_jpg_path is None:
                         bg_jpg_path = Path(str(audio_path) + ".bg.jpg")
                     if not bg_jpg_path.exists():
                         try:
-                            export_background_jpg(industry=industry, visual_profile=visual_profile, output_jpg=bg_jpg_path)
+                            # V46.4：缓存未命中会跑一整发 ffmpeg，放到线程里不占事件循环
+                            await asyncio.to_thread(
+                                export_background_jpg, industry=industry, visual_profile=copy.deepcopy(visual_profile or {}), output_jpg=bg_jpg_path
+                            )
                         except Exception:
                             pass
                     if bg_jpg_path.exists():
@@ -4048,6 +4553,24 @@ async def main():
     if not check_ffmpeg():
         print("\n[中止] FFmpeg 未安装")
         return
+
+    # V46.1：清理上次崩溃残留的战备仓工位
+    try:
+        workspace.sweep_orphans()
+    except Exception:
+        pass
+
+    # V46.5：中文字体启动解析（结果缓存，全部 drawtext 共用）
+    try:
+        fonts.resolve_cjk_font()
+    except Exception:
+        pass
+
+    # V46.6：FFmpeg 能力探测（结果缓存，滤镜图按能力单发）
+    try:
+        ffmpeg_caps.get_caps()
+    except Exception:
+        pass
     
     # === 懒加载身份 ===
     lazy_load_identity()
@@ -4068,7 +4591,7 @@ async def main():
     print(f"\n[系统] 生产线已上线")
     if TELEGRAM_CHAT_ID:
         print(f"[系统] 目标群组: {TELEGRAM_CHAT_ID}")
-    print(f"[系统] V3 引擎: eleven_v3")
+    print(f"[系统] V3 引擎: {ELEVEN_TTS_MODEL_ID}")
     
     # === 权限测试 ===
     limits = httpx.Limits(max_keepalive_connections=5, max_connections=5)
@@ -4098,7 +4621,9 @@ async def main():
     print(f"[流控] Telegram 投递限流器已激活: 单管循环模式（最大并发 2）")
 
     # === V7.0 渲染队列：并发渲染上限 3 ===
-    render_semaphore = asyncio.Semaphore(3)
+    # V46.1：工位隔离后可安全调高（JUNSHI_RENDER_CONCURRENCY）
+    # V47.1：改为 CPU 感知调度——按 cgroup 配额 / 核数分配线程预算准入；JUNSHI_RENDER_CONCURRENCY 仅作路数封顶
+    render_semaphore = render_scheduler.get_scheduler()
     visual_engine = VisualEngine(safe_mode=True)
     
     # === 八大主权战区：全量开火 ===
@@ -4178,6 +4703,14 @@ async def main():
     print("\n" + "="*60)
     print(f"[结果] {success}/{len(targets)} 颗炸弹已部署")
     print(f"[位置] {base_dir}")
+    try:
+        rs = TTS_ROUTER.snapshot()
+        print(
+            f"[TTS 路由] ElevenLabs={rs['routed_eleven']} 副火控={rs['routed_fallback']} "
+            f"回退比例={rs['fallback_ratio']:.0%} 节省≈{rs['time_saved_s']:.1f}s 熔断={rs['breaker']['state']}"
+        )
+    except Exception:
+        pass
     print("="*60)
     
     # === 自动净空 ===
@@ -4297,7 +4830,7 @@ async def _saas_pipeline_task(app: "Application", *, chat_id: int, industry: str
                 folder,
                 semaphore=None,
                 visual_engine=VisualEngine(safe_mode=True),
-                render_semaphore=asyncio.Semaphore(1),
+                render_semaphore=render_scheduler.get_scheduler(),
             )
 
         parts = _pick_latest_parts(base_dir, industry)
@@ -4488,6 +5021,30 @@ def main_saas() -> None:
         _start_minimal_health_server()
     except Exception:
         pass
+
+    # V46.1：清理上次崩溃残留的战备仓工位
+    try:
+        workspace.sweep_orphans()
+    except Exception:
+        pass
+
+    # V46.5：中文字体启动解析（结果缓存，全部 drawtext 共用）
+    try:
+        fonts.resolve_cjk_font()
+    except Exception:
+        pass
+
+    # V46.6：FFmpeg 能力探测（结果缓存，滤镜图按能力单发）
+    try:
+        ffmpeg_caps.get_caps()
+    except Exception:
+        pass
+
+    # V47.1：渲染调度容量（cgroup 配额 / 核数）启动时定一次
+    try:
+        render_scheduler.get_scheduler()
+    except Exception:
+        pass
     
     # V38.0：暴力降维——云端空仓不下载，强制 gradient 生存模式
     if IS_CLOUD_ENV:
@@ -4501,7 +5058,8 @@ def main_saas() -> None:
             mp4_count = 0
             try:
                 if selfmedia_dir.exists():
-                    mp4_count = len(list(selfmedia_dir.glob("*.mp4")))
+                    # V45.5：素材索引计数
+                    mp4_count = media_index.get_index(factory_root).count(under="自媒体", exts={".mp4"})
             except Exception:
                 mp4_count = 0
             if mp4_count <= 0:
@@ -4641,7 +5199,7 @@ def main_saas() -> None:
             material_count = 0
             material_dir = Path("/tmp/Jiumo_Auto_Factory/自媒体")
             if material_dir.exists():
-                material_count = len(list(material_dir.glob("*.mp4")))
+                material_count = media_index.get_index(material_dir.parent).count(under="自媒体", exts={".mp4"})
             
             startup_msg = (
                 f"✓ [统帅部] 云端母机已自动完成环境变量装填\n"
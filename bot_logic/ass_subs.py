@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+V46.7 ASS 字幕轨（libass 单滤镜烧录）
+旧版每条字幕一个 drawtext（最多 12 个，各带 enable='between(t,..)'），每帧全量求值、命令行冗长。
+现在每次渲染写一个 .ass 文件，样式与 drawtext 版一致：
+- 字号 / 位置：PlayRes 1280x720 下像素一致（h-150 → 顶对齐 MarginV=570；h-(text_h)-70 → 底对齐 MarginV=70）
+- 半透明底框：Box 层 BorderStyle=3（不透明框，框色取 OutlineColour，black@0.30）
+- 描边白字：Text 层 BorderStyle=1，Outline=3，black@0.90
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+PLAY_RES = (1280, 720)
+
+_Y_TOP = re.compile(r"^\s*h\s*-\s*(\d+(?:\.\d+)?)\s*$")
+_Y_BOTTOM = re.compile(r"^\s*h\s*-\s*\(?\s*text_h\s*\)?\s*-\s*(\d+(?:\.\d+)?)\s*$")
+
+
+def _ass_alpha(opacity: float) -> str:
+    """drawtext 的 color@opacity → ASS 的 AA（00 不透明，FF 全透明）。"""
+    a = int(round(255 * (1.0 - max(0.0, min(1.0, float(opacity))))))
+    return f"{a:02X}"
+
+
+def _ass_time(t: float) -> str:
+    t = max(0.0, float(t))
+    cs = int(round(t * 100))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def _ass_text(s: str) -> str:
+    # 花括号会被当作样式覆写块、反斜杠是转义前缀：字幕文本里一律剔除
+    x = re.sub(r"[{}\\]", "", s or "")
+    return x.replace("\r", "").replace("\n", r"\N")
+
+
+def layout_from_y_expr(y_expr: str) -> tuple[int, int] | None:
+    """
+    drawtext 的 y 表达式 → (Alignment, MarginV)。
+    只认两种固定写法：h-N（文字顶边距底 N 像素）与 h-(text_h)-N（文字底边距底 N 像素）；其余返回 None。
+    """
+    m = _Y_TOP.match(y_expr or "")
+    if m:
+        return 8, max(0, PLAY_RES[1] - int(float(m.group(1))))
+    m = _Y_BOTTOM.match(y_expr or "")
+    if m:
+        return 2, int(float(m.group(1)))
+    return None
+
+
+def write_ass(
+    path: Path,
+    cues: list[tuple[float, float, str]],
+    *,
+    fontname: str,
+    fontsize: int = 60,
+    alignment: int = 8,
+    margin_v: int = 570,
+    box_pad: int = 18,
+    box_opacity: float = 0.30,
+    outline: int = 3,
+    outline_opacity: float = 0.90,
+) -> Path:
+    """写 ASS 文件（每条 cue 两层：底框层 + 描边文字层）。"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    box_col = f"&H{_ass_alpha(box_opacity)}000000"
+    line_col = f"&H{_ass_alpha(outline_opacity)}000000"
+    fmt = (
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+        "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, "
+        "MarginR, MarginV, Encoding"
+    )
+    fontname = (fontname or "sans-serif").replace(",", " ")
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {PLAY_RES[0]}",
+        f"PlayResY: {PLAY_RES[1]}",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        fmt,
+        # 底框层：文字全透明，只留 BorderStyle=3 的框（框色 = OutlineColour）
+        f"Style: Box,{fontname},{int(fontsize)},&HFF000000,&HFF000000,{box_col},&HFF000000,"
+        f"0,0,0,0,100,100,0,0,3,{int(box_pad)},0,{int(alignment)},20,20,{int(margin_v)},1",
+        f"Style: Text,{fontname},{int(fontsize)},&H00FFFFFF,&H00FFFFFF,{line_col},&HFF000000,"
+        f"0,0,0,0,100,100,0,0,1,{int(outline)},0,{int(alignment)},20,20,{int(margin_v)},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for start, end, text in cues:
+        t = _ass_text(text)
+        if not t or end <= start:
+            continue
+        lines.append(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Box,,0,0,0,,{t}")
+        lines.append(f"Dialogue: 1,{_ass_time(start)},{_ass_time(end)},Text,,0,0,0,,{t}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def _ff_filter_path(p: str | Path) -> str:
+    # ffmpeg 滤镜参数：统一正斜杠，盘符冒号 / 单引号转义
+    s = str(p).replace("\\", "/")
+    return s.replace(":", "\\:").replace("'", "\\'")
+
+
+def subtitles_filter(path: Path, *, fontsdir: str | Path | None = None) -> str:
+    """libass 烧录滤镜片段（不带前导逗号）。"""
+    f = f"subtitles=filename='{_ff_filter_path(path)}'"
+    if fontsdir:
+        f += f":fontsdir='{_ff_filter_path(fontsdir)}'"
+    return f
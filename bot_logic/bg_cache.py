@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+V46.4 背景 jpg 导出缓存
+- export_background_jpg 的产物完全由（源图路径 + 大小 + mtime、行业、字体、渐变色）决定
+- 命中：直接把缓存 jpg 硬链接到目标路径（跨盘则复制），不再拉起 ffmpeg
+- 未命中：调用方在缓存目录内渲染临时文件，成功后入库再链接出去（目标路径从不与缓存共享写入）
+- 容量：JUNSHI_BG_CACHE_MAX（默认 512 张），超出按 mtime 淘汰最旧
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from bot_logic import metrics
+from bot_logic.cachedir import cache_subdir
+
+# 渲染逻辑变更时递增，旧缓存自然失效
+KEY_VERSION = "v46.4"
+_LOCK = threading.Lock()
+
+
+def _max_entries() -> int:
+    try:
+        n = int((os.getenv("JUNSHI_BG_CACHE_MAX") or "").strip() or 512)
+    except Exception:
+        n = 512
+    return max(8, n)
+
+
+def source_stamp(path: str | Path | None) -> list[Any] | None:
+    """源文件指纹：[绝对路径, 大小, mtime_ns]；不存在返回 None。"""
+    if not path:
+        return None
+    try:
+        p = Path(str(path)).resolve()
+        st = p.stat()
+        return [str(p), int(st.st_size), int(st.st_mtime_ns)]
+    except Exception:
+        return None
+
+
+def make_key(**parts: Any) -> str:
+    body = json.dumps({"v": KEY_VERSION, **parts}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def _link_out(src: Path, dst: Path) -> None:
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if dst.is_symlink() or dst.exists():
+            dst.unlink()
+    except Exception:
+        pass
+    try:
+        os.link(src, dst)
+    except Exception:
+        shutil.copy2(src, dst)
+
+
+def _prune(d: Path) -> None:
+    try:
+        files = sorted(d.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+    except Exception:
+        return
+    extra = len(files) - _max_entries()
+    for p in files[: max(0, extra)]:
+        try:
+            p.unlink()
+        except Exception:
+            pass
+
+
+def fetch_or_render(key: str, dst: Path, render: Callable[[Path], bool]) -> bool:
+    """
+    命中则链接到 dst 返回 True；否则 render(临时路径) 生成，成功入库并链接。
+    缓存目录不可用时直接 render(dst)。
+    """
+    dst = Path(dst)
+    d = cache_subdir("bg_jpg")
+    hit = d / f"{key}.jpg"
+    try:
+        if hit.exists() and hit.stat().st_size > 0:
+            _link_out(hit, dst)
+            try:
+                os.utime(hit)  # 刷新 mtime：淘汰按最近使用
+            except Exception:
+                pass
+            metrics.incr("bg_jpg.hit")
+            return True
+    except Exception:
+        pass
+
+    metrics.incr("bg_jpg.miss")
+    tmp = d / f"{key}.{os.getpid()}.{threading.get_ident()}.part.jpg"
+    if not d.is_dir():
+        # 缓存盘不可用：直接渲染到目标路径（与旧行为一致）
+        return bool(render(dst))
+    try:
+        if not render(tmp) or not tmp.exists() or tmp.stat().st_size <= 0:
+            return False
+        tmp.replace(hit)
+        with _LOCK:
+            _prune(d)
+        _link_out(hit, dst)
+        return True
+    except Exception:
+        return False
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+V45.6 共享缓存目录（探测缓存 / 渐变图 / 水印精灵等落盘位置）
+优先级：JUNSHI_CACHE_DIR → XDG_CACHE_HOME/junshi → ~/.cache/junshi → 系统临时目录/junshi_cache
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def cache_root() -> Path:
+    candidates: list[Path] = []
+    env = (os.getenv("JUNSHI_CACHE_DIR") or "").strip()
+    if env:
+        candidates.append(Path(env))
+    xdg = (os.getenv("XDG_CACHE_HOME") or "").strip()
+    if xdg:
+        candidates.append(Path(xdg) / "junshi")
+    try:
+        candidates.append(Path.home() / ".cache" / "junshi")
+    except Exception:
+        pass
+    candidates.append(Path(tempfile.gettempdir()) / "junshi_cache")
+    for c in candidates:
+        try:
+            c.mkdir(parents=True, exist_ok=True)
+            if os.access(str(c), os.W_OK):
+                return c
+        except Exception:
+            continue
+    return candidates[-1]
+
+
+def cache_subdir(name: str) -> Path:
+    """缓存子目录（自动创建）。"""
+    p = cache_root() / name
+    try:
+        p.mkdir(parents=True, exist_ok=True)
+    except Exception:
+        pass
+    return p
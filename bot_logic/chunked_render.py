@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+V47.3 长渲染分块并行编码（单条成片跨多核）
+ultrafast 档的 libx264 单进程过了 3~4 线程就不再线性提速；长文案（≥30 秒）单条渲染吃不满大机器。
+- 切片计划按段边界切成 K 块（按帧数均衡），每块一个 ffmpeg：同一套逐段滤镜 + 同一套编码参数，
+  30fps / 闭合 GOP（-g 60 -keyint_min 60 -sc_threshold 0），块首必为 IDR
+- 水印 / 字幕在块内烧录：块内先 setpts 平移到全片时间轴（偏移 = 前面各段按 30fps 取整后的时长和），
+  呼吸相位、字幕起止与单进程成片逐帧一致，烧完再归零
+- concat demuxer `-c copy` 拼接各块 + 混入音频（只做封装，不再编码）
+- 块数 K：JUNSHI_RENDER_CHUNKS，默认 = 本路线程预算 / 2（上限 8）；每块分到 预算 / K 线程
+开关：JUNSHI_CHUNKED_RENDER=auto（默认，音频 ≥ JUNSHI_CHUNK_MIN_S 秒且 K≥2 时启用）/ 1 强制 / 0 关闭
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from dataclasses import dataclass
+
+from bot_logic import ffmpeg_runner, metrics
+
+FPS = 30
+GOP = 60
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def _mode() -> str:
+    m = (os.getenv("JUNSHI_CHUNKED_RENDER") or "auto").strip().lower()
+    return m if m in {"0", "1", "auto"} else "auto"
+
+
+def _threads_available() -> int:
+    budget = ffmpeg_runner.current_thread_budget()
+    if budget:
+        return budget[0]
+    from bot_logic.render_scheduler import cpu_capacity
+
+    return cpu_capacity()[0]
+
+
+def chunk_count(total_s: float, n_segs: int) -> int:
+    """本次渲染分几块；返回 1 表示不分块。"""
+    mode = _mode()
+    if mode == "0" or n_segs < 4:
+        return 1
+    if mode == "auto" and float(total_s) < _env_int("JUNSHI_CHUNK_MIN_S", 30):
+        return 1
+    k = _env_int("JUNSHI_RENDER_CHUNKS", 0) or _threads_available() // 2
+    return max(1, min(k, 8, n_segs // 2))
+
+
+def frames_of(d: float) -> int:
+    # fps 滤镜默认四舍五入取帧：块偏移按取整后的真实时长累加，避免字幕 / 水印相位漂移
+    return max(1, int(round(float(d) * FPS)))
+
+
+@dataclass(frozen=True)
+class Chunk:
+    first: int      # 起始段下标（含）
+    last: int       # 结束段下标（不含）
+    offset_s: float  # 块首在全片时间轴上的位置
+    dur_s: float
+
+
+def split_plan(seg_durs: list[float], k: int) -> list[Chunk]:
+    """按段边界把切片计划切成 k 块，各块帧数尽量均衡。"""
+    frames = [frames_of(d) for d in seg_durs]
+    total = sum(frames)
+    k = max(1, min(k, len(frames)))
+    chunks: list[Chunk] = []
+    first, acc, done = 0, 0, 0
+    for i, f in enumerate(frames):
+        acc += f
+        remaining_chunks = k - len(chunks) - 1
+        target = total * (len(chunks) + 1) / k
+        if remaining_chunks > 0 and done + acc >= target and len(frames) - (i + 1) >= remaining_chunks:
+            chunks.append(Chunk(first, i + 1, done / FPS, acc / FPS))
+            done += acc
+            first, acc = i + 1, 0
+    if first < len(frames):
+        chunks.append(Chunk(first, len(frames), done / FPS, acc / FPS))
+    return chunks
+
+
+def shift_tail(tail: str, offset_s: float) -> str:
+    """
+    "[vcat]" 之后的叠加链（水印 + 字幕，以 "[vout]" 收尾）→ 平移到全片时间轴再归零的版本。
+    """
+    body = tail[: -len("[vout]")] if tail.endswith("[vout]") else tail
+    return f"setpts=PTS+{offset_s:.6f}/TB,{body},setpts=PTS-STARTPTS[vout]"
+
+
+def encode_args(preset: str) -> list[str]:
+    """各块完全一致的编码参数（-c copy 拼接的前提）。"""
+    return [
+        "-an",
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", "24",
+        "-pix_fmt", "yuv420p",
+        "-r", str(FPS),
+        "-g", str(GOP),
+        "-keyint_min", str(GOP),
+        "-sc_threshold", "0",
+    ]
+
+
+async def run_parallel(cmds: list[list[str]], *, expected: list[float], stage: str = "分块编码") -> bool:
+    """各块并行编码；本路线程预算平分给各块。任一块失败返回 False（其余块照常收尾）。"""
+    per = max(1, _threads_available() // max(1, len(cmds)))
+
+    async def _one(i: int, cmd: list[str]) -> bool:
+        with ffmpeg_runner.thread_budget(per):
+            r = await ffmpeg_runner.run_async(cmd, expected_s=expected[i], stage=f"{stage}{i + 1}/{len(cmds)}")
+        if r.returncode != 0:
+            print(f"[分块] 第 {i + 1} 块失败: {(r.stderr or '')[-300:]}")
+        return r.returncode == 0
+
+    results = await asyncio.gather(*[_one(i, c) for i, c in enumerate(cmds)], return_exceptions=True)
+    ok = all(r is True for r in results)
+    metrics.incr("render.chunked_ok" if ok else "render.chunked_failed")
+    return ok
+
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+V45.9 GOP 对齐预切片库（clip bank）
+- 入库时把每条素材切成 2 秒闭合 GOP 小片（60 帧，首帧即关键帧），已带逐段滤镜（hflip + 调色）
+- 小片存放在素材旁的隐藏目录 .clips/<源名>.<源哈希>/，manifest.json 记录行业与每片时长
+- 渲染时按片挑选 → concat demuxer 直接拼接（单解码器顺序读），只剩水印/字幕叠加与混音需要编码
+- 有夹层（.mezz）则以夹层为输入切片，省一次 4K 解码
+命令行回填：python -m bot_logic.clip_bank --root <工厂根目录> --jobs 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from bot_logic import mezzanine
+from bot_logic.probe_cache import probe_duration
+
+CLIPS_DIRNAME = ".clips"
+CHUNK_SECONDS = 2.0
+MANIFEST = "manifest.json"
+
+
+def bank_dir(src: Path) -> Path | None:
+    digest = mezzanine.source_hash(src)
+    if not digest:
+        return None
+    return src.parent / CLIPS_DIRNAME / f"{src.stem}.{digest}"
+
+
+def load_chunks(src: Path) -> list[tuple[Path, float]] | None:
+    """已入库的小片：[(路径, 时长)]；未入库/清单损坏返回 None。"""
+    d = bank_dir(src)
+    if d is None:
+        return None
+    try:
+        body = json.loads((d / MANIFEST).read_text(encoding="utf-8"))
+        out = [(d / c["file"], float(c["dur"])) for c in body.get("chunks") or []]
+        return out or None
+    except Exception:
+        return None
+
+
+def _chunk_filter(src: Path) -> tuple[Path, str]:
+    """切片输入与滤镜：夹层优先（只补 hflip/调色），否则原片走完整 seg_filter 等价链。"""
+    m = mezzanine.find_mezzanine(src)
+    if m is not None:
+        return m[0], mezzanine.render_filter(m[1])
+    return src, "hflip," + mezzanine.NORMALIZE_FILTER + "," + mezzanine.RENDER_GRADE
+
+
+def build_bank(src: Path, *, industry: str = "", preset: str = "veryfast", crf: int = 20, timeout_s: float = 1800.0) -> list[tuple[Path, float]] | None:
+    """把单条素材切入片库；已存在直接返回。失败返回 None（不抛错）。"""
+    have = load_chunks(src)
+    if have:
+        return have
+    d = bank_dir(src)
+    if d is None:
+        return None
+    tmp = d.with_name(d.name + f".{os.getpid()}.part")
+    in_path, vf = _chunk_filter(src)
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True, exist_ok=True)
+        g = int(round(CHUNK_SECONDS * 30))
+        cmd = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", str(in_path),
+            "-an",
+            "-vf", vf,
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", str(int(crf)),
+            "-pix_fmt", "yuv420p",
+            "-r", "30",
+            "-g", str(g),
+            "-keyint_min", str(g),
+            "-sc_threshold", "0",
+            "-flags", "+cgop",
+            "-force_key_frames", f"expr:gte(t,n_forced*{CHUNK_SECONDS:g})",
+            "-f", "segment",
+            "-segment_time", f"{CHUNK_SECONDS:g}",
+            "-segment_format", "mp4",
+            "-reset_timestamps", "1",
+            str(tmp / "c_%04d.mp4"),
+        ]
+        r = subprocess.run(cmd, capture_output=True, timeout=timeout_s, encoding="utf-8", errors="ignore")
+        files = sorted(tmp.glob("c_*.mp4"))
+        if r.returncode != 0 or not files:
+            print(f"[片库] 切片失败: {src.name} {(r.stderr or '')[-300:]}")
+            return None
+        chunks: list[dict] = []
+        for i, f in enumerate(files):
+            # 末片可能不足 2 秒：实测时长；过短（<1 秒）直接丢弃
+            dur = CHUNK_SECONDS if i < len(files) - 1 else probe_duration(f)
+            if dur < 1.0:
+                f.unlink(missing_ok=True)
+                continue
+            chunks.append({"file": f.name, "dur": round(float(dur), 3)})
+        (tmp / MANIFEST).write_text(
+            json.dumps({"source": src.name, "industry": industry, "chunk_seconds": CHUNK_SECONDS, "chunks": chunks}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        shutil.rmtree(d, ignore_errors=True)
+        tmp.replace(d)
+        return load_chunks(src)
+    except Exception as e:
+        print(f"[片库] 切片异常: {src.name} {e}")
+        return None
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def min_banked_share() -> float:
+    """片库命中所需的已入库源占比（JUNSHI_CLIP_BANK_MIN_SHARE，默认 1.0 = 全部入库）。"""
+    try:
+        v = float((os.getenv("JUNSHI_CLIP_BANK_MIN_SHARE") or "").strip() or 1.0)
+    except Exception:
+        v = 1.0
+    return min(1.0, max(0.0, v))
+
+
+def plan_from_bank(
+    sources: list[Path],
+    *,
+    total_s: float,
+    max_chunks: int = 400,
+    min_share: float | None = None,
+) -> list[tuple[Path, float]] | None:
+    """
+    按片填满 total_s：素材轮转、每源随机取片且尽量不重复。
+    已入库源占比低于 min_share（默认全部入库）返回 None，避免少数源循环铺满整片；
+    调用方回退逐段滤镜缝合。只在达标时剔除未入库源。
+    """
+    if not sources:
+        return None
+    banks = {s: load_chunks(s) for s in sources}
+    banks = {s: list(c) for s, c in banks.items() if c}
+    share = min_banked_share() if min_share is None else min(1.0, max(0.0, float(min_share)))
+    if not banks or len(banks) < share * len(sources) - 1e-9:
+        return None
+    order = list(banks)
+    random.shuffle(order)
+    for s in order:
+        random.shuffle(banks[s])
+    plan: list[tuple[Path, float]] = []
+    t = 0.0
+    i = 0
+    empty = 0
+    while t < float(total_s) - 0.05 and len(plan) < max_chunks:
+        s = order[i % len(order)]
+        i += 1
+        if not banks[s]:
+            banks[s] = list(load_chunks(s) or [])
+            random.shuffle(banks[s])
+            if not banks[s]:
+                # 片库在渲染期间被清掉：一整轮都重载为空即放弃，交给逐段滤镜缝合
+                empty += 1
+                if empty >= len(order):
+                    return None
+                continue
+        empty = 0
+        c = banks[s].pop()
+        plan.append(c)
+        t += c[1]
+    return plan or None
+
+
+def write_concat_list(chunks: list[Path], list_file: Path) -> None:
+    """concat demuxer 清单（单引号按 ffmpeg 规则转义）。"""
+    list_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(list_file, "w", encoding="utf-8") as f:
+        for p in chunks:
+            q = Path(p).absolute().as_posix().replace("'", "'\\''")
+            f.write(f"file '{q}'\n")
+
+
+def backfill(root: Path, *, jobs: int = 2, preset: str = "veryfast", dry_run: bool = False) -> tuple[int, int, int]:
+    """为工厂内全部视频建片库：返回 (新入库, 已存在, 失败)。"""
+    from bot_logic import media_index
+
+    idx = media_index.get_index(root)
+    idx.refresh(force=True)
+    recs = idx.records(exts=media_index.VIDEO_EXTS, refresh=False)
+    todo = [r for r in recs if not load_chunks(r["path"])]
+    ready = len(recs) - len(todo)
+    print(f"[片库] 素材 {len(recs)} 条：已入库 {ready}，待切片 {len(todo)}（并行 {jobs}）")
+    if dry_run or not todo:
+        return 0, ready, 0
+    done = failed = 0
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, int(jobs)), thread_name_prefix="clipbank") as ex:
+        futs = {ex.submit(build_bank, r["path"], industry=r["industry"], preset=preset): r["path"] for r in todo}
+        for i, fut in enumerate(as_completed(futs), 1):
+            if fut.result():
+                done += 1
+            else:
+                failed += 1
+            print(f"[片库] {i}/{len(todo)} {futs[fut].name} ({time.monotonic() - t0:.0f}s)")
+    return done, ready, failed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="工厂素材 2 秒闭合 GOP 预切片入库")
+    ap.add_argument("--root", default=os.getenv("JIUMO_FACTORY_DIR") or "", help="工厂根目录（默认 JIUMO_FACTORY_DIR）")
+    ap.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="并行切片数")
+    ap.add_argument("--preset", default="veryfast")
+    ap.add_argument("--dry-run", action="store_true", help="只统计不切片")
+    args = ap.parse_args(argv)
+    root = Path(args.root).expanduser()
+    if not args.root or not root.is_dir():
+        print(f"[片库] 工厂根目录不存在: {root}")
+        return 2
+    done, ready, failed = backfill(root, jobs=args.jobs, preset=args.preset, dry_run=args.dry_run)
+    print(f"[片库] 完成：新入库 {done}，已存在 {ready}，失败 {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+V47.2 动态缝合输入去重（每个唯一素材只开一个 demuxer / 解码器）
+旧版每个切片一个 `-stream_loop -1 -ss … -t … -i`：60 秒音频约 30~40 段、最多 80 段，
+而素材只有 4~10 条——ffmpeg 同时打开几十个解封装器 + 解码器，内存、起播时间、文件句柄全线吃紧。
+现在：
+- 每条素材一个输入（-ss 到它第一段的起点，-t 截到它最后一段的终点），滤镜图里 split 成 k 路，
+  每路 trim + setpts 截出自己的片段，再接原逐段滤镜（翻转 / 放大裁切 / 调色）
+- 同一素材的各段起点在素材时间轴上单调递增、互不重叠：解码器顺序走一遍即可供给全部片段，
+  split 各分支不会囤积整段帧（未轮到的片段在 trim 里直接丢弃）
+- 素材总长不够（或时长未知）时从 0 起连续取片、靠 -stream_loop 循环续上
+JUNSHI_DEDUP_INPUTS=0 回退旧版逐段输入。
+"""
+
+from __future__ import annotations
+
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+
+def enabled() -> bool:
+    return (os.getenv("JUNSHI_DEDUP_INPUTS") or "1").strip() != "0"
+
+
+@dataclass
+class SourceInput:
+    """一个唯一素材输入：ss = 输入级起点；cuts = [(段序号, 相对 ss 的起点, 时长)]。"""
+
+    src: Path
+    ss: float = 0.0
+    span: float = 0.0
+    cuts: list[tuple[int, float, float]] = field(default_factory=list)
+
+
+def plan(
+    segs: list[tuple[Path, float, float]],
+    sd_map: dict[Path, float],
+    *,
+    rng: random.Random | None = None,
+) -> tuple[list[tuple[Path, float, float]], list[SourceInput]]:
+    """
+    按素材归组并重排每段起点（保持段序、段长、素材轮转不变）。
+    返回 (新 segs, 输入表)；新 segs 的 start 是素材内真实位置，可直接给 concat 降级路径用。
+    """
+    rng = rng or random
+    order: list[Path] = []
+    groups: dict[Path, list[int]] = {}
+    for i, (src, _start, _d) in enumerate(segs):
+        if src not in groups:
+            groups[src] = []
+            order.append(src)
+        groups[src].append(i)
+
+    new_segs = list(segs)
+    inputs: list[SourceInput] = []
+    for src in order:
+        idxs = groups[src]
+        durs = [float(segs[i][2]) for i in idxs]
+        total = sum(durs)
+        sd = float(sd_map.get(src) or 0.0)
+        slack = sd - total - 0.2
+        positions: list[float] = []
+        if sd > 0 and slack > 0:
+            # 一遍走完：首段随机起点 + 段间随机间隔（每个间隔不超过一段长度，解码浪费有上限）
+            p = rng.uniform(0.0, slack * 0.5)
+            left = slack - p
+            for d in durs:
+                positions.append(p)
+                gap = rng.uniform(0.0, min(d, left / max(1, len(durs))))
+                left -= gap
+                p += d + gap
+            ss = positions[0]
+        else:
+            # 素材不够长 / 时长未知：从 0 连续取片，-stream_loop 循环续上
+            p = 0.0
+            for d in durs:
+                positions.append(p)
+                p += d
+            ss = 0.0
+        inp = SourceInput(src=src, ss=ss, span=positions[-1] + durs[-1] - ss)
+        for i, pos, d in zip(idxs, positions, durs):
+            inp.cuts.append((i, pos - ss, d))
+            new_segs[i] = (src, (pos % sd) if sd > 0 else 0.0, d)
+        inputs.append(inp)
+    return new_segs, inputs
+
+
+def input_args(inputs: list[SourceInput], path_of: Callable[[Path], str]) -> list[str]:
+    args: list[str] = []
+    for inp in inputs:
+        args += ["-stream_loop", "-1"]
+        if inp.ss > 0:
+            args += ["-ss", f"{inp.ss:.3f}"]
+        # 余量 0.5 秒：防止末段因帧边界少一帧
+        args += ["-t", f"{inp.span + 0.5:.3f}", "-i", path_of(inp.src)]
+    return args
+
+
+def filter_prefix(inputs: list[SourceInput], filter_of: Callable[[Path], str]) -> list[str]:
+    """split + trim/setpts + 逐段滤镜；第 i 段输出标签 [v{i}]（与旧版一致，后接 concat）。"""
+    chains: list[str] = []
+    for n, inp in enumerate(inputs):
+        f = filter_of(inp.src)
+        k = len(inp.cuts)
+        if k == 1:
+            heads = [f"[{n}:v]"]
+        else:
+            labels = [f"[u{n}_{m}]" for m in range(k)]
+            chains.append(f"[{n}:v]split={k}{''.join(labels)}")
+            heads = labels
+        for head, (seg_i, rel, d) in zip(heads, inp.cuts):
+            chains.append(f"{head}trim=start={rel:.3f}:duration={d:.3f},setpts=PTS-STARTPTS,{f}[v{seg_i}]")
+    return chains
+
+
+def group_fixed(segs: list[tuple[Path, float, float]]) -> list[SourceInput]:
+    """
+    按给定起点归组（不重排，分块渲染用）：同一素材的连续单调、不重叠片段合用一个输入，
+    起点回绕（循环素材）处另起一个输入。cuts 的段序号为 segs 内的局部下标。
+    """
+    inputs: list[SourceInput] = []
+    open_by_src: dict[Path, SourceInput] = {}
+    for i, (src, start, d) in enumerate(segs):
+        inp = open_by_src.get(src)
+        if inp is not None:
+            _last_i, last_rel, last_d = inp.cuts[-1]
+            if start >= inp.ss + last_rel + last_d:
+                inp.cuts.append((i, float(start) - inp.ss, float(d)))
+                inp.span = float(start) - inp.ss + float(d)
+                continue
+        inp = SourceInput(src=src, ss=float(start), span=float(d), cuts=[(i, 0.0, float(d))])
+        open_by_src[src] = inp
+        inputs.append(inp)
+    return inputs
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+V45.2 edge-tts 对冲执行（替代逐个音色 15 秒串行超时）
+- 主音色先发；超过主音色滚动 p90 仍未完成 → 启动备音色
+- 谁先成功用谁，另一路立即取消
+- 每音色延迟直方图 + 熔断器，进程内所有血弹共享
+导出：metrics provider: edge_tts
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from bot_logic import metrics
+from bot_logic.tts_router import CircuitBreaker
+
+try:
+    import edge_tts  # type: ignore
+except Exception:
+    edge_tts = None  # type: ignore
+
+
+class LatencyHistogram:
+    """滚动窗口延迟统计：分位数用于对冲时机，分桶用于导出。"""
+
+    BUCKETS = (0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 12.0, 15.0, math.inf)
+
+    def __init__(self, *, window: int = 64):
+        self._lock = threading.Lock()
+        self._samples: deque[float] = deque(maxlen=max(8, int(window)))
+        self._bucket_counts = [0] * len(self.BUCKETS)
+
+    def observe(self, seconds: float) -> None:
+        s = max(0.0, float(seconds))
+        with self._lock:
+            self._samples.append(s)
+            for i, edge in enumerate(self.BUCKETS):
+                if s <= edge:
+                    self._bucket_counts[i] += 1
+                    break
+
+    def quantile(self, q: float, *, default: float) -> float:
+        with self._lock:
+            xs = sorted(self._samples)
+        if len(xs) < 3:
+            return default
+        idx = min(len(xs) - 1, max(0, int(math.ceil(q * len(xs))) - 1))
+        return xs[idx]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            xs = sorted(self._samples)
+            buckets = {("+inf" if math.isinf(e) else f"le_{e:g}"): c for e, c in zip(self.BUCKETS, self._bucket_counts)}
+
+        def _q(q: float) -> float | None:
+            if not xs:
+                return None
+            return round(xs[min(len(xs) - 1, max(0, int(math.ceil(q * len(xs))) - 1))], 3)
+
+        return {"count": len(xs), "p50": _q(0.5), "p90": _q(0.9), "buckets": buckets}
+
+
+class _VoiceState:
+    def __init__(self, voice: str):
+        self.voice = voice
+        self.latency = LatencyHistogram()
+        # 连续失败 2 次才熔断（偶发抖动不误伤）
+        self.breaker = CircuitBreaker(f"edge:{voice}", cooldown_s=60.0)
+        self.consecutive_failures = 0
+        self.wins = 0
+        self.hedges_started = 0
+        self.cancelled = 0
+
+    def record_success(self, elapsed_s: float) -> None:
+        self.latency.observe(elapsed_s)
+        self.consecutive_failures = 0
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= 2:
+            self.breaker.record_failure()
+        else:
+            # 未达熔断阈值：若为半开探测则释放探测位
+            self.breaker.release_probe()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "latency": self.latency.snapshot(),
+            "breaker": self.breaker.snapshot(),
+            "wins": self.wins,
+            "hedges_started": self.hedges_started,
+            "cancelled": self.cancelled,
+        }
+
+
+_VOICES: dict[str, _VoiceState] = {}
+_VOICES_LOCK = threading.Lock()
+
+
+def _voice_state(voice: str) -> _VoiceState:
+    with _VOICES_LOCK:
+        st = _VOICES.get(voice)
+        if st is None:
+            st = _VoiceState(voice)
+            _VOICES[voice] = st
+        return st
+
+
+def _tmp_path_for(mp3_path: Path, voice: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", voice).strip("_") or "voice"
+    return mp3_path.with_name(f"{mp3_path.stem}.{slug}.hedge.tmp.mp3")
+
+
+async def _synth_one(text: str, voice: str, out_path: Path, *, rate: str | None, volume: str | None) -> float:
+    kwargs: dict[str, Any] = {"text": text, "voice": voice}
+    if rate:
+        kwargs["rate"] = rate
+    if volume:
+        kwargs["volume"] = volume
+    t0 = time.monotonic()
+    comm = edge_tts.Communicate(**kwargs)
+    await comm.save(str(out_path))
+    if not out_path.exists() or out_path.stat().st_size <= 0:
+        raise RuntimeError(f"edge-tts 空输出: {voice}")
+    return time.monotonic() - t0
+
+
+async def hedged_edge_tts(
+    text: str,
+    mp3_path: Path,
+    *,
+    voices: list[str],
+    rate: str | None = None,
+    volume: str | None = None,
+    deadline_s: float = 15.0,
+    min_hedge_s: float = 1.0,
+    default_p90_s: float = 3.0,
+) -> str:
+    """
+    对冲合成：返回获胜音色；全部失败/总超时抛 RuntimeError。
+    总时长上限 deadline_s（替代旧版每音色 15 秒 × N 的串行上限）。
+    """
+    if edge_tts is None:
+        raise RuntimeError("edge-tts 未安装")
+    t = (text or "").strip()
+    if not t:
+        raise RuntimeError("edge tts text empty")
+    order = list(dict.fromkeys([v for v in voices if v]))
+    if not order:
+        raise RuntimeError("edge tts voices empty")
+
+    mp3_path.parent.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max(1.0, float(deadline_s))
+    pending_voices = deque(order)
+    running: dict[asyncio.Task, tuple[_VoiceState, Path]] = {}
+    last_err: BaseException | None = None
+
+    def _launch_next(*, hedge: bool) -> bool:
+        while pending_voices:
+            v = pending_voices.popleft()
+            st = _voice_state(v)
+            allowed, _probe = st.breaker.allow()
+            if not allowed:
+                continue
+            tmp = _tmp_path_for(mp3_path, v)
+            task = asyncio.create_task(_synth_one(t, v, tmp, rate=rate, volume=volume))
+            running[task] = (st, tmp)
+            if hedge:
+                st.hedges_started += 1
+                metrics.incr("edge_tts.hedges_started")
+            return True
+        return False
+
+    def _cleanup(paths: list[Path]) -> None:
+        for p in paths:
+            try:
+                p.unlink(missing_ok=True)
+            except Exception:
+                pass
+
+    if not _launch_next(hedge=False):
+        raise RuntimeError("edge-tts 全部音色熔断中")
+
+    try:
+        while running:
+            now = loop.time()
+            if now >= deadline:
+                break
+            # 还有备音色且只有 1 路在飞：等到主音色 p90 再对冲
+            if pending_voices and len(running) == 1:
+                st_head, _ = next(iter(running.values()))
+                hedge_after = max(float(min_hedge_s), st_head.latency.quantile(0.9, default=default_p90_s))
+                wait_s = min(hedge_after, deadline - now)
+            else:
+                wait_s = deadline - now
+
+            done, _ = await asyncio.wait(set(running), timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # p90 已过仍未返回：启动下一音色对冲（总超时则交给循环头处理）
+                if loop.time() < deadline:
+                    _launch_next(hedge=True)
+                continue
+
+            for task in done:
+                st, tmp = running.pop(task)
+                exc = task.exception()
+                if exc is None:
+                    st.record_success(task.result())
+                    st.wins += 1
+                    tmp.replace(mp3_path)
+                    metrics.incr("edge_tts.ok")
+                    return st.voice
+                last_err = exc
+                st.record_failure()
+                _cleanup([tmp])
+            # 当前在飞全部失败：立刻补位下一音色（不必等 p90）
+            if not running:
+                _launch_next(hedge=True)
+
+        # 总超时：在飞音色全部记失败（卡死的端点需要熔断）
+        for task, (st, tmp) in list(running.items()):
+            st.latency.observe(float(deadline_s))
+            st.record_failure()
+        metrics.incr("edge_tts.failed")
+        raise RuntimeError(f"edge-tts failed: {last_err or 'deadline exceeded'}")
+    finally:
+        for task, (st, tmp) in list(running.items()):
+            if not task.done():
+                task.cancel()
+                st.cancelled += 1
+                # 被取消的慢路不算失败；若持有半开探测位则归还
+                st.breaker.release_probe()
+        if running:
+            await asyncio.gather(*running.keys(), return_exceptions=True)
+            _cleanup([tmp for _st, tmp in running.values()])
+
+
+def snapshot() -> dict[str, Any]:
+    with _VOICES_LOCK:
+        states = dict(_VOICES)
+    return {v: st.snapshot() for v, st in states.items()}
+
+
+metrics.register_provider("edge_tts", snapshot)
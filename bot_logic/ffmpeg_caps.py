@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+V46.6 FFmpeg 能力探测（启动时一次：-filters / -encoders / -buildconf）
+滤镜图构建按能力矩阵只出“当前构建能跑”的最优一版，不再逐个试错：
+- 无 drawtext（无 libfreetype）→ 直接出无字版
+- 无 libfribidi / libharfbuzz → drawtext 不带 text_shaping
+- 无 libfontconfig 且无字体文件 → font='名称' 必败，直接出无字版
+- 无 libass → 不用 subtitles/ass 滤镜
+重试只留给真正的运行期错误。探测失败（ffmpeg 缺失/输出异常）时视为“全能”，沿用旧版逐级降级。
+"""
+
+from __future__ import annotations
+
+import re
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass, field
+
+from bot_logic import metrics
+
+_FILTER_LINE = re.compile(r"^\s*[TSC.|]{2,3}\s+(\S+)\s+\S+->\S+")
+_ENCODER_LINE = re.compile(r"^\s*[VAS][F.][S.][X.][B.][D.]\s+(\w[\w-]*)")
+
+
+@dataclass(frozen=True)
+class FFmpegCaps:
+    known: bool = False
+    version: str = ""
+    filters: frozenset[str] = field(default_factory=frozenset)
+    encoders: frozenset[str] = field(default_factory=frozenset)
+    buildconf: frozenset[str] = field(default_factory=frozenset)
+
+    def has_filter(self, name: str) -> bool:
+        return (not self.known) or name in self.filters
+
+    def has_encoder(self, name: str) -> bool:
+        return (not self.known) or name in self.encoders
+
+    def _enabled(self, lib: str) -> bool:
+        return (not self.known) or f"--enable-{lib}" in self.buildconf
+
+    @property
+    def drawtext(self) -> bool:
+        return self.has_filter("drawtext")
+
+    @property
+    def text_shaping(self) -> bool:
+        # drawtext 的 text_shaping 依赖 fribidi（6.1 起排版走 harfbuzz）
+        return self.drawtext and (self._enabled("libfribidi") or self._enabled("libharfbuzz"))
+
+    @property
+    def font_by_name(self) -> bool:
+        # drawtext=font='名称' 需要 libfontconfig；否则只能用 fontfile
+        return self.drawtext and self._enabled("libfontconfig")
+
+    @property
+    def libass(self) -> bool:
+        return self._enabled("libass") and self.has_filter("subtitles")
+
+    @property
+    def libx264(self) -> bool:
+        return self.has_encoder("libx264")
+
+    def matrix(self) -> dict:
+        return {
+            "known": self.known,
+            "version": self.version,
+            "drawtext": self.drawtext,
+            "text_shaping": self.text_shaping,
+            "font_by_name": self.font_by_name,
+            "libass": self.libass,
+            "libx264": self.libx264,
+        }
+
+
+def _run(args: list[str]) -> str:
+    try:
+        r = subprocess.run(args, capture_output=True, timeout=20, encoding="utf-8", errors="ignore")
+        return (r.stdout or "") if r.returncode == 0 else ""
+    except Exception:
+        return ""
+
+
+def probe_caps(ffmpeg: str = "ffmpeg") -> FFmpegCaps:
+    if not shutil.which(ffmpeg):
+        return FFmpegCaps()
+    base = [ffmpeg, "-hide_banner"]
+    filters_out = _run(base + ["-filters"])
+    encoders_out = _run(base + ["-encoders"])
+    buildconf_out = _run(base + ["-buildconf"])
+    filters = frozenset(m.group(1) for ln in filters_out.splitlines() if (m := _FILTER_LINE.match(ln)))
+    encoders = frozenset(m.group(1) for ln in encoders_out.splitlines() if (m := _ENCODER_LINE.match(ln)))
+    if not filters or not encoders:
+        return FFmpegCaps()
+    conf = frozenset(t for t in buildconf_out.split() if t.startswith("--"))
+    version = ""
+    m = re.search(r"ffmpeg version (\S+)", _run([ffmpeg, "-version"]))
+    if m:
+        version = m.group(1)
+    return FFmpegCaps(known=True, version=version, filters=filters, encoders=encoders, buildconf=conf)
+
+
+_CAPS: FFmpegCaps | None = None
+_LOCK = threading.Lock()
+
+
+def get_caps(*, refresh: bool = False) -> FFmpegCaps:
+    """进程内缓存的能力矩阵（首次调用时探测并打印）。"""
+    global _CAPS
+    with _LOCK:
+        if _CAPS is None or refresh:
+            _CAPS = probe_caps()
+            mx = _CAPS.matrix()
+            if _CAPS.known:
+                print(
+                    f"[火控] FFmpeg {mx['version'] or '?'} 能力矩阵: drawtext={mx['drawtext']} "
+                    f"text_shaping={mx['text_shaping']} font_by_name={mx['font_by_name']} libass={mx['libass']} libx264={mx['libx264']}"
+                )
+            else:
+                print("[火控] FFmpeg 能力探测失败，按全能力构图（运行期逐级降级）")
+        return _CAPS
+
+
+def snapshot() -> dict:
+    return _CAPS.matrix() if _CAPS is not None else {"known": False, "probed": False}
+
+
+metrics.register_provider("ffmpeg_caps", snapshot)
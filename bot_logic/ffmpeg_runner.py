@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+V46.9 FFmpeg 进度感知执行器（取代固定 timeout=120 的 subprocess.run）
+旧版：健康但较长的渲染（4K / 长音频）到 120 秒被一刀切，前功尽弃；真正卡死的进程却要白占渲染槽满 2 分钟。
+现在：
+- 命令自动加 -progress pipe:1 -nostats，逐块解析 out_time / speed / frame
+- 停滞判定：JUNSHI_FFMPEG_STALL_S（默认 30 秒）内 out_time 与 frame 均无推进 → 立即击杀
+- 总时限随音频时长伸缩：JUNSHI_FFMPEG_DEADLINE_MIN_S（默认 120）+ JUNSHI_FFMPEG_DEADLINE_FACTOR（默认 4）× 预期时长
+- stderr 只保留尾部环形缓冲（JUNSHI_FFMPEG_STDERR_LINES，默认 200 行），日志够用、内存有界
+- 超时抛 FFmpegTimeout（subprocess.TimeoutExpired 子类），原有 except 分支无需改动
+- 进度挂到当前渲染任务（job 上下文）：/metrics 的 ffmpeg 段与健康端口 /jobs 可见
+V47.0：run_async —— asyncio 子进程版，渲染全程不占执行器线程；任务取消即 SIGTERM → SIGKILL 子进程，
+每个进度块回调 job(on_progress=...)（异步进度事件）
+V47.1：thread_budget(threads, filter_threads) —— 渲染调度分配的线程预算，本上下文内的 ffmpeg 自动带
+-threads / -filter_threads / -filter_complex_threads（命令里已显式指定 -threads 的不动）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import inspect
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from bot_logic import metrics
+
+_JOB: contextvars.ContextVar[str | None] = contextvars.ContextVar("ffmpeg_runner_job", default=None)
+_LOCK = threading.Lock()
+_JOBS: dict[str, dict] = {}
+_RUNNING: dict[int, dict] = {}
+_CALLBACKS: dict[str, Callable[[dict], Any]] = {}
+_BUDGET: contextvars.ContextVar[tuple[int, int] | None] = contextvars.ContextVar("ffmpeg_runner_budget", default=None)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def stall_window_s() -> float:
+    return max(5.0, _env_float("JUNSHI_FFMPEG_STALL_S", 30.0))
+
+
+def deadline_for(expected_s: float | None) -> float:
+    """总时限：保底 + 倍率 × 预期输出时长；时长未知按保底 5 倍。"""
+    floor = max(30.0, _env_float("JUNSHI_FFMPEG_DEADLINE_MIN_S", 120.0))
+    if not expected_s or expected_s <= 0:
+        return floor * 5
+    return floor + max(1.0, _env_float("JUNSHI_FFMPEG_DEADLINE_FACTOR", 4.0)) * float(expected_s)
+
+
+def _stderr_lines() -> int:
+    return max(20, int(_env_float("JUNSHI_FFMPEG_STDERR_LINES", 200)))
+
+
+class FFmpegTimeout(subprocess.TimeoutExpired):
+    """停滞 / 超总时限被击杀；reason 为 "stall" 或 "deadline"。"""
+
+    def __init__(self, cmd, timeout: float, *, reason: str, stderr: str = "", out_time_s: float = 0.0):
+        super().__init__(cmd, timeout, output="", stderr=stderr)
+        self.reason = reason
+        self.out_time_s = out_time_s
+
+    def __str__(self) -> str:
+        what = "进度停滞" if self.reason == "stall" else "超出总时限"
+        return f"FFmpeg {what} {self.timeout:.0f} 秒（已出片 {self.out_time_s:.1f} 秒）"
+
+
+@dataclass
+class FFmpegResult:
+    """与 CompletedProcess 同形（returncode / stdout / stderr），stderr 为尾部环形缓冲。"""
+
+    args: list[str]
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    out_time_s: float = 0.0
+    speed: float | None = None
+    elapsed_s: float = 0.0
+    progress: dict = field(default_factory=dict)
+
+
+@contextlib.contextmanager
+def job(label: str, *, on_progress: Callable[[dict], Any] | None = None) -> Iterator[str]:
+    """
+    标记当前渲染任务；期间所有 run()/run_async() 的进度汇总到该任务（to_thread 会复制上下文）。
+    on_progress：每个进度块回调一次（run_async 在事件循环内调用，可为协程函数）。
+    """
+    label = str(label or "job")
+    token = _JOB.set(label)
+    with _LOCK:
+        _JOBS[label] = {"job": label, "stage": "", "started": time.time(), "runs": 0}
+        if on_progress is not None:
+            _CALLBACKS[label] = on_progress
+    try:
+        yield label
+    finally:
+        _JOB.reset(token)
+        with _LOCK:
+            _JOBS.pop(label, None)
+            _CALLBACKS.pop(label, None)
+
+
+def _parse_out_time(block: dict[str, str]) -> float | None:
+    us = block.get("out_time_us") or block.get("out_time_ms")  # 老版本 out_time_ms 实为微秒
+    if us and us.lstrip("-").isdigit():
+        return max(0.0, int(us) / 1_000_000)
+    t = block.get("out_time") or ""
+    try:
+        h, m, s = t.split(":")
+        return max(0.0, int(h) * 3600 + int(m) * 60 + float(s))
+    except Exception:
+        return None
+
+
+def _parse_speed(v: str | None) -> float | None:
+    try:
+        return float(str(v or "").strip().rstrip("x"))
+    except Exception:
+        return None
+
+
+def _with_progress(cmd: list[str]) -> list[str]:
+    if "-progress" in cmd:
+        return list(cmd)
+    return [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+
+@contextlib.contextmanager
+def thread_budget(threads: int, filter_threads: int | None = None) -> Iterator[None]:
+    """本上下文内的 ffmpeg 按给定线程预算运行（to_thread / create_task 会继承）。"""
+    token = _BUDGET.set((max(1, int(threads)), max(1, int(filter_threads or threads))))
+    try:
+        yield
+    finally:
+        _BUDGET.reset(token)
+
+
+def set_thread_budget(threads: int | None, filter_threads: int | None = None) -> contextvars.Token:
+    """thread_budget 的非 with 形式（async 上下文管理器 __aenter__ 用）；返回值交给 reset_thread_budget。"""
+    if not threads:
+        return _BUDGET.set(None)
+    return _BUDGET.set((max(1, int(threads)), max(1, int(filter_threads or threads))))
+
+
+def reset_thread_budget(token: contextvars.Token) -> None:
+    _BUDGET.reset(token)
+
+
+def current_thread_budget() -> tuple[int, int] | None:
+    """当前上下文的 (threads, filter_threads)；未经调度返回 None。"""
+    return _BUDGET.get()
+
+
+def _with_threads(cmd: list[str]) -> list[str]:
+    budget = _BUDGET.get()
+    if not budget or "-threads" in cmd or len(cmd) < 2:
+        return list(cmd)
+    threads, filter_threads = budget
+    # 滤镜线程是全局选项（紧跟程序名）；-threads 作输出选项放在成品路径之前
+    return [
+        cmd[0], "-filter_threads", str(filter_threads), "-filter_complex_threads", str(filter_threads),
+        *cmd[1:-1], "-threads", str(threads), cmd[-1],
+    ]
+
+
+class _Tracker:
+    """一次 ffmpeg 执行的进度状态（同步 / 异步执行器共用）。"""
+
+    def __init__(self, cmd: list[str], *, expected_s: float | None, stage: str, stall_s: float | None, deadline_s: float | None):
+        self.cmd = _with_progress(_with_threads(cmd))
+        self.expected_s = expected_s
+        self.stage = stage
+        self.stall = float(stall_s or stall_window_s())
+        self.deadline = float(deadline_s or deadline_for(expected_s))
+        self.ring: collections.deque[str] = collections.deque(maxlen=_stderr_lines())
+        self.job = _JOB.get()
+        self.t0 = time.monotonic()
+        self.pid: int | None = None
+        self.block: dict[str, str] = {}
+        self.state = {
+            "job": self.job,
+            "stage": stage,
+            "threads": (_BUDGET.get() or (None,))[0],
+            "out_time_s": 0.0,
+            "frame": 0,
+            "speed": None,
+            "expected_s": expected_s,
+            "percent": None,
+            "last_advance": self.t0,
+            "block": {},
+        }
+
+    def started(self, pid: int) -> None:
+        self.pid = pid
+        metrics.incr("ffmpeg.runs")
+        with _LOCK:
+            _RUNNING[pid] = self.state
+            if self.job in _JOBS:
+                _JOBS[self.job]["stage"] = self.stage
+                _JOBS[self.job]["runs"] += 1
+
+    def feed_progress(self, line: str) -> dict | None:
+        """喂一行 -progress 输出；凑满一个进度块时返回进度事件，否则 None。"""
+        k, sep, v = line.strip().partition("=")
+        if not sep:
+            return None
+        self.block[k] = v
+        if k != "progress":
+            return None
+        block, self.block = self.block, {}
+        ot = _parse_out_time(block)
+        try:
+            frame = int(block.get("frame") or 0)
+        except Exception:
+            frame = 0
+        st = self.state
+        with _LOCK:
+            if (ot is not None and ot > st["out_time_s"]) or frame > st["frame"]:
+                st["last_advance"] = time.monotonic()
+            if ot is not None:
+                st["out_time_s"] = max(st["out_time_s"], ot)
+            st["frame"] = max(st["frame"], frame)
+            sp = _parse_speed(block.get("speed"))
+            if sp is not None:
+                st["speed"] = sp
+            if self.expected_s:
+                st["percent"] = round(min(100.0, 100.0 * st["out_time_s"] / float(self.expected_s)), 1)
+            st["block"] = block
+            event = {
+                "job": self.job,
+                "stage": self.stage,
+                "out_time_s": st["out_time_s"],
+                "speed": st["speed"],
+                "percent": st["percent"],
+                "done": block.get("progress") == "end",
+            }
+            if self.job in _JOBS:
+                _JOBS[self.job].update(stage=self.stage, out_time_s=st["out_time_s"], speed=st["speed"], percent=st["percent"])
+        return event
+
+    def feed_stderr(self, line: str) -> None:
+        self.ring.append(line)
+
+    def verdict(self) -> str:
+        """"" = 继续等；"stall" / "deadline" = 该击杀。"""
+        now = time.monotonic()
+        with _LOCK:
+            idle = now - self.state["last_advance"]
+        if idle > self.stall:
+            return "stall"
+        if now - self.t0 > self.deadline:
+            return "deadline"
+        return ""
+
+    def finish(self, returncode: int | None, reason: str = "") -> FFmpegResult:
+        with _LOCK:
+            if self.pid is not None:
+                _RUNNING.pop(self.pid, None)
+        elapsed = time.monotonic() - self.t0
+        metrics.incr("ffmpeg.seconds", elapsed)
+        stderr_tail = "".join(self.ring)
+        st = self.state
+        if reason:
+            metrics.incr(f"ffmpeg.{reason}_kills")
+            limit = self.stall if reason == "stall" else self.deadline
+            print(f"[火控] {self.stage or 'ffmpeg'} {('停滞' if reason == 'stall' else '超时')}击杀：{limit:.0f} 秒，已出片 {st['out_time_s']:.1f} 秒")
+            raise FFmpegTimeout(self.cmd, limit, reason=reason, stderr=stderr_tail, out_time_s=st["out_time_s"])
+        return FFmpegResult(
+            args=self.cmd,
+            returncode=int(returncode if returncode is not None else -1),
+            stderr=stderr_tail,
+            out_time_s=st["out_time_s"],
+            speed=st["speed"],
+            elapsed_s=elapsed,
+            progress=dict(st["block"]),
+        )
+
+
+def run(
+    cmd: list[str],
+    *,
+    expected_s: float | None = None,
+    stage: str = "",
+    stall_s: float | None = None,
+    deadline_s: float | None = None,
+) -> FFmpegResult:
+    """
+    执行 ffmpeg 并跟踪进度（阻塞，供工作线程使用）。expected_s：预期输出时长（秒，用于总时限与百分比）。
+    停滞 / 超时击杀后抛 FFmpegTimeout；启动失败等异常照常上抛。
+    """
+    tr = _Tracker(cmd, expected_s=expected_s, stage=stage, stall_s=stall_s, deadline_s=deadline_s)
+    proc = subprocess.Popen(
+        tr.cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        errors="ignore",
+        bufsize=1,
+    )
+    tr.started(proc.pid)
+
+    def _read_progress() -> None:
+        for line in proc.stdout:  # type: ignore[union-attr]
+            tr.feed_progress(line)
+
+    def _read_stderr() -> None:
+        for line in proc.stderr:  # type: ignore[union-attr]
+            tr.feed_stderr(line)
+
+    readers = [threading.Thread(target=fn, daemon=True) for fn in (_read_progress, _read_stderr)]
+    for t in readers:
+        t.start()
+
+    reason = ""
+    try:
+        while True:
+            try:
+                proc.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            reason = tr.verdict()
+            if reason:
+                proc.kill()
+                proc.wait()
+                break
+    finally:
+        for t in readers:
+            t.join(timeout=2)
+    return tr.finish(proc.returncode, reason)
+
+
+def _term_grace_s() -> float:
+    return max(0.5, _env_float("JUNSHI_FFMPEG_TERM_GRACE_S", 5.0))
+
+
+async def _stop(proc: asyncio.subprocess.Process) -> None:
+    """先 SIGTERM（ffmpeg 会收尾退出），宽限期内不退再 SIGKILL。"""
+    if proc.returncode is not None:
+        return
+    try:
+        proc.terminate()
+        await asyncio.wait_for(proc.wait(), timeout=_term_grace_s())
+        return
+    except (ProcessLookupError, asyncio.TimeoutError):
+        pass
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def run_async(
+    cmd: list[str],
+    *,
+    expected_s: float | None = None,
+    stage: str = "",
+    stall_s: float | None = None,
+    deadline_s: float | None = None,
+) -> FFmpegResult:
+    """
+    run() 的 asyncio 版：create_subprocess_exec + 事件循环内读管道，不占执行器线程。
+    任务被取消时 SIGTERM → 宽限 JUNSHI_FFMPEG_TERM_GRACE_S（默认 5 秒）→ SIGKILL，再把 CancelledError 抛回。
+    """
+    tr = _Tracker(cmd, expected_s=expected_s, stage=stage, stall_s=stall_s, deadline_s=deadline_s)
+    proc = await asyncio.create_subprocess_exec(
+        *tr.cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    tr.started(proc.pid)
+    callback = _CALLBACKS.get(tr.job) if tr.job else None
+
+    async def _read_progress() -> None:
+        async for raw in proc.stdout:  # type: ignore[union-attr]
+            event = tr.feed_progress(raw.decode("utf-8", "ignore"))
+            if event is None or callback is None:
+                continue
+            try:
+                r = callback(event)
+                if inspect.isawaitable(r):
+                    await r
+            except Exception:
+                pass
+
+    async def _read_stderr() -> None:
+        async for raw in proc.stderr:  # type: ignore[union-attr]
+            tr.feed_stderr(raw.decode("utf-8", "ignore"))
+
+    readers = [asyncio.ensure_future(_read_progress()), asyncio.ensure_future(_read_stderr())]
+    reason = ""
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), timeout=0.5)
+                break
+            except asyncio.TimeoutError:
+                pass
+            reason = tr.verdict()
+            if reason:
+                await _stop(proc)
+                break
+        await asyncio.wait(readers, timeout=2)
+    except asyncio.CancelledError:
+        metrics.incr("ffmpeg.cancelled")
+        print(f"[火控] {stage or 'ffmpeg'} 任务取消，终止 ffmpeg（pid={proc.pid}）")
+        await asyncio.shield(_stop(proc))
+        tr.finish(proc.returncode)
+        raise
+    finally:
+        for t in readers:
+            if not t.done():
+                t.cancel()
+    return tr.finish(proc.returncode, reason)
+
+
+def job_status(label: str) -> dict | None:
+    """某个渲染任务的当前进度（工序 / 已出片秒数 / 倍速 / 百分比）；任务不存在返回 None。"""
+    with _LOCK:
+        st = _JOBS.get(str(label))
+        return dict(st) if st else None
+
+
+def snapshot() -> dict:
+    now = time.monotonic()
+    with _LOCK:
+        running = [
+            {
+                "pid": pid,
+                "job": st["job"],
+                "stage": st["stage"],
+                "threads": st.get("threads"),
+                "out_time_s": round(st["out_time_s"], 2),
+                "speed": st["speed"],
+                "percent": st["percent"],
+                "idle_s": round(now - st["last_advance"], 1),
+            }
+            for pid, st in _RUNNING.items()
+        ]
+        jobs = [dict(j) for j in _JOBS.values()]
+    return {"running": running, "jobs": jobs, "stall_window_s": stall_window_s()}
+
+
+metrics.register_provider("ffmpeg", snapshot)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+V46.5 中文字体解析（启动时解析一次，全部 drawtext 共用）
+旧版只认 Windows 字体，Linux 容器上必然退到 font='Microsoft YaHei'（基本失败），
+每次失败都白跑一整遍 ffmpeg。解析顺序：
+  WATERMARK_FONT → fontconfig（fc-match sans-serif:lang=zh / fc-list :lang=zh）
+  → 仓库自带 assets/fonts/ → Windows 常见中文字体
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+from bot_logic import metrics
+
+FONT_EXTS = {".ttf", ".ttc", ".otf", ".otc"}
+# fc-list 多个候选时的偏好（文件名包含即可，越靠前越优先）
+PREFERRED = (
+    "NotoSansCJK", "NotoSansSC", "SourceHanSans", "wqy-microhei", "wqy-zenhei",
+    "NotoSerifCJK", "DroidSansFallback", "msyh", "simhei",
+)
+WINDOWS_FONTS = (
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/simsun.ttc",
+)
+_BUNDLED_DIR = Path(__file__).resolve().parent.parent / "assets" / "fonts"
+
+_LOCK = threading.Lock()
+_RESOLVED: tuple[str | None, str] | None = None  # (路径, 来源)
+
+
+def _usable(p: str | None) -> bool:
+    try:
+        return bool(p) and Path(p).is_file() and Path(p).suffix.lower() in FONT_EXTS
+    except Exception:
+        return False
+
+
+def _fc(cmd: list[str]) -> str:
+    if not shutil.which(cmd[0]):
+        return ""
+    try:
+        r = subprocess.run(cmd, capture_output=True, timeout=10, encoding="utf-8", errors="ignore")
+        return r.stdout if r.returncode == 0 else ""
+    except Exception:
+        return ""
+
+
+def _rank(path: str) -> int:
+    name = Path(path).name.lower()
+    for i, key in enumerate(PREFERRED):
+        if key.lower() in name:
+            return i
+    return len(PREFERRED)
+
+
+def _from_fontconfig() -> str | None:
+    zh = [ln.strip() for ln in _fc(["fc-list", ":lang=zh", "file"]).splitlines()]
+    zh = [ln.rstrip(":").strip() for ln in zh if ln]
+    zh = [p for p in dict.fromkeys(zh) if _usable(p)]
+    # fc-match 可能回退到不含中文字形的默认字体：只有落在 :lang=zh 集合里才采信
+    best = _fc(["fc-match", "-f", "%{file}", "sans-serif:lang=zh"]).strip()
+    if _usable(best) and (not zh or best in zh):
+        return best
+    if zh:
+        return sorted(zh, key=lambda p: (_rank(p), p))[0]
+    return None
+
+
+def _from_bundled() -> str | None:
+    try:
+        files = [str(p) for p in _BUNDLED_DIR.rglob("*") if p.suffix.lower() in FONT_EXTS and p.is_file()]
+    except Exception:
+        return None
+    return sorted(files, key=lambda p: (_rank(p), p))[0] if files else None
+
+
+def _resolve() -> tuple[str | None, str]:
+    env_font = (os.getenv("WATERMARK_FONT") or "").strip().strip('"').strip("'")
+    if _usable(env_font):
+        return env_font, "WATERMARK_FONT"
+    if env_font:
+        print(f"[字体] WATERMARK_FONT 不可用，继续自动探测: {env_font}")
+    fc = _from_fontconfig()
+    if fc:
+        return fc, "fontconfig"
+    bundled = _from_bundled()
+    if bundled:
+        return bundled, "assets"
+    for fp in WINDOWS_FONTS:
+        if _usable(fp):
+            return fp, "windows"
+    return None, "none"
+
+
+def resolve_cjk_font(*, refresh: bool = False) -> str | None:
+    """解析后的中文字体文件路径（进程内缓存）；找不到返回 None（调用方退回字体名/无字 drawtext）。"""
+    global _RESOLVED
+    with _LOCK:
+        if _RESOLVED is None or refresh:
+            _RESOLVED = _resolve()
+            path, source = _RESOLVED
+            metrics.set_gauge("fonts.resolved", 1 if path else 0)
+            if path:
+                print(f"[字体] 中文字体已锁定（{source}）: {path}")
+            else:
+                print("[字体] 警告：未找到中文字体，水印/字幕将退回字体名或无字模式（可设 WATERMARK_FONT 或安装 fonts-wqy-microhei）")
+        return _RESOLVED[0]
+
+
+_FAMILY: dict[str, str | None] = {}
+
+
+def font_family(path: str | None) -> str | None:
+    """字体文件的族名（fc-scan；ASS 样式按族名找字）。取不到返回 None。"""
+    if not path:
+        return None
+    with _LOCK:
+        if path in _FAMILY:
+            return _FAMILY[path]
+    fam = _fc(["fc-scan", "--format", "%{family[0]}\\n", path]).splitlines()
+    name = (fam[0].strip() if fam else "") or None
+    with _LOCK:
+        _FAMILY[path] = name
+    return name
+
+
+def snapshot() -> dict:
+    path, source = _RESOLVED or (None, "unresolved")
+    return {"path": path, "source": source}
+
+
+metrics.register_provider("fonts", snapshot)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+V45.7 文件系统类型探测（网络盘识别）
+- Linux：/proc/mounts 取路径所在挂载点（最长前缀）的文件系统类型
+- Windows：UNC 路径 / GetDriveTypeW == DRIVE_REMOTE
+网络盘（nfs / cifs / smb / fuse 远端 / 9p）上 inotify 收不到远端写入、SQLite WAL 的共享内存锁不可靠：
+素材监听改走轮询，素材索引库不放在工厂目录里。
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from pathlib import Path
+
+NETWORK_FS = frozenset({"nfs", "nfs4", "cifs", "smb", "smb2", "smb3", "smbfs", "afs", "ceph", "glusterfs", "9p", "drvfs", "davfs", "ncpfs"})
+# 本地实现的 FUSE（NTFS 移动硬盘 / rootless 容器根）不算网络盘
+_LOCAL_FUSE = frozenset({"fuseblk", "fuse.fuse-overlayfs", "fuse.lxcfs"})
+
+
+def _unescape(field: str) -> str:
+    # /proc/mounts 把空格 / 制表符等写成 \\040 这类八进制转义
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), field)
+
+
+def fs_type(path: str | Path) -> str:
+    """路径所在文件系统类型（如 ext4 / nfs4 / cifs / fuse.rclone / remote）；探测不到返回 ""。"""
+    try:
+        p = Path(path).expanduser().resolve()
+    except Exception:
+        p = Path(path)
+    if sys.platform.startswith("win"):
+        s = str(p)
+        if s.startswith("\\\\"):
+            return "remote"
+        try:
+            import ctypes
+
+            # DRIVE_REMOTE = 4
+            if ctypes.windll.kernel32.GetDriveTypeW(f"{p.drive}\\") == 4:
+                return "remote"
+        except Exception:
+            pass
+        return ""
+    best, kind = "", ""
+    try:
+        with open("/proc/mounts", encoding="utf-8", errors="replace") as f:
+            for ln in f:
+                parts = ln.split()
+                if len(parts) < 3:
+                    continue
+                mnt = _unescape(parts[1])
+                if (str(p) == mnt or str(p).startswith(mnt.rstrip("/") + "/")) and len(mnt) >= len(best):
+                    best, kind = mnt, parts[2]
+    except Exception:
+        return ""
+    return kind
+
+
+def is_network_fs(path: str | Path) -> bool:
+    kind = fs_type(path).lower()
+    if not kind:
+        return False
+    if kind == "remote" or kind in NETWORK_FS or kind.split(".", 1)[0] in NETWORK_FS:
+        return True
+    return kind.startswith("fuse") and kind not in _LOCAL_FUSE
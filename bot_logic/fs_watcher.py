@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+V45.7 工厂素材实时监听（VisualEngine 内存池保鲜）
+- Linux：inotify（ctypes 直调 libc，零依赖），递归监听所有非隐藏子目录
+- 其他平台 / 网络盘 / watch 配额耗尽：轮询兜底（走 SQLite 素材索引增量刷新）
+  网络盘按挂载类型识别（nfs / cifs / smb / 远端 fuse，见 fs_type）：inotify 在上面能建起来但收不到远端写入
+- 新增 / 删除 / 重命名事件直接落到按行业分组的内存池，渲染取池无需重扫
+环境变量：
+  JIUMO_WATCH_MODE    auto（默认）/ inotify / poll / off
+  JIUMO_WATCH_POLL_S  轮询间隔秒（默认 5）
+导出：metrics provider: fs_watcher
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from bot_logic import fs_type, media_index, metrics
+
+
+class MediaPools:
+    """按行业（工厂根目录下一级子目录）分组的素材集合。线程安全。"""
+
+    def __init__(self, root: Path, exts: Iterable[str] = media_index.MEDIA_EXTS):
+        self.root = Path(root)
+        self.exts = frozenset(e.lower() for e in exts)
+        self._lock = threading.Lock()
+        self._pools: dict[str, set[str]] = {}
+        self.version = 0
+
+    @staticmethod
+    def _industry(rel: str) -> str:
+        return rel.split("/", 1)[0] if "/" in rel else ""
+
+    def _rel(self, path: Path | str) -> str | None:
+        try:
+            rel = Path(path).relative_to(self.root).as_posix()
+        except Exception:
+            return None
+        if any(part.startswith(".") for part in rel.split("/")):
+            return None
+        return rel
+
+    def _accept(self, rel: str) -> bool:
+        return os.path.splitext(rel)[1].lower() in self.exts
+
+    def reset(self, paths: Iterable[Path]) -> None:
+        pools: dict[str, set[str]] = {}
+        for p in paths:
+            rel = self._rel(p)
+            if rel is None or not self._accept(rel):
+                continue
+            pools.setdefault(self._industry(rel), set()).add(rel)
+        with self._lock:
+            self._pools = pools
+            self.version += 1
+
+    def add(self, path: Path | str) -> bool:
+        rel = self._rel(path)
+        if rel is None or not self._accept(rel):
+            return False
+        with self._lock:
+            self._pools.setdefault(self._industry(rel), set()).add(rel)
+            self.version += 1
+        return True
+
+    def remove(self, path: Path | str) -> bool:
+        rel = self._rel(path)
+        if rel is None:
+            return False
+        with self._lock:
+            s = self._pools.get(self._industry(rel))
+            if s is None or rel not in s:
+                return False
+            s.discard(rel)
+            self.version += 1
+        return True
+
+    def remove_tree(self, path: Path | str) -> int:
+        """目录被删除/移出：清掉其下所有素材。"""
+        rel = self._rel(path)
+        if rel is None:
+            return 0
+        prefix = rel + "/"
+        n = 0
+        with self._lock:
+            for s in self._pools.values():
+                gone = [r for r in s if r.startswith(prefix)]
+                for r in gone:
+                    s.discard(r)
+                n += len(gone)
+            if n:
+                self.version += 1
+        return n
+
+    def files(self, *, under: str | None = None, exts: Iterable[str] | None = None) -> list[Path]:
+        """under：相对根目录的子目录（含后代）；None = 全部。"""
+        ex = frozenset(e.lower() for e in exts) if exts else None
+        with self._lock:
+            if under:
+                u = str(under).strip().strip("/").replace("\\", "/")
+                top = u.split("/", 1)[0]
+                prefix = u + "/"
+                rels = [r for r in self._pools.get(top, ()) if r.startswith(prefix)]
+            else:
+                rels = [r for s in self._pools.values() for r in s]
+        if ex is not None:
+            rels = [r for r in rels if os.path.splitext(r)[1].lower() in ex]
+        return [self.root / r for r in rels]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return {k: len(v) for k, v in self._pools.items()}
+
+
+# ─────────────────────────────────────────────────────────────
+# inotify（ctypes）
+# ─────────────────────────────────────────────────────────────
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+_EVENT_HDR = struct.Struct("iIII")
+
+
+class _Inotify:
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅 Linux 可用")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.fd = fd
+
+    def add_watch(self, path: Path) -> int:
+        wd = self._add(self.fd, os.fsencode(str(path)), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch 失败: {path}")
+        return wd
+
+    def read_events(self, timeout_s: float) -> list[tuple[int, int, int, str]]:
+        r, _, _ = select.select([self.fd], [], [], timeout_s)
+        if not r:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        out: list[tuple[int, int, int, str]] = []
+        off = 0
+        while off + _EVENT_HDR.size <= len(buf):
+            wd, mask, cookie, ln = _EVENT_HDR.unpack_from(buf, off)
+            off += _EVENT_HDR.size
+            name = os.fsdecode(buf[off:off + ln].rstrip(b"\0"))
+            off += ln
+            out.append((wd, mask, cookie, name))
+        return out
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except Exception:
+            pass
+
+
+class FactoryWatcher:
+    """后台守护线程：inotify 事件 / 轮询刷新 → MediaPools。"""
+
+    def __init__(self, root: Path, pools: MediaPools, *, mode: str = "auto", poll_s: float = 5.0):
+        self.root = Path(root)
+        self.pools = pools
+        self.mode_requested = mode
+        self.poll_s = max(1.0, float(poll_s))
+        self.mode = "off"
+        self.fs_type = ""
+        self.events = 0
+        self.resyncs = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._ino: _Inotify | None = None
+        self._wd_to_dir: dict[int, Path] = {}
+
+    # ── 公共 ─────────────────────────────────────────────────
+    def start(self) -> None:
+        if self._thread is not None or self.mode_requested == "off":
+            return
+        self.fs_type = fs_type.fs_type(self.root)
+        use_inotify = self.mode_requested in ("auto", "inotify")
+        if use_inotify and fs_type.is_network_fs(self.root):
+            if self.mode_requested == "auto":
+                use_inotify = False
+                print(f"[素材监听] 网络盘（{self.fs_type}）收不到远端写入事件，使用轮询")
+            else:
+                print(f"[素材监听] 警告：网络盘（{self.fs_type}）上强制 inotify，远端写入将被漏掉")
+        if use_inotify:
+            try:
+                self._ino = _Inotify()
+                self._watch_tree(self.root)
+                self.mode = "inotify"
+            except Exception as e:
+                if self._ino is not None:
+                    self._ino.close()
+                    self._ino = None
+                self._wd_to_dir.clear()
+                print(f"[素材监听] inotify 不可用，切换轮询: {e}")
+        if self._ino is None:
+            self.mode = "poll"
+        # 先建监听再全量对齐：对齐期间落盘的文件不会漏
+        self._resync()
+        target = self._run_inotify if self._ino is not None else self._run_poll
+        self._thread = threading.Thread(target=target, name=f"fs-watch:{self.root.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> dict:
+        return {
+            "root": str(self.root),
+            "mode": self.mode,
+            "fs_type": self.fs_type,
+            "watches": len(self._wd_to_dir),
+            "events": self.events,
+            "resyncs": self.resyncs,
+            "pools": self.pools.counts(),
+        }
+
+    # ── 全量对齐（启动 / 队列溢出 / 轮询有变化）───────────────
+    def _resync(self) -> None:
+        try:
+            idx = media_index.get_index(self.root)
+            idx.refresh(force=True)
+            self.pools.reset(idx.files(exts=self.pools.exts, refresh=False))
+            self.resyncs += 1
+        except Exception as e:
+            print(f"[素材监听] 全量对齐失败（已忽略）: {e}")
+
+    # ── inotify ─────────────────────────────────────────────
+    def _watch_tree(self, top: Path) -> None:
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            try:
+                wd = self._ino.add_watch(d)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # watch 配额耗尽：整体降级轮询（部分监听比不监听更危险）
+                    raise
+                continue
+            self._wd_to_dir[wd] = d
+            try:
+                with os.scandir(d) as it:
+                    for ent in it:
+                        if ent.name.startswith("."):
+                            continue
+                        try:
+                            if ent.is_dir(follow_symlinks=False):
+                                stack.append(Path(ent.path))
+                        except Exception:
+                            continue
+            except Exception:
+                continue
+
+    def _scan_new_dir(self, d: Path) -> None:
+        """新建/移入的目录：补监听 + 收录其中已存在的文件（监听建立前可能已写入）。"""
+        try:
+            self._watch_tree(d)
+        except OSError:
+            pass
+        for dirpath, dirnames, filenames in os.walk(d):
+            dirnames[:] = [x for x in dirnames if not x.startswith(".")]
+            for fn in filenames:
+                self.pools.add(Path(dirpath) / fn)
+
+    def _run_inotify(self) -> None:
+        while not self._stop.is_set():
+            try:
+                evs = self._ino.read_events(1.0)
+            except Exception:
+                time.sleep(1.0)
+                continue
+            for wd, mask, _cookie, name in evs:
+                self.events += 1
+                metrics.incr("fs_watcher.events")
+                if mask & IN_Q_OVERFLOW:
+                    self._resync()
+                    continue
+                d = self._wd_to_dir.get(wd)
+                if mask & IN_IGNORED:
+                    self._wd_to_dir.pop(wd, None)
+                    continue
+                if d is None or not name or name.startswith("."):
+                    continue
+                p = d / name
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._scan_new_dir(p)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        self.pools.remove_tree(p)
+                    continue
+                # 文件：写完（close_write）或移入才收录，避免半截文件进池
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    self.pools.add(p)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.pools.remove(p)
+        if self._ino is not None:
+            self._ino.close()
+
+    # ── 轮询兜底 ─────────────────────────────────────────────
+    def _run_poll(self) -> None:
+        idx = media_index.get_index(self.root)
+        while not self._stop.wait(self.poll_s):
+            try:
+                added, removed = idx.refresh(force=True)
+                if added or removed:
+                    self.events += added + removed
+                    self.pools.reset(idx.files(exts=self.pools.exts, refresh=False))
+            except Exception:
+                continue
+
+
+_WATCHERS: dict[str, FactoryWatcher] = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def live_pools(root: Path) -> MediaPools:
+    """取某根目录的实时内存池（首次调用建池并启动后台监听）。"""
+    try:
+        key = str(Path(root).resolve())
+    except Exception:
+        key = str(root)
+    with _WATCHERS_LOCK:
+        w = _WATCHERS.get(key)
+        if w is None:
+            mode = (os.getenv("JIUMO_WATCH_MODE") or "auto").strip().lower()
+            try:
+                poll_s = float((os.getenv("JIUMO_WATCH_POLL_S") or "").strip() or 5.0)
+            except Exception:
+                poll_s = 5.0
+            w = FactoryWatcher(Path(key), MediaPools(Path(key)), mode=mode, poll_s=poll_s)
+            _WATCHERS[key] = w
+            if mode == "off":
+                # 关闭监听：仍给出一次性快照
+                w._resync()
+            else:
+                w.start()
+        return w.pools
+
+
+def snapshot() -> dict:
+    with _WATCHERS_LOCK:
+        ws = list(_WATCHERS.values())
+    return {"watchers": [w.snapshot() for w in ws]}
+
+
+metrics.register_provider("fs_watcher", snapshot)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+V46.2 行业渐变底图缓存
+- 旧版每帧 geq 逐像素求三条表达式（1280x720x30fps x 全片时长），CPU 全耗在一张静态图上
+- 现在按 (起色, 止色, 分辨率) 只生成一次 PNG（纯标准库 zlib 编码，横向渐变每行相同），落盘缓存
+- video_stitcher 以 -loop 1 静帧输入；export_background_jpg 兜底图同样取自此缓存
+命令行对比：python -m bot_logic.gradient --bench 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import subprocess
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from bot_logic import metrics
+from bot_logic.cachedir import cache_subdir
+
+DEFAULT_SIZE = (1280, 720)
+_LOCK = threading.Lock()
+
+
+def _hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
+    """与 VisualEngine._hex_to_rgb 一致：非法色值回退 (10,10,10)。"""
+    c = (hex_color or "").strip()
+    if not c.startswith("#") or len(c) != 7:
+        return (10, 10, 10)
+    try:
+        return (int(c[1:3], 16), int(c[3:5], 16), int(c[5:7], 16))
+    except Exception:
+        return (10, 10, 10)
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_gradient_png(c_from: str, c_to: str, size: tuple[int, int] = DEFAULT_SIZE) -> bytes:
+    """横向渐变 RGB PNG：像素值与旧 geq 表达式 (1-X/W)*c1 + (X/W)*c2 相同。"""
+    w, h = int(size[0]), int(size[1])
+    (r1, g1, b1), (r2, g2, b2) = _hex_to_rgb(c_from), _hex_to_rgb(c_to)
+    row = bytearray(1 + 3 * w)  # 首字节 0 = 不滤波
+    for x in range(w):
+        t = x / w
+        i = 1 + 3 * x
+        row[i] = int((1 - t) * r1 + t * r2)
+        row[i + 1] = int((1 - t) * g1 + t * g2)
+        row[i + 2] = int((1 - t) * b1 + t * b2)
+    raw = bytes(row) * h
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(raw, 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def gradient_png(c_from: str, c_to: str, size: tuple[int, int] = DEFAULT_SIZE) -> Path | None:
+    """缓存中的渐变 PNG 路径（不存在则生成）；缓存盘不可写返回 None（调用方回退 geq）。"""
+    w, h = int(size[0]), int(size[1])
+    key = "{:02x}{:02x}{:02x}_{:02x}{:02x}{:02x}".format(*_hex_to_rgb(c_from), *_hex_to_rgb(c_to))
+    out = cache_subdir("gradients") / f"grad_{key}_{w}x{h}.png"
+    try:
+        if out.exists() and out.stat().st_size > 0:
+            metrics.incr("gradient.hit")
+            return out
+    except Exception:
+        pass
+    with _LOCK:
+        try:
+            if out.exists() and out.stat().st_size > 0:
+                metrics.incr("gradient.hit")
+                return out
+            tmp = out.with_name(out.name + f".{os.getpid()}.part")
+            tmp.write_bytes(encode_gradient_png(c_from, c_to, (w, h)))
+            tmp.replace(out)
+            metrics.incr("gradient.miss")
+            return out
+        except Exception as e:
+            print(f"[渐变] 底图缓存写入失败，回退 geq: {e}")
+            return None
+
+
+def geq_filter(c_from: str, c_to: str) -> str:
+    """旧版逐帧 geq 渐变（缓存不可用时兜底 / 基准对照）。"""
+    (r1, g1, b1), (r2, g2, b2) = _hex_to_rgb(c_from), _hex_to_rgb(c_to)
+    return (
+        f"geq="
+        f"r='(1-(X/W))*{r1} + (X/W)*{r2}':"
+        f"g='(1-(X/W))*{g1} + (X/W)*{g2}':"
+        f"b='(1-(X/W))*{b1} + (X/W)*{b2}'"
+    )
+
+
+def bench(seconds: float = 10.0, *, c_from: str = "#38000b", c_to: str = "#5d131b") -> dict[str, float]:
+    """同一时长分别用 geq / 缓存静帧 / 静帧低帧率编码（无音频、输出丢弃），返回各自墙钟秒数。"""
+    common = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "28", "-pix_fmt", "yuv420p", "-f", "null", "-"]
+    runs = {
+        "geq": [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"color=c=black:s=1280x720:d={seconds:.3f}",
+            "-vf", geq_filter(c_from, c_to), *common,
+        ],
+    }
+    png = gradient_png(c_from, c_to)
+    if png is not None:
+        runs["cached_png"] = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-loop", "1", "-framerate", "30", "-t", f"{seconds:.3f}", "-i", str(png),
+            *common,
+        ]
+        # V46.3：静帧模式（10fps + -tune stillimage）
+        runs["cached_png_still"] = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-loop", "1", "-framerate", "10", "-t", f"{seconds:.3f}", "-i", str(png),
+            "-tune", "stillimage", "-r", "10", "-g", "20", *common,
+        ]
+    out: dict[str, float] = {}
+    for name, cmd in runs.items():
+        t0 = time.perf_counter()
+        r = subprocess.run(cmd, capture_output=True, encoding="utf-8", errors="ignore")
+        out[name] = round(time.perf_counter() - t0, 3) if r.returncode == 0 else float("nan")
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="行业渐变底图缓存")
+    ap.add_argument("--bench", type=float, default=0.0, help="对比 geq 与缓存静帧的编码耗时（秒数）")
+    ap.add_argument("--from", dest="c_from", default="#38000b")
+    ap.add_argument("--to", dest="c_to", default="#5d131b")
+    args = ap.parse_args(argv)
+    if args.bench > 0:
+        res = bench(args.bench, c_from=args.c_from, c_to=args.c_to)
+        print(f"[渐变] {args.bench:g}s 编码耗时: {res}")
+        return 0
+    print(f"[渐变] {gradient_png(args.c_from, args.c_to)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+V45.3 离线本地 TTS 梯队（ElevenLabs / edge-tts 全断时的有声兜底）
+- 可插拔引擎：piper（神经网络，需模型文件）/ espeak-ng（共振峰，零模型）
+- 引擎 stdout 直接管道进 FFmpeg → 44.1kHz 立体声 mp3（不落中间 wav）
+- 有界子进程池：并发血弹共享，延迟只受本机 CPU 约束
+环境变量：
+  LOCAL_TTS_ENGINE   auto（默认）/ piper / espeak-ng / off
+  LOCAL_TTS_WORKERS  并发上限（默认 CPU 核数的一半，至少 1）
+  PIPER_BIN / PIPER_MODEL      piper 可执行文件与 .onnx 模型
+  ESPEAK_BIN / ESPEAK_VOICE / ESPEAK_SPEED   espeak-ng 配置（默认 cmn / 175）
+导出：metrics provider: local_tts
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+from bot_logic import metrics
+
+
+class LocalTTSEngine(ABC):
+    """
+    引擎接口：给出引擎命令行 + 其 stdout 的 FFmpeg 输入格式参数。文本一律走 stdin。
+    抽象基类：缺实现的引擎在实例化时即报错，而不是在供应商全断、走兜底时才炸。
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def available(self) -> bool:
+        ...
+
+    @abstractmethod
+    def command(self) -> list[str]:
+        ...
+
+    @abstractmethod
+    def ffmpeg_input_args(self) -> list[str]:
+        ...
+
+
+class EspeakNgEngine(LocalTTSEngine):
+    name = "espeak-ng"
+
+    def __init__(self):
+        self.bin = (os.getenv("ESPEAK_BIN") or "").strip() or shutil.which("espeak-ng") or shutil.which("espeak")
+        self.voice = (os.getenv("ESPEAK_VOICE") or "").strip() or "cmn"
+        self.speed = (os.getenv("ESPEAK_SPEED") or "").strip() or "175"
+
+    def available(self) -> bool:
+        return bool(self.bin) and Path(self.bin).exists()
+
+    def command(self) -> list[str]:
+        # --stdout：WAV 写到标准输出；无文本参数时从 stdin 读
+        return [str(self.bin), "-v", self.voice, "-s", self.speed, "--stdout"]
+
+    def ffmpeg_input_args(self) -> list[str]:
+        return ["-f", "wav", "-i", "pipe:0"]
+
+
+class PiperEngine(LocalTTSEngine):
+    name = "piper"
+
+    def __init__(self):
+        self.bin = (os.getenv("PIPER_BIN") or "").strip() or shutil.which("piper")
+        self.model = (os.getenv("PIPER_MODEL") or "").strip()
+        self.sample_rate = self._model_sample_rate()
+
+    def _model_sample_rate(self) -> int:
+        # piper 模型旁的 .onnx.json 记录采样率；读不到按 22050（官方中文模型默认）
+        try:
+            cfg = Path(self.model + ".json")
+            if cfg.exists():
+                return int(json.loads(cfg.read_text(encoding="utf-8"))["audio"]["sample_rate"])
+        except Exception:
+            pass
+        return 22050
+
+    def available(self) -> bool:
+        return bool(self.bin) and Path(self.bin).exists() and bool(self.model) and Path(self.model).exists()
+
+    def command(self) -> list[str]:
+        # --output_raw：16bit 单声道 PCM 流到 stdout
+        return [str(self.bin), "--model", self.model, "--output_raw"]
+
+    def ffmpeg_input_args(self) -> list[str]:
+        return ["-f", "s16le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0"]
+
+
+_ENGINES: dict[str, type[LocalTTSEngine]] = {
+    "piper": PiperEngine,
+    "espeak-ng": EspeakNgEngine,
+}
+
+_LOCK = threading.Lock()
+_SELECTED: LocalTTSEngine | None = None
+_SELECTED_DONE = False
+_SEM: asyncio.Semaphore | None = None
+_SEM_LOOP: asyncio.AbstractEventLoop | None = None
+_STATS: dict[str, Any] = {"ok": 0, "failed": 0, "busy_wait_s": 0.0, "synth_s": 0.0, "last_error": None}
+
+
+def select_engine() -> LocalTTSEngine | None:
+    """按 LOCAL_TTS_ENGINE 选择引擎；auto 时 piper 优先（音质），否则 espeak-ng。结果进程内缓存。"""
+    global _SELECTED, _SELECTED_DONE
+    with _LOCK:
+        if _SELECTED_DONE:
+            return _SELECTED
+        want = (os.getenv("LOCAL_TTS_ENGINE") or "auto").strip().lower()
+        chosen: LocalTTSEngine | None = None
+        if want not in ("off", "none", "0"):
+            names = list(_ENGINES) if want == "auto" else [want]
+            for n in names:
+                cls = _ENGINES.get(n)
+                if cls is None:
+                    continue
+                try:
+                    eng = cls()
+                    if eng.available():
+                        chosen = eng
+                        break
+                except Exception:
+                    continue
+        _SELECTED = chosen
+        _SELECTED_DONE = True
+        return chosen
+
+
+def _workers() -> int:
+    try:
+        n = int((os.getenv("LOCAL_TTS_WORKERS") or "").strip() or 0)
+    except Exception:
+        n = 0
+    return n if n > 0 else max(1, (os.cpu_count() or 2) // 2)
+
+
+def _semaphore() -> asyncio.Semaphore:
+    # 信号量绑定当前事件循环（SaaS 与 Bot 模式各自一个循环）
+    global _SEM, _SEM_LOOP
+    loop = asyncio.get_running_loop()
+    if _SEM is None or _SEM_LOOP is not loop:
+        _SEM = asyncio.Semaphore(_workers())
+        _SEM_LOOP = loop
+    return _SEM
+
+
+async def _kill(proc: asyncio.subprocess.Process | None) -> None:
+    if proc is None or proc.returncode is not None:
+        return
+    try:
+        proc.kill()
+    except Exception:
+        pass
+    try:
+        await proc.wait()
+    except Exception:
+        pass
+
+
+async def _run_pipeline(engine: LocalTTSEngine, text: str, out_path: Path, *, timeout_s: float) -> None:
+    """engine(stdin=文本) | ffmpeg(pipe:0) → out_path。任一端失败抛 RuntimeError。"""
+    r_fd, w_fd = os.pipe()
+    eng_proc = ff_proc = None
+    try:
+        eng_proc = await asyncio.create_subprocess_exec(
+            *engine.command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=w_fd,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        ff_proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            *engine.ffmpeg_input_args(),
+            "-ar", "44100",
+            "-ac", "2",
+            "-c:a", "libmp3lame",
+            "-b:a", "128k",
+            "-f", "mp3",
+            out_path.resolve().as_posix(),
+            stdin=r_fd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # 父进程必须关掉自己持有的管道两端，否则 FFmpeg 永远等不到 EOF
+        os.close(w_fd)
+        w_fd = -1
+        os.close(r_fd)
+        r_fd = -1
+
+        async def _both():
+            _o, eng_err = await eng_proc.communicate(text.encode("utf-8"))
+            _o2, ff_err = await ff_proc.communicate()
+            return eng_err, ff_err
+
+        eng_err, ff_err = await asyncio.wait_for(_both(), timeout=timeout_s)
+        if eng_proc.returncode != 0:
+            raise RuntimeError(f"{engine.name} rc={eng_proc.returncode}: {(eng_err or b'')[-300:].decode('utf-8', 'ignore')}")
+        if ff_proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg rc={ff_proc.returncode}: {(ff_err or b'')[-300:].decode('utf-8', 'ignore')}")
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"{engine.name} 超时 {timeout_s:.0f}s")
+    finally:
+        for fd in (w_fd, r_fd):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except Exception:
+                    pass
+        await _kill(eng_proc)
+        await _kill(ff_proc)
+
+
+async def synth_local_mp3(text: str, mp3_path: Path) -> str:
+    """
+    本地合成 44.1kHz 立体声 mp3：返回引擎名；无可用引擎/失败抛 RuntimeError。
+    超时随字数线性放宽（共振峰/小模型远快于实时）。
+    """
+    t = (text or "").strip()
+    if not t:
+        raise RuntimeError("local tts text empty")
+    engine = select_engine()
+    if engine is None:
+        raise RuntimeError("无可用本地 TTS 引擎")
+
+    mp3_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = mp3_path.with_name(f"{mp3_path.stem}.local.tmp.mp3")
+    loop = asyncio.get_running_loop()
+    t_wait = loop.time()
+    async with _semaphore():
+        t0 = loop.time()
+        try:
+            await _run_pipeline(engine, t, tmp, timeout_s=20.0 + len(t) / 10.0)
+            if not tmp.exists() or tmp.stat().st_size <= 0:
+                raise RuntimeError(f"{engine.name} 空输出")
+            tmp.replace(mp3_path)
+        except Exception as e:
+            with _LOCK:
+                _STATS["failed"] += 1
+                _STATS["last_error"] = str(e)[:200]
+            metrics.incr("local_tts.failed")
+            raise RuntimeError(f"local tts failed: {e}") from e
+        finally:
+            try:
+                tmp.unlink(missing_ok=True)
+            except Exception:
+                pass
+    with _LOCK:
+        _STATS["ok"] += 1
+        _STATS["busy_wait_s"] += t0 - t_wait
+        _STATS["synth_s"] += loop.time() - t0
+    metrics.incr("local_tts.ok")
+    return engine.name
+
+
+def snapshot() -> dict[str, Any]:
+    eng = _SELECTED if _SELECTED_DONE else None
+    with _LOCK:
+        out = dict(_STATS)
+    out["engine"] = eng.name if eng is not None else None
+    out["workers"] = _workers()
+    out["busy_wait_s"] = round(out["busy_wait_s"], 3)
+    out["synth_s"] = round(out["synth_s"], 3)
+    return out
+
+
+metrics.register_provider("local_tts", snapshot)
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+V45.5 Jiumo_Auto_Factory 持久化素材索引（SQLite）
+- 索引库落在工厂根目录：.jiumo_media_index.sqlite（只读盘则落系统临时目录）
+  工厂根在网络盘（nfs / smb / 远端 fuse）上则落本机缓存目录：SQLite 的 WAL 共享内存锁在网络盘上不可靠
+- 增量刷新：只 stat 目录；目录 mtime 未变 → 沿用已记录的子目录与文件，不再列目录
+- 每条素材记录：行业（一级子目录）/ 扩展名 / 大小 / mtime / 时长 / 宽高 / 编码
+- 隐藏目录（. 开头，如 .mezz）不入索引
+网络盘上数千条 4K 素材：选池只走 SQLite 查询，毫秒级。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+from bot_logic import fs_type
+from bot_logic.cachedir import cache_subdir
+from bot_logic.probe_cache import probe_many
+
+VIDEO_EXTS = frozenset({".mp4", ".mov", ".m4v", ".webm"})
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+MEDIA_EXTS = VIDEO_EXTS | IMAGE_EXTS
+
+DB_NAME = ".jiumo_media_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    rel      TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    subdirs  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    rel      TEXT PRIMARY KEY,
+    dir      TEXT NOT NULL,
+    industry TEXT NOT NULL,
+    ext      TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    width    INTEGER,
+    height   INTEGER,
+    codec    TEXT
+);
+CREATE INDEX IF NOT EXISTS media_industry_ext ON media(industry, ext);
+CREATE INDEX IF NOT EXISTS media_dir ON media(dir);
+"""
+
+
+def _min_refresh_interval() -> float:
+    try:
+        return max(0.0, float((os.getenv("JIUMO_INDEX_MIN_REFRESH_S") or "").strip() or 2.0))
+    except Exception:
+        return 2.0
+
+
+class MediaIndex:
+    """单个工厂根目录的素材索引。线程安全（video_stitcher 在工作线程里查询）。"""
+
+    def __init__(self, root: Path, *, db_path: Path | None = None):
+        self.root = Path(root)
+        self._lock = threading.RLock()
+        self._last_refresh = 0.0
+        self.db_path = db_path or self._default_db_path()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+        # 显式指定到网络盘的库不开 WAL（-shm 共享内存跨主机不同步），退回默认回滚日志
+        if not fs_type.is_network_fs(self.db_path.parent):
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except Exception:
+                pass
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def _default_db_path(self) -> Path:
+        p = self.root / DB_NAME
+        try:
+            if fs_type.is_network_fs(self.root):
+                # 网络盘：索引落本机缓存目录（按根路径哈希区分）
+                h = hashlib.sha1(str(self.root).encode("utf-8")).hexdigest()[:12]
+                return cache_subdir("media_index") / f"jiumo_media_index_{h}.sqlite"
+            if self.root.is_dir() and os.access(str(self.root), os.W_OK):
+                return p
+        except Exception:
+            pass
+        # 只读/无权限的网络盘：索引落系统临时目录（按根路径哈希区分）
+        h = hashlib.sha1(str(self.root).encode("utf-8")).hexdigest()[:12]
+        return Path(tempfile.gettempdir()) / f"jiumo_media_index_{h}.sqlite"
+
+    # ── 刷新 ─────────────────────────────────────────────────
+    def refresh(self, *, force: bool = False) -> tuple[int, int]:
+        """增量刷新：返回 (新增/变更文件数, 删除文件数)。节流窗口内重复调用直接返回 (0, 0)。"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and (now - self._last_refresh) < _min_refresh_interval():
+                return 0, 0
+            added = removed = 0
+            try:
+                if not self.root.exists():
+                    return 0, 0
+                known = {r: (m, json.loads(s)) for r, m, s in self._conn.execute("SELECT rel, mtime_ns, subdirs FROM dirs")}
+                seen: set[str] = set()
+                stack = [""]
+                while stack:
+                    rel = stack.pop()
+                    a, r, subdirs = self._refresh_dir(rel, known.get(rel))
+                    added += a
+                    removed += r
+                    if subdirs is None:
+                        continue
+                    seen.add(rel)
+                    stack.extend(f"{rel}/{d}" if rel else d for d in subdirs)
+                # 已消失的目录：连同其文件一起清除
+                for rel in set(known) - seen:
+                    removed += self._drop_dir(rel)
+                self._conn.commit()
+            except Exception:
+                try:
+                    self._conn.rollback()
+                except Exception:
+                    pass
+            finally:
+                self._last_refresh = time.monotonic()
+            return added, removed
+
+    def _abs(self, rel: str) -> Path:
+        return self.root / rel if rel else self.root
+
+    def _refresh_dir(self, rel: str, known: tuple[int, list[str]] | None) -> tuple[int, int, list[str] | None]:
+        d = self._abs(rel)
+        try:
+            st = d.stat()
+        except Exception:
+            return 0, 0, None
+        if known is not None and known[0] == st.st_mtime_ns:
+            # 目录项未变：不列目录（网络盘上最贵的操作）
+            return 0, 0, known[1]
+
+        subdirs: list[str] = []
+        files: dict[str, tuple[int, int]] = {}
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.name.startswith("."):
+                        continue
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            subdirs.append(e.name)
+                        elif e.is_file():
+                            ext = os.path.splitext(e.name)[1].lower()
+                            if ext in MEDIA_EXTS:
+                                fst = e.stat()
+                                files[e.name] = (fst.st_size, fst.st_mtime_ns)
+                    except Exception:
+                        continue
+        except Exception:
+            return 0, 0, None
+
+        industry = rel.split("/", 1)[0] if rel else ""
+        old = {
+            row[0]: (row[1], row[2])
+            for row in self._conn.execute("SELECT rel, size, mtime_ns FROM media WHERE dir = ?", (rel,))
+        }
+        added = removed = 0
+        for name, (size, mtime_ns) in files.items():
+            frel = f"{rel}/{name}" if rel else name
+            prev = old.pop(frel, None)
+            if prev == (size, mtime_ns):
+                continue
+            # 新文件/内容变化：探测字段清空，等待重新探测
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media(rel, dir, industry, ext, size, mtime_ns, duration, width, height, codec) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, NULL, NULL)",
+                (frel, rel, industry, os.path.splitext(name)[1].lower(), size, mtime_ns),
+            )
+            added += 1
+        for frel in old:
+            self._conn.execute("DELETE FROM media WHERE rel = ?", (frel,))
+            removed += 1
+        # 子目录被删：交给 refresh 的 seen 差集统一清理
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dirs(rel, mtime_ns, subdirs) VALUES (?, ?, ?)",
+            (rel, st.st_mtime_ns, json.dumps(sorted(subdirs), ensure_ascii=False)),
+        )
+        return added, removed, subdirs
+
+    def _drop_dir(self, rel: str) -> int:
+        cur = self._conn.execute("DELETE FROM media WHERE dir = ?", (rel,))
+        self._conn.execute("DELETE FROM dirs WHERE rel = ?", (rel,))
+        return int(cur.rowcount or 0)
+
+    # ── 查询 ─────────────────────────────────────────────────
+    @staticmethod
+    def _where(under: str | None, exts: Iterable[str] | None) -> tuple[str, list]:
+        clauses: list[str] = []
+        args: list = []
+        if under:
+            u = str(under).strip().strip("/").replace("\\", "/")
+            clauses.append("(dir = ? OR substr(dir, 1, ?) = ?)")
+            args.extend([u, len(u) + 1, u + "/"])
+        if exts:
+            ex = sorted({e.lower() for e in exts})
+            clauses.append(f"ext IN ({','.join('?' * len(ex))})")
+            args.extend(ex)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def files(self, *, under: str | None = None, exts: Iterable[str] | None = None, refresh: bool = True) -> list[Path]:
+        """under：相对工厂根目录的子目录（含其所有后代）；None = 全库。"""
+        if refresh:
+            self.refresh()
+        where, args = self._where(under, exts)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT rel FROM media{where}", args).fetchall()
+        return [self.root / r[0] for r in rows]
+
+    def count(self, *, under: str | None = None, exts: Iterable[str] | None = None, refresh: bool = True) -> int:
+        if refresh:
+            self.refresh()
+        where, args = self._where(under, exts)
+        with self._lock:
+            return int(self._conn.execute(f"SELECT COUNT(*) FROM media{where}", args).fetchone()[0])
+
+    def records(self, *, under: str | None = None, exts: Iterable[str] | None = None, refresh: bool = True) -> list[dict]:
+        """完整记录（含时长/宽高/编码；未探测为 None）。"""
+        if refresh:
+            self.refresh()
+        where, args = self._where(under, exts)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rel, industry, ext, size, mtime_ns, duration, width, height, codec FROM media{where}", args
+            ).fetchall()
+        return [
+            {
+                "path": self.root / r[0], "industry": r[1], "ext": r[2], "size": r[3], "mtime_ns": r[4],
+                "duration": r[5], "width": r[6], "height": r[7], "codec": r[8],
+            }
+            for r in rows
+        ]
+
+    # ── 探测字段 ─────────────────────────────────────────────
+    def _rel(self, path: Path) -> str | None:
+        try:
+            return Path(path).resolve().relative_to(self.root.resolve()).as_posix()
+        except Exception:
+            return None
+
+    def set_probe(self, path: Path, *, duration: float | None, width: int | None, height: int | None, codec: str | None) -> None:
+        rel = self._rel(path)
+        if rel is None:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "UPDATE media SET duration = ?, width = ?, height = ?, codec = ? WHERE rel = ?",
+                    (duration, width, height, codec, rel),
+                )
+                self._conn.commit()
+            except Exception:
+                pass
+
+    def probe_missing(self, paths: Iterable[Path]) -> dict[Path, dict]:
+        """补齐未探测素材（V45.6：走共享探测缓存，并发批量探测），返回 {路径: 记录}。"""
+        out: dict[Path, dict] = {}
+        want = list(paths)
+        rels = {p: self._rel(p) for p in want}
+        rows: dict[Path, tuple] = {}
+        with self._lock:
+            for p, rel in rels.items():
+                if rel is None:
+                    continue
+                r = self._conn.execute("SELECT duration, width, height, codec FROM media WHERE rel = ?", (rel,)).fetchone()
+                if r is not None:
+                    rows[p] = r
+        todo: list[Path] = []
+        for p in want:
+            r = rows.get(p)
+            if r is not None and r[1] is not None:
+                out[p] = {"duration": r[0], "width": r[1], "height": r[2], "codec": r[3]}
+            else:
+                todo.append(p)
+        for p, info in probe_many(todo).items():
+            rec = {"duration": info.duration, "width": info.width, "height": info.height, "codec": info.codec}
+            out[p] = rec
+            if p in rows:
+                self.set_probe(p, **rec)
+        return out
+
+
+_INDEXES: dict[str, MediaIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(root: Path) -> MediaIndex:
+    """按根目录取进程级单例（盘符漂移时按解析后的路径区分）。"""
+    try:
+        key = str(Path(root).resolve())
+    except Exception:
+        key = str(root)
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is None:
+            idx = MediaIndex(Path(key))
+            _INDEXES[key] = idx
+        return idx
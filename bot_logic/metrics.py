@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+V45.1 进程内指标寄存器
+- 计数器：incr / set_gauge
+- 提供者：各子系统注册 snapshot 回调（TTS 路由、渲染调度等）
+健康端口 GET /metrics 以 JSON 导出 snapshot()。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+_LOCK = threading.Lock()
+_COUNTERS: dict[str, float] = {}
+_PROVIDERS: dict[str, Callable[[], dict[str, Any]]] = {}
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    with _LOCK:
+        _COUNTERS[name] = _COUNTERS.get(name, 0.0) + float(value)
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _LOCK:
+        _COUNTERS[name] = float(value)
+
+
+def get(name: str, default: float = 0.0) -> float:
+    with _LOCK:
+        return _COUNTERS.get(name, default)
+
+
+def register_provider(name: str, fn: Callable[[], dict[str, Any]]) -> None:
+    """同名重复注册以最后一次为准（模块热重载安全）。"""
+    with _LOCK:
+        _PROVIDERS[name] = fn
+
+
+def snapshot() -> dict[str, Any]:
+    with _LOCK:
+        counters = dict(_COUNTERS)
+        providers = dict(_PROVIDERS)
+    out: dict[str, Any] = {"ts": time.time(), "counters": counters}
+    for name, fn in providers.items():
+        try:
+            out[name] = fn()
+        except Exception as e:
+            # 指标导出失败不影响生产线
+            out[name] = {"error": str(e)[:200]}
+    return out
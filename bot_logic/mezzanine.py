@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+V45.8 入库夹层转码（mezzanine）
+- 每条工厂素材只转码一次：1280x720 / 30fps / yuv420p / 闭合 GOP H.264（无音轨）
+- 几何归一与 video_stitcher 的 seg_filter 完全一致（1.2x 放大 + 居中裁 1280x720）
+- 可选烘焙静态调色（eq），渲染时只剩 hflip 等轻量滤镜
+- 夹层存放在素材旁的隐藏目录 .mezz/，按源文件快速哈希命名（源被替换自动失效）
+命令行回填：python -m bot_logic.mezzanine --root <工厂根目录> --jobs 4 [--grade]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+MEZZ_DIRNAME = ".mezz"
+
+# 与 video_stitcher.seg_filter 对齐：几何归一（不含 hflip：翻转属于每次渲染的去重扰动）
+NORMALIZE_FILTER = (
+    "scale=trunc(1.2*iw/2)*2:trunc(1.2*ih/2)*2,"
+    "crop=1280:720:(iw-1280)/2:(ih-720)/2,"
+    "setsar=1,fps=30,format=yuv420p"
+)
+# 工业去重滤镜链的静态调色段
+RENDER_GRADE = "eq=contrast=1.3:saturation=0.5:brightness=-0.05"
+
+_HASH_CHUNK = 1024 * 1024
+_HASH_MEMO: dict[tuple[str, int, int], str] = {}
+_HASH_LOCK = threading.Lock()
+
+
+def source_hash(src: Path) -> str | None:
+    """快速源哈希：大小 + 首尾各 1MB（4K 素材整读太慢）。按 (路径, 大小, mtime) 进程内记忆。"""
+    try:
+        st = src.stat()
+        key = (str(src), int(st.st_size), int(st.st_mtime_ns))
+    except Exception:
+        return None
+    with _HASH_LOCK:
+        hit = _HASH_MEMO.get(key)
+    if hit:
+        return hit
+    try:
+        h = hashlib.sha1(str(st.st_size).encode("ascii"))
+        with open(src, "rb") as f:
+            h.update(f.read(_HASH_CHUNK))
+            if st.st_size > _HASH_CHUNK:
+                f.seek(max(_HASH_CHUNK, st.st_size - _HASH_CHUNK))
+                h.update(f.read(_HASH_CHUNK))
+        digest = h.hexdigest()[:16]
+    except Exception:
+        return None
+    with _HASH_LOCK:
+        _HASH_MEMO[key] = digest
+    return digest
+
+
+def mezzanine_path(src: Path, *, graded: bool) -> Path | None:
+    digest = source_hash(src)
+    if not digest:
+        return None
+    tag = "g" if graded else "n"
+    return src.parent / MEZZ_DIRNAME / f"{src.stem}.{digest}.{tag}.mp4"
+
+
+def find_mezzanine(src: Path) -> tuple[Path, bool] | None:
+    """已就绪的夹层：(路径, 是否已烘焙调色)；调色版优先。无则 None。"""
+    for graded in (True, False):
+        p = mezzanine_path(src, graded=graded)
+        try:
+            if p is not None and p.exists() and p.stat().st_size > 0:
+                return p, graded
+        except Exception:
+            continue
+    return None
+
+
+def render_filter(graded: bool) -> str:
+    """夹层输入的渲染期滤镜（与原 seg_filter 输出像素等价）。"""
+    chain = ["hflip"]
+    if not graded:
+        chain.append(RENDER_GRADE)
+    chain.append("setsar=1,format=yuv420p")
+    return ",".join(chain)
+
+
+def transcode(
+    src: Path,
+    *,
+    graded: bool = False,
+    preset: str = "veryfast",
+    crf: int = 18,
+    timeout_s: float = 1800.0,
+) -> Path | None:
+    """转码单条素材为夹层；已存在直接返回。失败返回 None（不抛错）。"""
+    out = mezzanine_path(src, graded=graded)
+    if out is None:
+        return None
+    if out.exists() and out.stat().st_size > 0:
+        return out
+    vf = NORMALIZE_FILTER + ("," + RENDER_GRADE if graded else "")
+    tmp = out.with_name(out.stem + f".{os.getpid()}.part.mp4")
+    try:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", str(src),
+            "-an",
+            "-vf", vf,
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", str(int(crf)),
+            "-pix_fmt", "yuv420p",
+            "-r", "30",
+            # 闭合 GOP、固定 2 秒关键帧：下游可按 GOP 边界直接 -c copy 切/拼
+            "-g", "60",
+            "-keyint_min", "60",
+            "-sc_threshold", "0",
+            "-flags", "+cgop",
+            "-movflags", "+faststart",
+            str(tmp),
+        ]
+        r = subprocess.run(cmd, capture_output=True, timeout=timeout_s, encoding="utf-8", errors="ignore")
+        if r.returncode != 0 or not tmp.exists():
+            print(f"[夹层] 转码失败: {src.name} {(r.stderr or '')[-300:]}")
+            return None
+        tmp.replace(out)
+        # 同源旧哈希的残留夹层（源已被替换）顺手清理
+        stale = re.compile(re.escape(src.stem) + r"\.[0-9a-f]{16}\." + ("g" if graded else "n") + r"\.mp4")
+        for old in out.parent.iterdir():
+            if old != out and stale.fullmatch(old.name):
+                try:
+                    old.unlink()
+                except Exception:
+                    pass
+        return out
+    except Exception as e:
+        print(f"[夹层] 转码异常: {src.name} {e}")
+        return None
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def backfill(root: Path, *, jobs: int = 2, graded: bool = False, preset: str = "veryfast", dry_run: bool = False) -> tuple[int, int, int]:
+    """为工厂内全部视频补齐夹层：返回 (新转码, 已存在, 失败)。"""
+    from bot_logic import media_index
+
+    idx = media_index.get_index(root)
+    idx.refresh(force=True)
+    sources = idx.files(exts=media_index.VIDEO_EXTS, refresh=False)
+    todo: list[Path] = []
+    ready = 0
+    for s in sources:
+        p = mezzanine_path(s, graded=graded)
+        if p is not None and p.exists():
+            ready += 1
+        else:
+            todo.append(s)
+    print(f"[夹层] 素材 {len(sources)} 条：已就绪 {ready}，待转码 {len(todo)}（并行 {jobs}）")
+    if dry_run or not todo:
+        return 0, ready, 0
+
+    done = failed = 0
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, int(jobs)), thread_name_prefix="mezz") as ex:
+        futs = {ex.submit(transcode, s, graded=graded, preset=preset): s for s in todo}
+        for i, fut in enumerate(as_completed(futs), 1):
+            if fut.result() is not None:
+                done += 1
+            else:
+                failed += 1
+            print(f"[夹层] {i}/{len(todo)} {futs[fut].name} ({time.monotonic() - t0:.0f}s)")
+    return done, ready, failed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="工厂素材夹层转码回填（1280x720/30fps/闭合 GOP）")
+    ap.add_argument("--root", default=os.getenv("JIUMO_FACTORY_DIR") or "", help="工厂根目录（默认 JIUMO_FACTORY_DIR）")
+    ap.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="并行转码数")
+    ap.add_argument("--grade", action="store_true", help="烘焙静态调色（eq）")
+    ap.add_argument("--preset", default="veryfast")
+    ap.add_argument("--dry-run", action="store_true", help="只统计不转码")
+    args = ap.parse_args(argv)
+    root = Path(args.root).expanduser()
+    if not args.root or not root.is_dir():
+        print(f"[夹层] 工厂根目录不存在: {root}")
+        return 2
+    done, ready, failed = backfill(root, jobs=args.jobs, graded=args.grade, preset=args.preset, dry_run=args.dry_run)
+    print(f"[夹层] 完成：新转码 {done}，已存在 {ready}，失败 {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
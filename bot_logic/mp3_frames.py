@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+V45.0 MP3 帧级工具箱（纯 Python，零子进程）
+- 解析 MPEG Layer III 帧头：按帧数精确计算时长
+- 同格式流帧级拼接（剥离 ID3 / Xing / Info / VBRI 头）
+- 预编码静音帧：补齐/生成任意时长的静音 mp3
+无法处理的输入一律返回 None / False，由调用方回退 FFmpeg。
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+# ─────────────────────────────────────────────────────────────
+# MPEG 音频常量表（仅 Layer III）
+# ─────────────────────────────────────────────────────────────
+# 版本位：00=MPEG2.5 / 10=MPEG2 / 11=MPEG1（01 保留）
+_VERSION_BITS = {0b00: 2.5, 0b10: 2.0, 0b11: 1.0}
+_VERSION_TO_BITS = {v: b for b, v in _VERSION_BITS.items()}
+
+_BITRATES_KBPS = {
+    1.0: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2.0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_BITRATES_KBPS[2.5] = _BITRATES_KBPS[2.0]
+
+_SAMPLE_RATES = {
+    1.0: [44100, 48000, 32000],
+    2.0: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+# 读取上限：口播 mp3 通常几十 KB，超大文件交给 FFmpeg
+_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class Mp3Format:
+    """拼接兼容性判定用的流格式（码率允许不同，VBR 可拼）。"""
+    version: float
+    sample_rate: int
+    channels: int
+
+    @property
+    def samples_per_frame(self) -> int:
+        return 1152 if self.version == 1.0 else 576
+
+
+@dataclass(frozen=True)
+class Mp3Stream:
+    """解析结果：原始字节 + 音频帧切片（已剔除标签与 VBR 信息帧）。"""
+    fmt: Mp3Format
+    data: bytes
+    frames: tuple[tuple[int, int], ...]  # (offset, length)
+
+    @property
+    def duration_seconds(self) -> float:
+        return len(self.frames) * self.fmt.samples_per_frame / float(self.fmt.sample_rate)
+
+    def iter_frame_bytes(self):
+        mv = memoryview(self.data)
+        for off, ln in self.frames:
+            yield mv[off:off + ln]
+
+
+def _parse_header(b0: int, b1: int, b2: int, b3: int) -> tuple[Mp3Format, int, bool] | None:
+    """解析 4 字节帧头，返回 (格式, 帧长, 是否带 CRC)；非法/非 Layer III 返回 None。"""
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version = _VERSION_BITS.get((b1 >> 3) & 0x03)
+    if version is None:
+        return None
+    if ((b1 >> 1) & 0x03) != 0b01:  # 仅 Layer III
+        return None
+    has_crc = (b1 & 0x01) == 0
+    br_idx = (b2 >> 4) & 0x0F
+    sr_idx = (b2 >> 2) & 0x03
+    if br_idx in (0, 15) or sr_idx == 3:  # free format / 保留值：交给 FFmpeg
+        return None
+    padding = (b2 >> 1) & 0x01
+    channels = 1 if ((b3 >> 6) & 0x03) == 0b11 else 2
+    bitrate = _BITRATES_KBPS[version][br_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    coef = 144 if version == 1.0 else 72
+    frame_len = coef * bitrate // sample_rate + padding
+    if frame_len < 4:
+        return None
+    return Mp3Format(version=version, sample_rate=sample_rate, channels=channels), frame_len, has_crc
+
+
+def _side_info_size(fmt: Mp3Format) -> int:
+    if fmt.version == 1.0:
+        return 17 if fmt.channels == 1 else 32
+    return 9 if fmt.channels == 1 else 17
+
+
+def _is_vbr_info_frame(data: bytes, off: int, ln: int, fmt: Mp3Format, has_crc: bool) -> bool:
+    """Xing/Info（LAME）与 VBRI（Fraunhofer）信息帧不含音频，拼接时必须剔除。"""
+    tag_at = off + 4 + (2 if has_crc else 0) + _side_info_size(fmt)
+    if data[tag_at:tag_at + 4] in (b"Xing", b"Info"):
+        return True
+    return data[off + 36:off + 40] == b"VBRI"
+
+
+def _skip_id3v2(data: bytes) -> int:
+    pos = 0
+    # 允许多个串联的 ID3v2 标签
+    while data[pos:pos + 3] == b"ID3" and len(data) >= pos + 10:
+        flags = data[pos + 5]
+        size_b = data[pos + 6:pos + 10]
+        if any(x & 0x80 for x in size_b):
+            break
+        size = (size_b[0] << 21) | (size_b[1] << 14) | (size_b[2] << 7) | size_b[3]
+        pos += 10 + size + (10 if flags & 0x10 else 0)
+    return pos
+
+
+def _audio_end(data: bytes) -> int:
+    end = len(data)
+    # ID3v1 尾标签（128 字节）
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return end
+
+
+def parse_mp3(path: str | Path) -> Mp3Stream | None:
+    """解析 mp3 的帧结构；无法确认格式（非 Layer III / 混合格式 / 大量垃圾数据）返回 None。"""
+    try:
+        p = Path(path)
+        if not p.exists() or not p.is_file():
+            return None
+        if p.stat().st_size > _MAX_BYTES:
+            return None
+        data = p.read_bytes()
+    except Exception:
+        return None
+
+    pos = _skip_id3v2(data)
+    end = _audio_end(data)
+    fmt: Mp3Format | None = None
+    frames: list[tuple[int, int]] = []
+    junk = 0
+    while pos + 4 <= end:
+        hdr = _parse_header(data[pos], data[pos + 1], data[pos + 2], data[pos + 3])
+        if hdr is None:
+            pos += 1
+            junk += 1
+            continue
+        f_fmt, f_len, has_crc = hdr
+        if pos + f_len > end:
+            # 截断的尾帧：丢弃（解码器同样会丢）
+            break
+        if fmt is None:
+            # 首帧防误同步：下一帧必须同格式（或恰好到达文件尾）
+            nxt = pos + f_len
+            if nxt + 4 <= end:
+                hdr2 = _parse_header(data[nxt], data[nxt + 1], data[nxt + 2], data[nxt + 3])
+                if hdr2 is None or hdr2[0] != f_fmt:
+                    pos += 1
+                    junk += 1
+                    continue
+            fmt = f_fmt
+            if _is_vbr_info_frame(data, pos, f_len, f_fmt, has_crc):
+                pos += f_len
+                continue
+        elif f_fmt != fmt:
+            # 流内格式漂移：帧级拼接/计时都不可信，交给 FFmpeg
+            return None
+        frames.append((pos, f_len))
+        pos += f_len
+
+    if fmt is None or not frames:
+        return None
+    # 垃圾字节超过 10%：判定为非标准流
+    if junk > max(1024, (end - _skip_id3v2(data)) // 10):
+        return None
+    return Mp3Stream(fmt=fmt, data=data, frames=tuple(frames))
+
+
+def mp3_duration_seconds(path: str | Path) -> float | None:
+    """按帧数计算精确时长（秒）；失败返回 None。"""
+    s = parse_mp3(path)
+    if s is None:
+        return None
+    d = s.duration_seconds
+    return d if d > 0 else None
+
+
+def mp3_format(path: str | Path) -> Mp3Format | None:
+    """只读首个有效帧的格式（采样率/声道），失败返回 None。"""
+    s = parse_mp3(path)
+    return s.fmt if s is not None else None
+
+
+def needs_resample(path: str | Path, *, sample_rate: int = 44100, channels: int = 2) -> bool:
+    """帧头已是目标采样率 / 声道则无需重编码；无法解析一律按需重编码处理。"""
+    fmt = mp3_format(path)
+    return fmt is None or fmt.sample_rate != int(sample_rate) or fmt.channels != int(channels)
+
+
+def _write_atomic(output_path: Path, chunks) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_path.with_name(output_path.name + f".{os.getpid()}.part")
+    try:
+        with open(tmp, "wb") as f:
+            for c in chunks:
+                f.write(c)
+        tmp.replace(output_path)
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def concat_mp3_frames(segment_paths: list[Path], output_path: Path) -> bool:
+    """同格式 mp3 帧级拼接；任一片段无法解析或格式不一致则返回 False（不写文件）。"""
+    if not segment_paths:
+        return False
+    streams: list[Mp3Stream] = []
+    for p in segment_paths:
+        s = parse_mp3(p)
+        if s is None:
+            return False
+        if streams and s.fmt != streams[0].fmt:
+            return False
+        streams.append(s)
+
+    def _chunks():
+        for s in streams:
+            yield from s.iter_frame_bytes()
+
+    try:
+        _write_atomic(Path(output_path), _chunks())
+        return True
+    except Exception:
+        return False
+
+
+# ─────────────────────────────────────────────────────────────
+# 预编码静音帧
+# ─────────────────────────────────────────────────────────────
+_SILENT_FRAME_CACHE: dict[tuple[float, int, int, int], bytes] = {}
+
+
+def silent_frame(fmt: Mp3Format, *, bitrate_kbps: int | None = None) -> bytes | None:
+    """
+    构造一帧静音 Layer III 帧：side info 全零（part2_3_length=0）→ 所有频线为 0。
+    不带 padding，帧长取整；返回 None 表示该格式/码率组合不合法。
+    """
+    br = int(bitrate_kbps or (128 if fmt.version == 1.0 else 64))
+    key = (fmt.version, fmt.sample_rate, fmt.channels, br)
+    cached = _SILENT_FRAME_CACHE.get(key)
+    if cached is not None:
+        return cached
+    try:
+        br_idx = _BITRATES_KBPS[fmt.version].index(br)
+        sr_idx = _SAMPLE_RATES[fmt.version].index(fmt.sample_rate)
+    except (KeyError, ValueError):
+        return None
+    if br_idx == 0:
+        return None
+    b1 = 0xE0 | (_VERSION_TO_BITS[fmt.version] << 3) | (0b01 << 1) | 0x01  # Layer III，无 CRC
+    b2 = (br_idx << 4) | (sr_idx << 2)
+    b3 = (0b11 if fmt.channels == 1 else 0b00) << 6
+    coef = 144 if fmt.version == 1.0 else 72
+    frame_len = coef * br * 1000 // fmt.sample_rate
+    frame = bytes([0xFF, b1, b2, b3]) + bytes(frame_len - 4)
+    _SILENT_FRAME_CACHE[key] = frame
+    return frame
+
+
+def _frames_for(seconds: float, fmt: Mp3Format) -> int:
+    n = float(seconds) * fmt.sample_rate / fmt.samples_per_frame
+    whole = int(n)
+    return whole + (1 if n - whole > 1e-9 else 0)
+
+
+def write_silent_mp3(
+    mp3_path: Path,
+    *,
+    seconds: float,
+    sample_rate: int = 44100,
+    channels: int = 2,
+    bitrate_kbps: int = 128,
+) -> bool:
+    """直接写出静音 mp3（默认 44.1kHz 立体声 128k，与 ensure_mp3_44100 输出同规格）。"""
+    version = next((v for v, rates in _SAMPLE_RATES.items() if sample_rate in rates), None)
+    if version is None or seconds <= 0:
+        return False
+    fmt = Mp3Format(version=version, sample_rate=int(sample_rate), channels=2 if channels >= 2 else 1)
+    frame = silent_frame(fmt, bitrate_kbps=bitrate_kbps)
+    if frame is None:
+        return False
+    n = _frames_for(seconds, fmt)
+    try:
+        _write_atomic(Path(mp3_path), [frame * n])
+        return True
+    except Exception:
+        return False
+
+
+def pad_mp3_to_duration(mp3_path: Path, *, seconds: float) -> bool:
+    """用同格式静音帧把 mp3 尾部补齐到 seconds（已够长则不动）；无法解析返回 False。"""
+    s = parse_mp3(mp3_path)
+    if s is None:
+        return False
+    missing = float(seconds) - s.duration_seconds
+    if missing <= 0:
+        return True
+    frame = silent_frame(s.fmt)
+    if frame is None:
+        return False
+    n = _frames_for(missing, s.fmt)
+
+    def _chunks():
+        yield from s.iter_frame_bytes()
+        yield frame * n
+
+    try:
+        _write_atomic(Path(mp3_path), _chunks())
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+V45.6 共享 ffprobe 元数据缓存（bot.py / v13_video_synth / v13_1_industrial_synth 共用）
+- 键：(绝对路径, 文件大小, mtime_ns)；文件被替换/改写自动失效
+- 持久化：缓存目录下 probe_cache.sqlite（跨进程、跨重启复用）
+- 单次 ffprobe 取全：时长 / 宽高 / 帧率 / 编码 / 关键帧间隔（只读前 10 秒包）
+- 批量未命中：有界线程池并发拉起 ffprobe 子进程
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterable
+
+from bot_logic.cachedir import cache_root
+
+
+@dataclass(frozen=True)
+class ProbeInfo:
+    duration: float
+    width: int
+    height: int
+    fps: float
+    codec: str
+    keyframe_interval: float | None  # 秒；前 10 秒内不足两个关键帧则为 None
+
+
+def _parse_rate(s: str | None) -> float:
+    try:
+        if not s or s in ("0/0", "N/A"):
+            return 0.0
+        if "/" in s:
+            a, b = s.split("/", 1)
+            return float(a) / float(b) if float(b) else 0.0
+        return float(s)
+    except Exception:
+        return 0.0
+
+
+def ffprobe_info(path: Path, *, timeout_s: float = 15.0) -> ProbeInfo | None:
+    """单次 ffprobe：format 时长 + 首路视频流参数 + 前 10 秒包标记（算 GOP）。失败返回 None。"""
+    try:
+        r = subprocess.run(
+            [
+                "ffprobe", "-v", "error",
+                "-select_streams", "v:0",
+                "-read_intervals", "%+10",
+                "-show_entries", "format=duration:stream=codec_name,width,height,avg_frame_rate,r_frame_rate:packet=pts_time,flags",
+                "-of", "json",
+                str(path),
+            ],
+            capture_output=True,
+            timeout=timeout_s,
+            encoding="utf-8",
+            errors="ignore",
+        )
+        if r.returncode != 0:
+            return None
+        body = json.loads(r.stdout or "{}")
+    except Exception:
+        return None
+
+    fmt = body.get("format") or {}
+    st = (body.get("streams") or [{}])[0]
+    try:
+        duration = max(0.0, float(fmt.get("duration")))
+    except Exception:
+        duration = 0.0
+    fps = _parse_rate(st.get("avg_frame_rate")) or _parse_rate(st.get("r_frame_rate"))
+
+    key_ts: list[float] = []
+    for pk in body.get("packets") or []:
+        if "K" not in str(pk.get("flags") or ""):
+            continue
+        try:
+            key_ts.append(float(pk.get("pts_time")))
+        except Exception:
+            continue
+    key_ts.sort()
+    gop = None
+    if len(key_ts) >= 2:
+        gop = (key_ts[-1] - key_ts[0]) / (len(key_ts) - 1)
+
+    return ProbeInfo(
+        duration=duration,
+        width=int(st.get("width") or 0),
+        height=int(st.get("height") or 0),
+        fps=round(fps, 3),
+        codec=str(st.get("codec_name") or ""),
+        keyframe_interval=round(gop, 3) if gop else None,
+    )
+
+
+def _workers() -> int:
+    try:
+        n = int((os.getenv("JUNSHI_PROBE_WORKERS") or "").strip() or 0)
+    except Exception:
+        n = 0
+    return n if n > 0 else min(8, max(2, os.cpu_count() or 2))
+
+
+class ProbeCache:
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._mem: dict[tuple[str, int, int], ProbeInfo] = {}
+        self._conn: sqlite3.Connection | None = None
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            except Exception:
+                pass
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS probe ("
+                " path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, info TEXT NOT NULL,"
+                " PRIMARY KEY (path, size, mtime_ns))"
+            )
+            conn.commit()
+            self._conn = conn
+        except Exception:
+            # 缓存盘不可写：退化为进程内缓存
+            self._conn = None
+
+    @staticmethod
+    def _key(path: Path) -> tuple[str, int, int] | None:
+        try:
+            p = Path(path).resolve()
+            st = p.stat()
+            return (str(p), int(st.st_size), int(st.st_mtime_ns))
+        except Exception:
+            return None
+
+    def _lookup(self, key: tuple[str, int, int]) -> ProbeInfo | None:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None or self._conn is None:
+                return hit
+            try:
+                row = self._conn.execute(
+                    "SELECT info FROM probe WHERE path = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+            except Exception:
+                row = None
+        if row is None:
+            return None
+        try:
+            info = ProbeInfo(**json.loads(row[0]))
+        except Exception:
+            return None
+        with self._lock:
+            self._mem[key] = info
+        return info
+
+    def _store(self, key: tuple[str, int, int], info: ProbeInfo) -> None:
+        with self._lock:
+            self._mem[key] = info
+            if self._conn is None:
+                return
+            try:
+                # 同一路径只保留最新版本
+                self._conn.execute("DELETE FROM probe WHERE path = ?", (key[0],))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO probe(path, size, mtime_ns, info) VALUES (?, ?, ?, ?)",
+                    (*key, json.dumps(asdict(info))),
+                )
+                self._conn.commit()
+            except Exception:
+                pass
+
+    def get(self, path: Path) -> ProbeInfo | None:
+        key = self._key(path)
+        if key is None:
+            return None
+        hit = self._lookup(key)
+        if hit is not None:
+            return hit
+        info = ffprobe_info(Path(key[0]))
+        if info is not None:
+            self._store(key, info)
+        return info
+
+    def get_many(self, paths: Iterable[Path], *, max_workers: int | None = None) -> dict[Path, ProbeInfo]:
+        """批量查询：命中直接返回，未命中并发探测。返回字典以调用方传入的 Path 为键；探测失败的不出现。"""
+        out: dict[Path, ProbeInfo] = {}
+        misses: list[tuple[Path, tuple[str, int, int]]] = []
+        for p in dict.fromkeys(paths):
+            key = self._key(p)
+            if key is None:
+                continue
+            hit = self._lookup(key)
+            if hit is not None:
+                out[p] = hit
+            else:
+                misses.append((p, key))
+        if not misses:
+            return out
+        n = max(1, min(len(misses), int(max_workers or _workers())))
+        with ThreadPoolExecutor(max_workers=n, thread_name_prefix="ffprobe") as ex:
+            results = list(ex.map(lambda m: ffprobe_info(Path(m[1][0])), misses))
+        for (p, key), info in zip(misses, results):
+            if info is None:
+                continue
+            self._store(key, info)
+            out[p] = info
+        return out
+
+    def duration(self, path: Path) -> float:
+        info = self.get(path)
+        return info.duration if info is not None else 0.0
+
+
+_CACHE: ProbeCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ProbeCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ProbeCache(cache_root() / "probe_cache.sqlite")
+        return _CACHE
+
+
+def probe(path: Path) -> ProbeInfo | None:
+    return get_cache().get(path)
+
+
+def probe_many(paths: Iterable[Path], *, max_workers: int | None = None) -> dict[Path, ProbeInfo]:
+    return get_cache().get_many(paths, max_workers=max_workers)
+
+
+def probe_duration(path: Path) -> float:
+    """时长（秒）；探测失败返回 0.0（与旧版 _probe_video_duration_seconds 语义一致）。"""
+    return get_cache().duration(path)
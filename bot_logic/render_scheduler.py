@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+V47.1 CPU 感知渲染调度（取代固定 render_semaphore(3) / SaaS 的 Semaphore(1)）
+libx264 默认按核数开线程：2 vCPU 的 Zeabur 上并发 3 路严重超订，32 核机器却大半闲置。
+- 容量：cgroup CPU 配额（v2 cpu.max / v1 cfs_quota_us）、CPU 亲和性、os.cpu_count() 取最小
+- 每路线程：JUNSHI_RENDER_JOB_THREADS，默认 ≤4 核给 2 线程、更多核给 4 线程（不超过总容量）
+- 准入：按线程预算（JUNSHI_RENDER_THREADS 可覆盖总量）而不是固定路数；JUNSHI_RENDER_CONCURRENCY 仍可额外封顶路数
+- 本路 ffmpeg 自动带 -threads / -filter_threads（ffmpeg_runner.thread_budget）
+兼容旧用法：`async with scheduler:` 等价于按默认线程数申请一路。
+命令行：python -m bot_logic.render_scheduler info
+        python -m bot_logic.render_scheduler bench --audio a.mp3 --jobs 6 --job-threads 1,2,4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from bot_logic import ffmpeg_runner, metrics
+
+
+def _env_int(name: str) -> int | None:
+    try:
+        v = int((os.getenv(name) or "").strip())
+        return v if v > 0 else None
+    except Exception:
+        return None
+
+
+def _read(path: str) -> str:
+    try:
+        return Path(path).read_text(encoding="utf-8").strip()
+    except Exception:
+        return ""
+
+
+def cgroup_cpu_limit() -> float | None:
+    """cgroup CPU 配额折算的核数（可为小数）；无限制 / 读不到返回 None。"""
+    # v2：cpu.max = "<quota> <period>" 或 "max <period>"；容器内一般挂在根，宿主上按 /proc/self/cgroup 定位
+    rel = ""
+    for ln in _read("/proc/self/cgroup").splitlines():
+        if ln.startswith("0::"):
+            rel = ln[3:].strip().lstrip("/")
+    for p in dict.fromkeys(["/sys/fs/cgroup/cpu.max", f"/sys/fs/cgroup/{rel}/cpu.max" if rel else ""]):
+        parts = _read(p).split() if p else []
+        if len(parts) == 2 and parts[0] != "max":
+            try:
+                return max(0.01, int(parts[0]) / int(parts[1]))
+            except Exception:
+                pass
+    # v1
+    for base in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        q, per = _read(f"{base}/cpu.cfs_quota_us"), _read(f"{base}/cpu.cfs_period_us")
+        try:
+            if q and per and int(q) > 0:
+                return max(0.01, int(q) / int(per))
+        except Exception:
+            pass
+    return None
+
+
+def cpu_capacity() -> tuple[int, str]:
+    """(可用核数, 来源)。"""
+    n, source = os.cpu_count() or 1, "cpu_count"
+    try:
+        aff = len(os.sched_getaffinity(0))
+        if 0 < aff < n:
+            n, source = aff, "affinity"
+    except Exception:
+        pass
+    quota = cgroup_cpu_limit()
+    if quota is not None and math.ceil(quota) < n:
+        n, source = max(1, math.ceil(quota)), "cgroup"
+    return max(1, n), source
+
+
+def default_job_threads(total: int) -> int:
+    """每路线程数：小机器 2 线程（x264 ultrafast 720p 在 2 线程后收益递减），大机器 4 线程。"""
+    return max(1, min(total, 2 if total <= 4 else 4))
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    threads: int
+    filter_threads: int
+
+
+class RenderScheduler:
+    """按线程预算准入的渲染调度器（asyncio）。"""
+
+    def __init__(self, total_threads: int | None = None, *, job_threads: int | None = None, max_jobs: int | None = None):
+        cores, source = cpu_capacity()
+        self.total = max(1, int(total_threads or _env_int("JUNSHI_RENDER_THREADS") or cores))
+        self.source = "override" if (total_threads or _env_int("JUNSHI_RENDER_THREADS")) else source
+        self.job_threads = max(1, min(self.total, int(job_threads or _env_int("JUNSHI_RENDER_JOB_THREADS") or default_job_threads(self.total))))
+        self.max_jobs = max_jobs if max_jobs is not None else _env_int("JUNSHI_RENDER_CONCURRENCY")
+        self.used = 0
+        self.active = 0
+        self.waiting = 0
+        self._cond: asyncio.Condition | None = None
+        self._held: dict[asyncio.Task, tuple[int, object]] = {}
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _fits(self, need: int) -> bool:
+        if self.max_jobs and self.active >= self.max_jobs:
+            return False
+        return self.used + need <= self.total
+
+    async def acquire(self, threads: int | None = None) -> ThreadBudget:
+        need = max(1, min(self.total, int(threads or self.job_threads)))
+        cond = self._condition()
+        t0 = time.monotonic()
+        async with cond:
+            self.waiting += 1
+            try:
+                await cond.wait_for(lambda: self._fits(need))
+            finally:
+                self.waiting -= 1
+            self.used += need
+            self.active += 1
+        metrics.incr("render.queue_wait_s", time.monotonic() - t0)
+        self._gauges()
+        return ThreadBudget(threads=need, filter_threads=need)
+
+    async def release(self, budget: ThreadBudget) -> None:
+        cond = self._condition()
+        async with cond:
+            self.used = max(0, self.used - budget.threads)
+            self.active = max(0, self.active - 1)
+            cond.notify_all()
+        self._gauges()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, threads: int | None = None) -> AsyncIterator[ThreadBudget]:
+        """申请一路渲染；块内 ffmpeg 按分到的线程预算运行。"""
+        budget = await self.acquire(threads)
+        try:
+            with ffmpeg_runner.thread_budget(budget.threads, budget.filter_threads):
+                yield budget
+        finally:
+            await asyncio.shield(self.release(budget))
+
+    # 兼容 `async with render_semaphore:`（旧调用点不改写法）
+    async def __aenter__(self) -> ThreadBudget:
+        budget = await self.acquire()
+        task = asyncio.current_task()
+        if task is not None:
+            self._held[task] = (budget.threads, ffmpeg_runner.set_thread_budget(budget.threads, budget.filter_threads))
+        return budget
+
+    async def __aexit__(self, *exc) -> None:
+        task = asyncio.current_task()
+        held = self._held.pop(task, None) if task is not None else None
+        threads = self.job_threads
+        if held is not None:
+            threads, token = held
+            ffmpeg_runner.reset_thread_budget(token)  # type: ignore[arg-type]
+        await asyncio.shield(self.release(ThreadBudget(threads, threads)))
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("render.threads_used", self.used)
+        metrics.set_gauge("render.jobs_active", self.active)
+
+    def describe(self) -> str:
+        cap = f"，最多 {self.max_jobs} 路" if self.max_jobs else ""
+        return f"{self.total} 线程预算（{self.source}）→ 每路 {self.job_threads} 线程，约 {max(1, self.total // self.job_threads)} 路并发{cap}"
+
+    def snapshot(self) -> dict:
+        return {
+            "total_threads": self.total,
+            "source": self.source,
+            "job_threads": self.job_threads,
+            "max_jobs": self.max_jobs,
+            "threads_used": self.used,
+            "jobs_active": self.active,
+            "jobs_waiting": self.waiting,
+        }
+
+
+_SCHEDULER: RenderScheduler | None = None
+
+
+def get_scheduler() -> RenderScheduler:
+    """进程内共享调度器（批量生产与 SaaS 共用同一份线程预算）。"""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = RenderScheduler()
+        print(f"[火控] 渲染调度: {_SCHEDULER.describe()}")
+    return _SCHEDULER
+
+
+def snapshot() -> dict:
+    return _SCHEDULER.snapshot() if _SCHEDULER is not None else {"initialized": False}
+
+
+metrics.register_provider("render_scheduler", snapshot)
+
+
+async def _bench_one(audio: Path, out_dir: Path, *, jobs: int, job_threads: int, total: int, industry: str) -> dict:
+    import bot  # 延迟导入：压测才需要完整依赖
+
+    sched = RenderScheduler(total, job_threads=job_threads, max_jobs=0)
+    profile = {"_industry": industry, "watermark_text": f"{industry} · 核心拆解"}
+
+    async def _one(i: int) -> dict:
+        out = out_dir / f"t{job_threads}_{i}.mp4"
+        out.unlink(missing_ok=True)
+        t_submit = time.monotonic()
+        async with sched.slot():
+            t_start = time.monotonic()
+            try:
+                ok = bool((await bot.video_stitcher_async(str(audio), str(out), dict(profile)))[0])
+            except Exception as e:
+                print(f"[压测] t{job_threads}#{i} 异常: {e}")
+                ok = False
+        t_end = time.monotonic()
+        return {"ok": ok, "latency_s": t_end - t_submit, "encode_s": t_end - t_start}
+
+    t0 = time.monotonic()
+    rows = await asyncio.gather(*[_one(i) for i in range(jobs)])
+    wall = time.monotonic() - t0
+    lat = sorted(r["latency_s"] for r in rows)
+    enc = sorted(r["encode_s"] for r in rows)
+    return {
+        "job_threads": job_threads,
+        "parallel_jobs": max(1, total // job_threads),
+        "ok": sum(1 for r in rows if r["ok"]),
+        "wall_s": round(wall, 2),
+        "renders_per_min": round(60.0 * jobs / wall, 2) if wall > 0 else None,
+        "latency_p50_s": round(lat[len(lat) // 2], 2),
+        "latency_max_s": round(lat[-1], 2),
+        "encode_p50_s": round(enc[len(enc) // 2], 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="CPU 感知渲染调度：容量探测 / 线程预算压测")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info", help="打印 CPU 容量与默认调度")
+    bp = sub.add_parser("bench", help="不同每路线程数下的吞吐（条/分钟）与单条延迟")
+    bp.add_argument("--audio", required=True, help="旁白 mp3")
+    bp.add_argument("--jobs", type=int, default=6, help="每档渲染条数")
+    bp.add_argument("--job-threads", default="1,2,4", help="每路线程数档位，逗号分隔")
+    bp.add_argument("--total", type=int, default=0, help="总线程预算（默认按 CPU 容量）")
+    bp.add_argument("--industry", default="自媒体")
+    bp.add_argument("--out", default="", help="成片目录（默认 <战备仓>/sched_bench）")
+    args = ap.parse_args(argv)
+    cores, source = cpu_capacity()
+    if args.cmd == "info":
+        print(json.dumps({"cores": cores, "source": source, "cgroup_quota": cgroup_cpu_limit(), **RenderScheduler().snapshot()}, ensure_ascii=False, indent=2))
+        return 0
+    audio = Path(args.audio).expanduser()
+    if not audio.is_file():
+        print(f"[压测] 音频不存在: {audio}")
+        return 2
+    from bot_logic.workspace import staging_root
+
+    out_dir = Path(args.out).expanduser() if args.out else staging_root() / "sched_bench"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    total = max(1, args.total or cores)
+    rows = []
+    for k in [int(x) for x in str(args.job_threads).split(",") if x.strip().isdigit()]:
+        k = max(1, min(total, k))
+        rows.append(asyncio.run(_bench_one(audio, out_dir, jobs=max(1, args.jobs), job_threads=k, total=total, industry=args.industry)))
+        print(f"[压测] 每路 {k} 线程: {rows[-1]['renders_per_min']} 条/分钟，p50 延迟 {rows[-1]['latency_p50_s']}s")
+    print(json.dumps({"cores": cores, "source": source, "total_threads": total, "results": rows}, ensure_ascii=False, indent=2))
+    return 0 if all(r["ok"] == max(1, args.jobs) for r in rows) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
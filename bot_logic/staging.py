@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+V46.0 战备仓零拷贝搬运
+目的不变：给 FFmpeg 一个纯英文、无转义风险的输入路径；手段从“整文件复制”改为：
+  硬链接 → reflink（FICLONE，Btrfs/XFS 同盘 CoW）→ 符号链接 → 复制（最后兜底）
+每次渲染记录搬运字节数 / 实际复制字节数 / 耗时（metrics: staging.*）。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from bot_logic import metrics
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+@dataclass
+class StagingStats:
+    """单次渲染的战备仓搬运统计。"""
+    files: int = 0
+    bytes_staged: int = 0  # 逻辑字节（源文件大小之和）
+    bytes_copied: int = 0  # 实际落盘复制的字节
+    seconds: float = 0.0
+    methods: dict[str, int] = field(default_factory=dict)
+
+    def record(self, method: str, size: int, elapsed: float) -> None:
+        self.files += 1
+        self.bytes_staged += size
+        if method == "copy":
+            self.bytes_copied += size
+        self.seconds += elapsed
+        self.methods[method] = self.methods.get(method, 0) + 1
+
+    def summary(self) -> str:
+        mix = " ".join(f"{k}={v}" for k, v in sorted(self.methods.items()))
+        return (
+            f"搬运 {self.files} 个文件 {self.bytes_staged / 1048576:.1f}MB"
+            f"（实际复制 {self.bytes_copied / 1048576:.1f}MB，{self.seconds * 1000:.0f}ms；{mix}）"
+        )
+
+
+_CURRENT: contextvars.ContextVar[StagingStats | None] = contextvars.ContextVar("junshi_staging_stats", default=None)
+
+
+@contextmanager
+def track_staging() -> Iterator[StagingStats]:
+    """在当前上下文内累计 stage_file 统计（asyncio.to_thread 会带上 contextvar）。"""
+    st = StagingStats()
+    token = _CURRENT.set(st)
+    try:
+        yield st
+    finally:
+        _CURRENT.reset(token)
+
+
+def _try_reflink(src: Path, dst: Path) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+    except Exception:
+        return False
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        return True
+    except Exception:
+        try:
+            dst.unlink(missing_ok=True)
+        except Exception:
+            pass
+        return False
+
+
+def stage_file(src: str | Path, dst: str | Path) -> str:
+    """
+    把 src 搬到战备仓 dst，返回所用方式：hardlink / reflink / symlink / copy。
+    dst 已存在先删除；全部失败抛出最后一次异常（调用方沿用原有降级分支）。
+    """
+    s = Path(src)
+    d = Path(dst)
+    t0 = time.perf_counter()
+    d.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if d.is_symlink() or d.exists():
+            d.unlink()
+    except Exception:
+        pass
+    size = 0
+    try:
+        size = s.stat().st_size
+    except Exception:
+        pass
+
+    method = None
+    try:
+        os.link(s, d)
+        method = "hardlink"
+    except Exception:
+        pass
+    if method is None and _try_reflink(s, d):
+        method = "reflink"
+    if method is None:
+        try:
+            # 链接到绝对路径：战备仓被整体清空时不影响原素材
+            os.symlink(s.resolve(), d)
+            method = "symlink"
+        except Exception:
+            pass
+    if method is None:
+        shutil.copy2(s, d)
+        method = "copy"
+
+    elapsed = time.perf_counter() - t0
+    st = _CURRENT.get()
+    if st is not None:
+        st.record(method, size, elapsed)
+    metrics.incr(f"staging.{method}")
+    metrics.incr("staging.bytes_staged", size)
+    if method == "copy":
+        metrics.incr("staging.bytes_copied", size)
+    metrics.incr("staging.seconds", elapsed)
+    return method
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+V45.1 额度感知 TTS 路由（进程级单例，所有并发血弹共享）
+- 轮询 ElevenLabs /v1/user/subscription 追踪剩余字符额度（后台刷新，不占血弹关键路径；按最近一次额度路由）
+- 每发请求按脚本字数判定：额度够 → ElevenLabs，不够 → 直接副火控
+- 首个 401/429 额度错误即熔断：后续血弹跳过注定失败的往返
+- 熔断冷却到期后半开，只放行 1 发探测请求
+导出：回退比例 / 节省时间（metrics provider: tts_router）
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from bot_logic import metrics
+
+
+class CircuitBreaker:
+    """
+    通用熔断器：CLOSED → OPEN（冷却）→ HALF_OPEN（单发探测）→ CLOSED/OPEN。
+    线程安全；asyncio 单循环内调用同样安全（所有方法不 await）。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, *, cooldown_s: float = 300.0):
+        self.name = name
+        self.cooldown_s = max(1.0, float(cooldown_s))
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.trip_count = 0
+        self.last_status_code: int | None = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> tuple[bool, bool]:
+        """返回 (是否放行, 是否为半开探测)。"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True, False
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_s:
+                    return False, False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN：只放行 1 发探测
+            if self._probe_in_flight:
+                return False, False
+            self._probe_in_flight = True
+            return True, True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+            self.last_status_code = None
+
+    def record_failure(self, status_code: int | None = None) -> None:
+        """额度类失败：立即熔断（半开探测失败则重新计时）。"""
+        with self._lock:
+            if self._state != self.OPEN:
+                self.trip_count += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            if status_code is not None:
+                self.last_status_code = int(status_code)
+
+    def release_probe(self) -> None:
+        """探测请求以非额度错误结束：无法判定，回到 OPEN 重新冷却。"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            remaining = 0.0
+            if self._state == self.OPEN:
+                remaining = max(0.0, self.cooldown_s - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "trip_count": self.trip_count,
+                "cooldown_remaining_s": round(remaining, 1),
+                "last_status_code": self.last_status_code,
+            }
+
+
+@dataclass
+class TTSRoute:
+    """单发路由决策。engine: eleven / fallback；status_code 用于复用旧的 401 降级分支。"""
+    engine: str
+    reason: str
+    chars: int
+    probe: bool = False
+    status_code: int | None = None
+
+
+class ElevenQuotaRouter:
+    SUBSCRIPTION_URL = "https://api.elevenlabs.io/v1/user/subscription"
+
+    def __init__(
+        self,
+        *,
+        poll_interval_s: float = 120.0,
+        cooldown_s: float = 300.0,
+        poll_timeout_s: float = 10.0,
+        probe_timeout_s: float = 3.0,
+    ):
+        self.poll_interval_s = max(10.0, float(poll_interval_s))
+        self.poll_timeout_s = max(1.0, float(poll_timeout_s))
+        self.probe_timeout_s = max(0.5, float(probe_timeout_s))
+        self.breaker = CircuitBreaker("elevenlabs", cooldown_s=cooldown_s)
+        self._lock = threading.Lock()
+        self._remaining_chars: int | None = None
+        self._character_limit: int | None = None
+        self._reset_unix: int | None = None
+        self._last_poll = 0.0
+        self._poll_in_flight = False
+        self._poll_tasks: set[asyncio.Task] = set()
+        # 失败往返耗时 EWMA：用于估算熔断节省的时间
+        self._doomed_rtt_s = 1.5
+        self.routed_eleven = 0
+        self.routed_fallback = 0
+        self.quota_errors = 0
+        self.time_saved_s = 0.0
+
+    # ── 额度轮询 ─────────────────────────────────────────────
+    async def refresh_quota(
+        self,
+        client: httpx.AsyncClient,
+        api_key: str | None,
+        *,
+        force: bool = False,
+        timeout: float | None = None,
+    ) -> None:
+        """拉取剩余字符额度；同一时刻只有 1 个轮询在飞，失败静默（额度未知 = 不拦截）。"""
+        if not api_key or not self._claim_poll(force=force):
+            return
+        await self._poll(client, api_key, timeout=timeout)
+
+    def _claim_poll(self, *, force: bool = False) -> bool:
+        """占用唯一的轮询名额（到期且无在飞轮询才成功）；占到后必须由 _poll 释放。"""
+        with self._lock:
+            due = force or (time.monotonic() - self._last_poll >= self.poll_interval_s)
+            if not due or self._poll_in_flight:
+                return False
+            self._poll_in_flight = True
+            return True
+
+    async def _poll(self, client: httpx.AsyncClient, api_key: str, *, timeout: float | None = None) -> None:
+        try:
+            resp = await client.get(
+                self.SUBSCRIPTION_URL,
+                headers={"xi-api-key": api_key, "X-Seed-NS": str(time.time_ns())},
+                timeout=float(timeout or self.poll_timeout_s),
+            )
+            if resp.status_code != 200:
+                return
+            body = resp.json()
+            limit = int(body.get("character_limit") or 0)
+            used = int(body.get("character_count") or 0)
+            with self._lock:
+                self._character_limit = limit
+                self._remaining_chars = max(0, limit - used)
+                self._reset_unix = body.get("next_character_count_reset_unix")
+        except Exception:
+            return
+        finally:
+            with self._lock:
+                self._last_poll = time.monotonic()
+                self._poll_in_flight = False
+
+    def schedule_refresh(self, client: httpx.AsyncClient, api_key: str | None) -> None:
+        """到期则在后台刷新额度（fire-and-forget）：慢轮询不拖住本发 TTS。"""
+        if not api_key or not self._claim_poll():
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._poll(client, api_key))
+        except RuntimeError:
+            with self._lock:
+                self._poll_in_flight = False
+            return
+        # 持有引用，防止任务在完成前被回收
+        self._poll_tasks.add(task)
+        task.add_done_callback(self._poll_tasks.discard)
+
+    # ── 路由决策 ─────────────────────────────────────────────
+    async def route(self, client: httpx.AsyncClient, api_key: str | None, chars: int) -> TTSRoute:
+        chars = max(0, int(chars))
+        allowed, probe = self.breaker.allow()
+        if not allowed:
+            return self._fallback(chars, "breaker_open", self.breaker.last_status_code or 401)
+
+        if not probe:
+            self.schedule_refresh(client, api_key)
+        else:
+            # 半开探测前强制刷新额度（短超时）：额度已重置则直接放行；超时按最近一次额度判定
+            await self.refresh_quota(client, api_key, force=True, timeout=self.probe_timeout_s)
+
+        with self._lock:
+            remaining = self._remaining_chars
+            if remaining is not None and remaining < chars:
+                budget_short = True
+            else:
+                budget_short = False
+                if remaining is not None:
+                    # 预扣额度，避免并发血弹同时透支
+                    self._remaining_chars = remaining - chars
+        if budget_short:
+            if probe:
+                self.breaker.record_failure(401)
+            return self._fallback(chars, "budget_short", 401)
+
+        with self._lock:
+            self.routed_eleven += 1
+        return TTSRoute(engine="eleven", reason="probe" if probe else "ok", chars=chars, probe=probe)
+
+    def _fallback(self, chars: int, reason: str, status_code: int) -> TTSRoute:
+        with self._lock:
+            self.routed_fallback += 1
+            self.time_saved_s += self._doomed_rtt_s
+        metrics.incr("tts.fallback_routed")
+        return TTSRoute(engine="fallback", reason=reason, chars=chars, status_code=int(status_code))
+
+    # ── 结果回填 ─────────────────────────────────────────────
+    def record_success(self, route: TTSRoute) -> None:
+        self.breaker.record_success()
+        metrics.incr("tts.eleven_ok")
+
+    def record_quota_error(self, route: TTSRoute, status_code: int, *, elapsed_s: float | None = None) -> None:
+        """额度错误：熔断 + 本地额度归零（等下次轮询校正）。"""
+        self.breaker.record_failure(status_code)
+        with self._lock:
+            self.quota_errors += 1
+            self._remaining_chars = 0
+            if elapsed_s is not None and elapsed_s > 0:
+                self._doomed_rtt_s = 0.7 * self._doomed_rtt_s + 0.3 * float(elapsed_s)
+        metrics.incr("tts.eleven_quota_error")
+
+    def record_error(self, route: TTSRoute) -> None:
+        """非额度错误（网络/5xx）：退还预扣；探测请求则回到 OPEN。"""
+        with self._lock:
+            if self._remaining_chars is not None:
+                self._remaining_chars += route.chars
+        if route.probe:
+            self.breaker.release_probe()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.routed_eleven + self.routed_fallback
+            out = {
+                "routed_eleven": self.routed_eleven,
+                "routed_fallback": self.routed_fallback,
+                "fallback_ratio": round(self.routed_fallback / total, 4) if total else 0.0,
+                "quota_errors": self.quota_errors,
+                "time_saved_s": round(self.time_saved_s, 2),
+                "remaining_chars": self._remaining_chars,
+                "character_limit": self._character_limit,
+                "next_reset_unix": self._reset_unix,
+            }
+        out["breaker"] = self.breaker.snapshot()
+        return out
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+# 进程级单例：所有血弹共享同一熔断器与额度视图
+TTS_ROUTER = ElevenQuotaRouter(
+    poll_interval_s=_env_float("ELEVEN_QUOTA_POLL_S", 120.0),
+    cooldown_s=_env_float("ELEVEN_BREAKER_COOLDOWN_S", 300.0),
+    poll_timeout_s=_env_float("ELEVEN_QUOTA_POLL_TIMEOUT_S", 10.0),
+    probe_timeout_s=_env_float("ELEVEN_QUOTA_PROBE_TIMEOUT_S", 3.0),
+)
+metrics.register_provider("tts_router", TTS_ROUTER.snapshot)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+V46.8 水印精灵（预渲染 RGBA，overlay 合成）
+旧版每帧 drawtext 排版 + 光栅化“{行业} · 核心拆解”；行业只有 8 个，字体固定，完全可以预渲染：
+- 静态透明度（动态缝合 / 叠加混音，alpha=0.75）：一张 RGBA PNG
+- 呼吸透明度（静态底图，alpha=0.70+0.15*sin(2*PI*t)）：1 秒 RGBA 循环片（mov/png 编码，按渲染帧率逐帧烘焙）
+- 精灵画布 = 1280 x (2*字号+2*框边)，文字居中；overlay 居中 + y 方向 8*sin(2*PI*t) 上下浮动，
+  文字落点与原 drawtext 的 (h-text_h)/2+8*sin(2*PI*t) 一致
+- 缓存键：文字 + 字体指纹 + 字号 / 框 / 透明度 / 帧率；落盘 <缓存目录>/watermarks/
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+
+from bot_logic import metrics
+from bot_logic.cachedir import cache_subdir
+
+CANVAS_W = 1280
+OVERLAY_XY = "x=(W-w)/2:y=(H-h)/2+8*sin(2*PI*t)"
+_LOCK = threading.Lock()
+
+
+def _ff_path(p: str | Path) -> str:
+    s = str(p).replace("\\", "/")
+    return s.replace(":", "\\:").replace("'", "\\'")
+
+
+def _font_stamp(fontfile: str) -> list:
+    try:
+        st = Path(fontfile).stat()
+        return [str(Path(fontfile).resolve()), int(st.st_size), int(st.st_mtime_ns)]
+    except Exception:
+        return [str(fontfile)]
+
+
+def _drawtext(text: str, fontfile: str, *, fontsize: int, alpha: str, boxcolor: str, boxborderw: int) -> str:
+    safe_text = str(text).replace("\\", "\\\\").replace("'", "\\'").replace(":", "\\:").replace("%", "\\%")
+    return (
+        f"drawtext=fontfile='{_ff_path(fontfile)}':text='{safe_text}':"
+        f"x=(w-text_w)/2:y=(h-text_h)/2:fontsize={int(fontsize)}:"
+        f"fontcolor=white:alpha='{alpha}':box=1:boxcolor={boxcolor}:boxborderw={int(boxborderw)}"
+    )
+
+
+def _render(out: Path, cmd_tail: list[str], vf: str, src: str) -> Path | None:
+    tmp = out.with_name(out.stem + f".{os.getpid()}.{threading.get_ident()}.part{out.suffix}")
+    cmd = ["ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", src, "-vf", vf, *cmd_tail, str(tmp)]
+    try:
+        r = subprocess.run(cmd, capture_output=True, timeout=60, encoding="utf-8", errors="ignore")
+        if r.returncode != 0 or not tmp.exists() or tmp.stat().st_size <= 0:
+            print(f"[水印] 精灵渲染失败: {(r.stderr or '')[-300:]}")
+            return None
+        tmp.replace(out)
+        return out
+    except Exception as e:
+        print(f"[水印] 精灵渲染异常: {e}")
+        return None
+    finally:
+        try:
+            tmp.unlink(missing_ok=True)
+        except Exception:
+            pass
+
+
+def _sprite(kind: str, text: str, fontfile: str, params: dict, build) -> Path | None:
+    key = hashlib.sha1(
+        json.dumps({"k": kind, "t": text, "f": _font_stamp(fontfile), **params}, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:20]
+    out = cache_subdir("watermarks") / f"wm_{kind}_{key}.{'png' if kind == 'still' else 'mov'}"
+    if out.exists() and out.stat().st_size > 0:
+        metrics.incr("watermark.hit")
+        return out
+    with _LOCK:
+        if out.exists() and out.stat().st_size > 0:
+            metrics.incr("watermark.hit")
+            return out
+        metrics.incr("watermark.miss")
+        return build(out)
+
+
+def still_sprite(
+    text: str,
+    fontfile: str | None,
+    *,
+    fontsize: int = 42,
+    alpha: float = 0.75,
+    boxcolor: str = "black@0.30",
+    boxborderw: int = 12,
+) -> Path | None:
+    """静态透明度水印 PNG；无字体文件 / 渲染失败返回 None（调用方回退 drawtext）。"""
+    if not fontfile or not Path(fontfile).is_file():
+        return None
+    h = 2 * int(fontsize) + 2 * int(boxborderw)
+    params = {"fs": int(fontsize), "a": float(alpha), "bc": boxcolor, "bb": int(boxborderw)}
+    vf = "format=rgba," + _drawtext(text, fontfile, fontsize=fontsize, alpha=f"{float(alpha):g}", boxcolor=boxcolor, boxborderw=boxborderw)
+    return _sprite(
+        "still", text, fontfile, params,
+        lambda out: _render(out, ["-frames:v", "1", "-pix_fmt", "rgba"], vf, f"color=c=black@0.0:s={CANVAS_W}x{h}"),
+    )
+
+
+def pulse_sprite(
+    text: str,
+    fontfile: str | None,
+    *,
+    fps: int = 30,
+    fontsize: int = 42,
+    alpha_expr: str = "0.70+0.15*sin(2*PI*t)",
+    boxcolor: str = "black@0.30",
+    boxborderw: int = 12,
+) -> Path | None:
+    """呼吸透明度水印：1 秒、fps 帧的 RGBA 循环片（png 编码 mov，保留 alpha）。"""
+    if not fontfile or not Path(fontfile).is_file():
+        return None
+    fps = max(1, int(fps))
+    h = 2 * int(fontsize) + 2 * int(boxborderw)
+    params = {"fs": int(fontsize), "ax": alpha_expr, "bc": boxcolor, "bb": int(boxborderw), "fps": fps}
+    vf = "format=rgba," + _drawtext(text, fontfile, fontsize=fontsize, alpha=alpha_expr, boxcolor=boxcolor, boxborderw=boxborderw)
+    return _sprite(
+        "pulse", text, fontfile, params,
+        lambda out: _render(out, ["-c:v", "png", "-pix_fmt", "rgba"], vf, f"color=c=black@0.0:s={CANVAS_W}x{h}:r={fps}:d=1"),
+    )
+
+
+def overlay_fragment(sprite: Path, *, loop_fps: int | None = None) -> str:
+    """
+    可直接接在滤镜链里的水印片段（替换原 drawtext 一项）：
+    "null[wmb];movie=...[wms];[wmb][wms]overlay=..."——前一段输出接 [wmb]，overlay 输出继续向后链。
+    loop_fps 给定则按循环片处理（无限循环并按帧号重建时间戳）。
+    """
+    src = f"movie=filename='{_ff_path(sprite)}'"
+    if loop_fps:
+        src += f":loop=0,setpts=N/({int(loop_fps)}*TB)"
+    return f"null[wmb];{src},format=rgba[wms];[wmb][wms]overlay={OVERLAY_XY}:format=auto"
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+V46.1 渲染工位隔离（per-job workspace）
+- 战备仓根目录不变（Linux: /tmp/Junshi_Staging，Windows: C:/Junshi_Staging），
+  每次渲染在其下独占一个 job-<pid>-<随机>/ 工位：a.mp3 / v1.mp4 / bg.jpg 等固定名互不覆盖
+- 上下文管理器退出即清理工位（成功 / 失败 / 异常同一出口）
+- 进程崩溃残留：启动时 sweep_orphans() 清理属主进程已死或超龄的工位，以及旧版平铺在根目录的文件
+  属主判活比对开机 ID + 进程启动时刻：容器重启后 bot 又是 PID 1，上一轮的工位照样回收
+命令行压测：python -m bot_logic.workspace stress --jobs 3 --audio a.mp3
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from bot_logic import metrics
+
+JOB_PREFIX = "job-"
+OWNER_FILE = ".owner"
+# 旧版单一战备仓的固定文件名（升级后首次启动顺手清掉）；只认精确名，战备仓指向共享目录时不误删
+_LEGACY_RE = re.compile(r"^(?:a\.mp3|v\d+\.mp4|bg\.[A-Za-z0-9]{1,5}|clips|clips\.txt)$")
+
+_ACTIVE = 0
+_ACTIVE_LOCK = threading.Lock()
+_SEQ = itertools.count(1)
+
+
+def staging_root() -> Path:
+    """战备仓根目录：JUNSHI_STAGING_DIR 优先，否则沿用 V22.5 的纯英文路径。"""
+    env = (os.getenv("JUNSHI_STAGING_DIR") or "").strip()
+    if env:
+        return Path(env).expanduser()
+    if os.path.exists("/tmp"):
+        return Path("/tmp/Junshi_Staging")
+    return Path("C:/Junshi_Staging")
+
+
+def _set_active(delta: int) -> None:
+    global _ACTIVE
+    with _ACTIVE_LOCK:
+        _ACTIVE += delta
+        n = _ACTIVE
+    metrics.set_gauge("workspace.active", n)
+
+
+@contextmanager
+def render_workspace(root: Path | None = None, *, tag: str = "") -> Iterator[Path]:
+    """
+    为单次渲染分配独占工位并在退出时删除。
+    JUNSHI_KEEP_WORKSPACE=1 时保留（排障用；下次启动由 sweep_orphans 回收）。
+    """
+    base = Path(root) if root is not None else staging_root()
+    base.mkdir(parents=True, exist_ok=True)
+    name = f"{JOB_PREFIX}{os.getpid()}-{next(_SEQ)}-{uuid.uuid4().hex[:8]}"
+    ws = base / name
+    ws.mkdir(parents=True, exist_ok=False)
+    try:
+        owner = {"pid": os.getpid(), "started": time.time(), "tag": tag, "boot_id": _boot_id(), "proc_start": _proc_start(os.getpid())}
+        (ws / OWNER_FILE).write_text(
+            json.dumps(owner, ensure_ascii=False),
+            encoding="utf-8",
+        )
+    except Exception:
+        pass
+    metrics.incr("workspace.created")
+    _set_active(+1)
+    try:
+        yield ws
+    finally:
+        _set_active(-1)
+        if (os.getenv("JUNSHI_KEEP_WORKSPACE") or "").strip() != "1":
+            shutil.rmtree(ws, ignore_errors=True)
+
+
+def _boot_id() -> str:
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text(encoding="utf-8").strip()
+    except Exception:
+        return ""
+
+
+def _proc_start(pid: int) -> int | None:
+    """进程启动时刻（/proc/<pid>/stat 第 22 列，开机以来的时钟滴答）；无 /proc 或进程不存在返回 None。"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+        return int(stat.rsplit(")", 1)[1].split()[19])
+    except Exception:
+        return None
+
+
+def _pid_alive(pid: int, *, boot_id: str = "", proc_start: int | None = None) -> bool:
+    """属主进程是否仍是写下工位的那个进程（PID 复用 / 容器重启 / 机器重启都算已死）。"""
+    if pid <= 0:
+        return False
+    cur_boot = _boot_id()
+    if boot_id and cur_boot and boot_id != cur_boot:
+        return False
+    now_start = _proc_start(pid)
+    if proc_start is not None and now_start is not None:
+        return now_start == int(proc_start)
+    if pid == os.getpid():
+        # 本进程写的属主文件必带启动时刻；缺失即旧版 / 上一轮运行（容器重启后 PID 复用）
+        return now_start is None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except Exception:
+        # Windows 等不支持 signal 0：只按年龄判定
+        return True
+    return True
+
+
+def _owner(ws: Path) -> tuple[int, float, str, int | None]:
+    """(pid, 创建时间, 开机 ID, 进程启动时刻)；属主文件缺失时按目录名 / mtime 推断。"""
+    try:
+        body = json.loads((ws / OWNER_FILE).read_text(encoding="utf-8"))
+        ps = body.get("proc_start")
+        return (
+            int(body.get("pid") or 0),
+            float(body.get("started") or 0.0),
+            str(body.get("boot_id") or ""),
+            int(ps) if ps is not None else None,
+        )
+    except Exception:
+        pass
+    try:
+        pid = int(ws.name[len(JOB_PREFIX):].split("-", 1)[0])
+    except Exception:
+        pid = 0
+    try:
+        started = ws.stat().st_mtime
+    except Exception:
+        started = 0.0
+    return pid, started, "", None
+
+
+def sweep_orphans(root: Path | None = None, *, max_age_s: float | None = None) -> int:
+    """
+    清理崩溃残留：属主进程已不存在、或超过 max_age_s（默认 JUNSHI_WORKSPACE_MAX_AGE_S=6 小时）的工位；
+    以及旧版平铺在根目录下的 a.mp3 / v<N>.mp4 / bg.<ext> / clips / clips.txt。返回清理条目数。
+    """
+    base = Path(root) if root is not None else staging_root()
+    if max_age_s is None:
+        try:
+            max_age_s = float((os.getenv("JUNSHI_WORKSPACE_MAX_AGE_S") or "").strip() or 6 * 3600)
+        except Exception:
+            max_age_s = 6 * 3600.0
+    removed = 0
+    try:
+        entries = list(base.iterdir())
+    except Exception:
+        return 0
+    now = time.time()
+    for p in entries:
+        try:
+            name = p.name
+            if p.is_dir() and not p.is_symlink() and name.startswith(JOB_PREFIX):
+                pid, started, boot_id, proc_start = _owner(p)
+                if _pid_alive(pid, boot_id=boot_id, proc_start=proc_start) and now - started < max_age_s:
+                    continue
+                shutil.rmtree(p, ignore_errors=True)
+                removed += 1
+            elif _LEGACY_RE.match(name):
+                if p.is_dir() and not p.is_symlink():
+                    shutil.rmtree(p, ignore_errors=True)
+                else:
+                    p.unlink(missing_ok=True)
+                removed += 1
+        except Exception:
+            continue
+    if removed:
+        metrics.incr("workspace.orphans_swept", removed)
+        print(f"[战备仓] 已清理残留工位/文件 {removed} 个: {base}")
+    return removed
+
+
+def _stress(audio: Path, out_dir: Path, *, jobs: int, industry: str) -> int:
+    """
+    并发 N 路 video_stitcher 与串行 N 路对照：成败、分辨率、时长必须一致。
+    （素材选取 / 镜像扰动本身是随机的，不比字节，只比可观测的成片属性。）
+    """
+    import bot  # 延迟导入：压测才需要完整依赖
+    from bot_logic.probe_cache import ffprobe_info
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    profile = {"_industry": industry, "watermark_text": f"{industry} · 核心拆解"}
+
+    def _one(tag: str, i: int) -> dict:
+        out = out_dir / f"{tag}_{i}.mp4"
+        out.unlink(missing_ok=True)
+        t0 = time.monotonic()
+        try:
+            ok = bool(bot.video_stitcher(str(audio), str(out), dict(profile))[0])
+        except Exception as e:
+            print(f"[压测] {tag}#{i} 异常: {e}")
+            ok = False
+        info = ffprobe_info(out) if ok and out.exists() else None
+        return {
+            "ok": ok,
+            "seconds": round(time.monotonic() - t0, 2),
+            "size": (info.width, info.height) if info else None,
+            "duration": round(info.duration, 1) if info else None,
+        }
+
+    serial = [_one("serial", i) for i in range(jobs)]
+    results: list[dict | None] = [None] * jobs
+
+    def _run(i: int) -> None:
+        results[i] = _one("parallel", i)
+
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(jobs)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - t0
+
+    def _shape(r: dict | None) -> tuple:
+        return (r or {}).get("ok"), (r or {}).get("size"), (r or {}).get("duration")
+
+    mismatch = sorted({_shape(r) for r in results} ^ {_shape(r) for r in serial})
+    print(json.dumps({"serial": serial, "parallel": results, "parallel_wall_s": round(wall, 2)}, ensure_ascii=False, indent=2))
+    leftovers = [p.name for p in staging_root().glob(f"{JOB_PREFIX}{os.getpid()}-*")]
+    if leftovers:
+        print(f"[压测] 工位未清理: {leftovers}")
+    if mismatch or leftovers or not all(r and r["ok"] for r in results):
+        print(f"[压测] 并发结果与串行不一致: {mismatch}")
+        return 1
+    print(f"[压测] {jobs} 路并发与串行一致（并发墙钟 {wall:.1f}s）")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="战备仓工位：残留清理 / 并发渲染压测")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("sweep", help="清理崩溃残留工位")
+    sp.add_argument("--max-age", type=float, default=None, help="工位最大存活秒数")
+    st = sub.add_parser("stress", help="N 路并发 vs 串行渲染对照")
+    st.add_argument("--audio", required=True, help="旁白 mp3")
+    st.add_argument("--jobs", type=int, default=3)
+    st.add_argument("--industry", default="自媒体")
+    st.add_argument("--out", default="", help="成片目录（默认 <战备仓>/stress_out）")
+    args = ap.parse_args(argv)
+    if args.cmd == "sweep":
+        print(f"[战备仓] 清理 {sweep_orphans(max_age_s=args.max_age)} 个")
+        return 0
+    audio = Path(args.audio).expanduser()
+    if not audio.is_file():
+        print(f"[压测] 音频不存在: {audio}")
+        return 2
+    out_dir = Path(args.out).expanduser() if args.out else staging_root() / "stress_out"
+    return _stress(audio, out_dir, jobs=max(1, args.jobs), industry=args.industry)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
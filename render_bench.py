@@ -0,0 +1,412 @@
+"""
+V47.2 渲染基准：动态缝合“逐段输入”（旧）vs“每素材一个输入”（JUNSHI_DEDUP_INPUTS）
+同一随机种子 → 同一素材抽样与切片计划，只差输入构建方式；逐项对比：
+  墙钟 / 起播（ffmpeg 拉起到首个进度推进）/ ffmpeg 峰值内存（VmHWM）/ 峰值文件句柄数
+V47.4 全路径基准套件（--suite）：lavfi 合成素材工厂（testsrc2 / mandelbrot，4K 竖屏 + 1080p，
+  自媒体 / 白酒 / 餐饮）+ 合成语音长度旁白；逐条渲染路径（动态缝合 / concat 降级 / 图片 / 渐变 / 纯色，
+  可选分块）× 音频时长 × 并发路数，统计墙钟、CPU 秒（子进程 rusage）、ffmpeg 峰值内存、成片大小、
+  每条成功所用尝试次数（render.attempts）；JSON 输出，并可与保存的基线逐项对比成表。
+用法：
+  python render_bench.py --factory <工厂根目录（含 自媒体/ 视频）> [--audio a.mp3 | --seconds 60] [--runs 2]
+  python render_bench.py --suite [--durations 20,60] [--concurrency 1,2] [--paths dynamic,concat,image,gradient,color]
+                         [--save-baseline base.json | --baseline base.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from bot_logic import ffmpeg_runner, metrics
+from bot_logic.workspace import staging_root
+
+try:
+    import resource  # Windows 无此模块：CPU 秒记为 None
+except ImportError:
+    resource = None
+
+BUILDS = {"legacy": "0", "dedup": "1"}
+
+# V47.4：合成素材规格（信源, 宽, 高）；各行业目录轮流取用，4K 竖屏与 1080p 横屏混编
+SYNTH_INDUSTRIES = ("自媒体", "白酒", "餐饮")
+SYNTH_CLIPS = (
+    ("testsrc2", 2160, 3840),
+    ("mandelbrot", 1920, 1080),
+    ("testsrc2", 1920, 1080),
+    ("mandelbrot", 2160, 3840),
+)
+PATHS = ("dynamic", "concat", "image", "gradient", "color", "chunked")
+DEFAULT_PATHS = "dynamic,concat,image,gradient,color"
+SUITE_METRICS = ("wall_s", "cpu_s", "peak_rss_mb", "output_mb", "attempts_per_success")
+
+
+def _make_audio(path: Path, seconds: float) -> Path:
+    """lavfi 正弦波生成测试旁白（mp3，44.1kHz）。"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds:.3f}",
+        "-c:a", "libmp3lame", "-b:a", "128k", str(path),
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, timeout=120)
+    return path
+
+
+def _make_speech(path: Path, seconds: float) -> Path:
+    """合成“语音长度”旁白：24kHz 单声道、约 4Hz 音节包络（与 TTS 产物同规格）。"""
+    if path.exists() and path.stat().st_size > 0:
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency=190:sample_rate=24000:duration={seconds:.3f},tremolo=f=4:d=0.8",
+        "-ac", "1", "-c:a", "libmp3lame", "-b:a", "48k", str(path),
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, timeout=300)
+    return path
+
+
+def _make_clip(path: Path, source: str, w: int, h: int, seconds: float) -> Path:
+    """lavfi 合成素材片（30fps H.264）；已存在则复用。"""
+    if path.exists() and path.stat().st_size > 0:
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"{source}=s={w}x{h}:r=30",
+        "-t", f"{seconds:.3f}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "28", "-pix_fmt", "yuv420p",
+        str(path),
+    ]
+    subprocess.run(cmd, check=True, capture_output=True, timeout=900)
+    return path
+
+
+def build_factory(root: Path, *, clips: int = 4, seconds: float = 8.0) -> Path:
+    """
+    合成素材工厂：<root>/<行业>/synth_XX_<信源>_<宽>x<高>.mp4 + <root>/image/白酒/bg.jpg。
+    重复调用只补缺失文件。
+    """
+    for ind in SYNTH_INDUSTRIES:
+        for i in range(max(1, clips)):
+            source, w, h = SYNTH_CLIPS[i % len(SYNTH_CLIPS)]
+            _make_clip(root / ind / f"synth_{i:02d}_{source}_{w}x{h}.mp4", source, w, h, seconds)
+    img = root / "image" / "白酒" / "bg.jpg"
+    if not (img.exists() and img.stat().st_size > 0):
+        img.parent.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "ffmpeg", "-y", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc2=s=2160x3840:r=1", "-frames:v", "1", "-q:v", "3", str(img),
+        ]
+        subprocess.run(cmd, check=True, capture_output=True, timeout=300)
+    print(f"[基准] 合成素材工厂就绪: {root}")
+    return root
+
+
+def _proc_stats(pid: int) -> tuple[int, int]:
+    """(VmHWM KB, 打开句柄数)；进程已退出返回 (0, 0)。"""
+    hwm = 0
+    try:
+        for ln in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if ln.startswith("VmHWM:"):
+                hwm = int(ln.split()[1])
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except Exception:
+        return hwm, 0
+    return hwm, fds
+
+
+class _Sampler:
+    """轮询 ffmpeg_runner 的在跑进程：记录起播耗时、峰值内存、峰值句柄。"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.seen: dict[int, dict] = {}
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for r in ffmpeg_runner.snapshot()["running"]:
+                st = self.seen.setdefault(r["pid"], {"t0": now, "first_progress": None, "hwm_kb": 0, "fds": 0, "stage": r["stage"]})
+                if st["first_progress"] is None and (r["out_time_s"] or 0) > 0:
+                    st["first_progress"] = now - st["t0"]
+                hwm, fds = _proc_stats(r["pid"])
+                st["hwm_kb"] = max(st["hwm_kb"], hwm)
+                st["fds"] = max(st["fds"], fds)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "_Sampler":
+        self._t.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._t.join(timeout=2)
+
+
+def _run_once(bot, audio: Path, out: Path, *, seed: int) -> dict:
+    profile = {
+        "_industry": "自媒体",
+        "bg": {"type": "video", "path": "FORCE_MEDIA_POOL"},
+        "subtitle_text": "基准测试字幕第一句。第二句用于换行检查。第三句。",
+    }
+    random.seed(seed)
+    out.unlink(missing_ok=True)
+    t0 = time.monotonic()
+    with _Sampler() as sampler:
+        ok = bool(asyncio.run(bot.video_stitcher_async(str(audio), str(out), profile))[0])
+    wall = time.monotonic() - t0
+    dyn = [s for s in sampler.seen.values() if s["stage"] == "动态缝合"]
+    return {
+        "ok": ok and out.exists(),
+        "wall_s": round(wall, 2),
+        "startup_s": round(dyn[0]["first_progress"], 2) if dyn and dyn[0]["first_progress"] is not None else None,
+        "peak_rss_mb": round(max((s["hwm_kb"] for s in dyn), default=0) / 1024, 1),
+        "peak_fds": max((s["fds"] for s in dyn), default=0),
+    }
+
+
+def _summary(rows: list[dict]) -> dict:
+    def med(key: str):
+        vals = [r[key] for r in rows if r.get(key) is not None]
+        return round(statistics.median(vals), 2) if vals else None
+
+    return {
+        "runs": len(rows),
+        "ok": sum(1 for r in rows if r["ok"]),
+        **{k: med(k) for k in ("wall_s", "startup_s", "peak_rss_mb", "peak_fds")},
+    }
+
+
+@contextlib.contextmanager
+def _env(**overrides: str | None):
+    """临时设置环境变量（None = 删除），退出时恢复。"""
+    saved = {k: os.environ.get(k) for k in overrides}
+    try:
+        for k, v in overrides.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@contextlib.contextmanager
+def _force_concat_fallback():
+    """让“动态缝合”工序秒败，逼出 concat demuxer 降级路径（其余工序照常执行）。"""
+    orig = ffmpeg_runner.run_async
+
+    async def _run_async(cmd, *a, stage: str = "", **kw):
+        if stage == "动态缝合":
+            return ffmpeg_runner.FFmpegResult(args=list(cmd), returncode=1, stderr="[基准] 强制降级 concat")
+        return await orig(cmd, *a, stage=stage, **kw)
+
+    ffmpeg_runner.run_async = _run_async
+    try:
+        yield
+    finally:
+        ffmpeg_runner.run_async = orig
+
+
+def _path_setup(path: str, factory: Path) -> tuple[dict, dict]:
+    """渲染路径 → (视觉档案, 环境变量)。"""
+    video = {"type": "video", "path": "FORCE_MEDIA_POOL"}
+    profiles = {
+        "dynamic": video,
+        "concat": video,
+        "chunked": video,
+        "image": {"type": "image", "path": str(factory / "image" / "白酒" / "bg.jpg")},
+        "gradient": {"type": "gradient", "from": "#0b1b2b", "to": "#3a1c4a"},
+        # 纯黑会被改写成渐变，取非黑色
+        "color": {"type": "color", "color": "navy"},
+    }
+    env = {"JUNSHI_CLIP_BANK": "0", "JUNSHI_CHUNKED_RENDER": "1" if path == "chunked" else "0"}
+    profile = {
+        "_industry": "白酒",
+        "bg": profiles[path],
+        "watermark_text": "白酒 · 核心拆解",
+        "subtitle_text": "窖池守了三十年。利润却被渠道层层切走。原酒主权旁落，定价权不在自己手里。",
+    }
+    return profile, env
+
+
+def _children_cpu_s() -> float | None:
+    if resource is None:
+        return None
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+async def _suite_case(bot, path: str, audio: Path, out_dir: Path, *, factory: Path, concurrency: int, seed: int) -> dict:
+    from bot_logic.render_scheduler import RenderScheduler
+
+    profile, env = _path_setup(path, factory)
+    sched = RenderScheduler(max_jobs=0)
+    outs = [out_dir / f"{path}_{audio.stem}_c{concurrency}_{i}.mp4" for i in range(concurrency)]
+    for o in outs:
+        o.unlink(missing_ok=True)
+
+    async def _one(out: Path) -> bool:
+        async with sched.slot():
+            try:
+                return bool((await bot.video_stitcher_async(str(audio), str(out), dict(profile)))[0]) and out.exists()
+            except Exception as e:
+                print(f"[基准] {path} 异常: {e}")
+                return False
+
+    attempts0, wasted0, runs0 = metrics.get("render.attempts"), metrics.get("render.attempts_wasted"), metrics.get("ffmpeg.runs")
+    cpu0 = _children_cpu_s()
+    random.seed(seed)
+    t0 = time.monotonic()
+    with _env(**env), (_force_concat_fallback() if path == "concat" else contextlib.nullcontext()), _Sampler() as sampler:
+        oks = await asyncio.gather(*[_one(o) for o in outs])
+    wall = time.monotonic() - t0
+    cpu1 = _children_cpu_s()
+    ok = sum(1 for x in oks if x)
+    attempts = metrics.get("render.attempts") - attempts0
+    sizes = [o.stat().st_size for o, x in zip(outs, oks) if x and o.exists()]
+    return {
+        "ok": ok,
+        "jobs": concurrency,
+        "wall_s": round(wall, 2),
+        "cpu_s": round(cpu1 - cpu0, 2) if cpu0 is not None and cpu1 is not None else None,
+        "peak_rss_mb": round(max((s["hwm_kb"] for s in sampler.seen.values()), default=0) / 1024, 1) or None,
+        "output_mb": round(statistics.mean(sizes) / (1024 * 1024), 2) if sizes else None,
+        "attempts_per_success": round(attempts / ok, 2) if ok and attempts else None,
+        "attempts_wasted": int(metrics.get("render.attempts_wasted") - wasted0),
+        "ffmpeg_runs": int(metrics.get("ffmpeg.runs") - runs0),
+    }
+
+
+def _suite_summary(rows: list[dict]) -> dict:
+    def med(key: str):
+        vals = [r[key] for r in rows if r.get(key) is not None]
+        return round(statistics.median(vals), 2) if vals else None
+
+    return {
+        "runs": len(rows),
+        "ok": sum(r["ok"] for r in rows),
+        "jobs": sum(r["jobs"] for r in rows),
+        **{k: med(k) for k in SUITE_METRICS},
+        "attempts_wasted": sum(r["attempts_wasted"] for r in rows),
+    }
+
+
+def compare_table(current: dict, baseline: dict) -> str:
+    """逐用例 × 逐指标：基线 → 当前（比值）；比值 <1 即变快 / 变省。"""
+    cur, base = current.get("cases") or {}, baseline.get("cases") or {}
+    lines = [f"{'用例':<28} {'指标':<22} {'基线':>10} {'当前':>10} {'比值':>7}"]
+    for case in sorted(set(cur) | set(base)):
+        a, b = (base.get(case) or {}).get("summary") or {}, (cur.get(case) or {}).get("summary") or {}
+        for k in SUITE_METRICS:
+            va, vb = a.get(k), b.get(k)
+            ratio = f"{vb / va:.3f}" if va and vb is not None else "-"
+            lines.append(f"{case:<28} {k:<22} {str(va if va is not None else '-'):>10} {str(vb if vb is not None else '-'):>10} {ratio:>7}")
+    return "\n".join(lines)
+
+
+def run_suite(args) -> int:
+    out_dir = Path(args.out).expanduser() if args.out else staging_root() / "render_bench"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    factory = Path(args.factory).expanduser().resolve() if args.factory else build_factory(out_dir / "factory", clips=args.clips)
+    paths = [p.strip() for p in str(args.paths).split(",") if p.strip() in PATHS]
+    durations = [float(x) for x in str(args.durations).split(",") if x.strip()]
+    levels = [max(1, int(x)) for x in str(args.concurrency).split(",") if x.strip().isdigit()]
+    audios = {d: _make_speech(out_dir / "audio" / f"speech_{int(d)}s.mp3", d) for d in durations}
+
+    import bot  # 延迟导入：环境变量先就位
+
+    bot.detect_jiumo_factory_root = lambda: factory
+
+    report: dict = {"factory": str(factory), "cpu_count": os.cpu_count(), "cases": {}}
+    for path in paths:
+        if args.warmup and durations:
+            # 预热：夹层 / 渐变 / 底图缓存先落地，计时只看稳态
+            asyncio.run(_suite_case(bot, path, audios[min(durations)], out_dir, factory=factory, concurrency=1, seed=999))
+        for d in durations:
+            for c in levels:
+                case = f"{path}/{int(d)}s/x{c}"
+                rows = [
+                    asyncio.run(_suite_case(bot, path, audios[d], out_dir, factory=factory, concurrency=c, seed=1000 + i))
+                    for i in range(max(1, args.runs))
+                ]
+                report["cases"][case] = {"summary": _suite_summary(rows), "runs": rows}
+                print(f"[基准] {case}: {report['cases'][case]['summary']}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).expanduser().write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[基准] 基线已保存: {args.save_baseline}")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.baseline:
+        try:
+            baseline = json.loads(Path(args.baseline).expanduser().read_text(encoding="utf-8"))
+            print(compare_table(report, baseline))
+        except Exception as e:
+            print(f"[基准] 基线读取失败: {e}")
+    return 0 if all(c["summary"]["ok"] == c["summary"]["jobs"] for c in report["cases"].values()) else 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="渲染基准：动态缝合输入去重（legacy vs dedup）/ 全路径套件（--suite）")
+    ap.add_argument("--factory", default="", help="工厂根目录（其下 自媒体/ 放视频素材）；--suite 下缺省则合成")
+    ap.add_argument("--audio", default="", help="旁白 mp3（默认按 --seconds 生成正弦波）")
+    ap.add_argument("--seconds", type=float, default=60.0)
+    ap.add_argument("--runs", type=int, default=2, help="每种构建 / 每个用例跑几次（取中位数）")
+    ap.add_argument("--out", default="", help="成片目录（默认 <战备仓>/render_bench）")
+    ap.add_argument("--suite", action="store_true", help="全路径基准套件（合成素材 × 时长 × 并发）")
+    ap.add_argument("--paths", default=DEFAULT_PATHS, help=f"渲染路径，逗号分隔（可选 {','.join(PATHS)}）")
+    ap.add_argument("--durations", default="20,60", help="旁白时长（秒），逗号分隔")
+    ap.add_argument("--concurrency", default="1,2", help="并发路数，逗号分隔")
+    ap.add_argument("--clips", type=int, default=4, help="合成工厂每个行业的素材条数")
+    ap.add_argument("--warmup", type=int, default=1, help="每条路径计时前先预热一发（0 关闭）")
+    ap.add_argument("--baseline", default="", help="对比的基线 JSON（--save-baseline 产物）")
+    ap.add_argument("--save-baseline", default="", help="本次结果另存为基线 JSON")
+    args = ap.parse_args()
+    if args.suite:
+        return run_suite(args)
+    if not args.factory:
+        ap.error("去重对比模式需要 --factory")
+
+    out_dir = Path(args.out).expanduser() if args.out else staging_root() / "render_bench"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    audio = Path(args.audio).expanduser() if args.audio else _make_audio(out_dir / f"bench_{int(args.seconds)}s.mp3", args.seconds)
+
+    os.environ["JUNSHI_CLIP_BANK"] = "0"  # 只测逐段滤镜缝合路径
+    import bot  # 延迟导入：环境变量先就位
+
+    factory = Path(args.factory).expanduser().resolve()
+    bot.detect_jiumo_factory_root = lambda: factory
+
+    report: dict = {"audio": str(audio), "factory": str(factory), "builds": {}}
+    for name, flag in BUILDS.items():
+        os.environ["JUNSHI_DEDUP_INPUTS"] = flag
+        rows = [_run_once(bot, audio, out_dir / f"{name}_{i}.mp4", seed=1000 + i) for i in range(max(1, args.runs))]
+        report["builds"][name] = {"summary": _summary(rows), "runs": rows}
+        print(f"[基准] {name}: {report['builds'][name]['summary']}")
+
+    a, b = report["builds"]["legacy"]["summary"], report["builds"]["dedup"]["summary"]
+    report["dedup_vs_legacy"] = {
+        k: (round(b[k] / a[k], 3) if a.get(k) and b.get(k) is not None else None)
+        for k in ("wall_s", "startup_s", "peak_rss_mb", "peak_fds")
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if all(r["summary"]["ok"] == r["summary"]["runs"] for r in report["builds"].values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
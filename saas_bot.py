@@ -20,6 +20,7 @@ from telegram.ext import (
 
 # 复用现有 V8.4 生产线（严禁破坏）
 import bot as factory
+from bot_logic import render_scheduler
 
 
 load_dotenv()
@@ -242,7 +243,8 @@ async def _run_factory_for_industry(industry: str) -> None:
             folder,
             semaphore=None,
             visual_engine=factory.VisualEngine(safe_mode=True),
-            render_semaphore=asyncio.Semaphore(1),
+            # V47.1：与批量生产共用进程内渲染调度（线程预算准入）
+            render_semaphore=render_scheduler.get_scheduler(),
         )
 
 
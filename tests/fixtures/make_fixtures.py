@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+V45.0 mp3_frames 测试夹具生成器（纯字节拼装，不依赖 FFmpeg / 被测模块）
+- silence_44100_stereo.mp3：ID3v2 标签 + LAME Info 帧 + 40 帧 MPEG-1 Layer III 静音（44.1kHz 立体声 128k）
+- silence_24000_mono.mp3：50 帧 MPEG-2 Layer III 静音（24kHz 单声道 64k，与 TTS 产物同规格）
+- junk_truncated.mp3：200 字节垃圾前缀 + 20 帧 44.1kHz 立体声静音 + 半帧截断尾
+静音帧 = 帧头 + 全零 side info / 主数据（part2_3_length=0 → 全部频线为 0）。
+重新生成：python tests/fixtures/make_fixtures.py
+"""
+
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# FF FB 90 00：MPEG-1 / Layer III / 无 CRC / 128kbps / 44100Hz / 立体声 → 144*128000/44100 = 417 字节
+HDR_44100_STEREO = bytes([0xFF, 0xFB, 0x90, 0x00])
+LEN_44100_STEREO = 417
+# FF F3 84 C0：MPEG-2 / Layer III / 无 CRC / 64kbps / 24000Hz / 单声道 → 72*64000/24000 = 192 字节
+HDR_24000_MONO = bytes([0xFF, 0xF3, 0x84, 0xC0])
+LEN_24000_MONO = 192
+
+
+def frame(hdr: bytes, length: int) -> bytes:
+    return hdr + bytes(length - 4)
+
+
+def info_frame() -> bytes:
+    # MPEG-1 立体声 side info 32 字节，"Info" 紧随其后
+    body = bytearray(LEN_44100_STEREO - 4)
+    body[32:36] = b"Info"
+    return HDR_44100_STEREO + bytes(body)
+
+
+def id3v2(payload_size: int = 64) -> bytes:
+    # ID3v2.3，无扩展头；size 为 4×7 位同步安全整数
+    size = bytes([(payload_size >> s) & 0x7F for s in (21, 14, 7, 0)])
+    return b"ID3" + bytes([3, 0, 0]) + size + bytes(payload_size)
+
+
+def main() -> None:
+    stereo = frame(HDR_44100_STEREO, LEN_44100_STEREO)
+    mono = frame(HDR_24000_MONO, LEN_24000_MONO)
+    (HERE / "silence_44100_stereo.mp3").write_bytes(id3v2() + info_frame() + stereo * 40)
+    (HERE / "silence_24000_mono.mp3").write_bytes(mono * 50)
+    junk = bytes((i * 37 + 11) % 0xF0 for i in range(200))  # 不含 0xFF，不会误同步
+    (HERE / "junk_truncated.mp3").write_bytes(junk + stereo * 20 + stereo[: LEN_44100_STEREO // 2])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""bot_logic.mp3_frames：帧级时长 / 拼接 / 静音补齐 / 44.1kHz 重编码跳过判定。"""
+
+from pathlib import Path
+
+import pytest
+
+from bot_logic import mp3_frames
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+STEREO = FIXTURES / "silence_44100_stereo.mp3"
+MONO = FIXTURES / "silence_24000_mono.mp3"
+JUNK = FIXTURES / "junk_truncated.mp3"
+
+FRAME_44100 = 1152 / 44100
+FRAME_24000 = 576 / 24000
+
+
+def test_duration_counts_audio_frames_only():
+    # ID3v2 与 LAME Info 帧不计入时长
+    assert mp3_frames.mp3_duration_seconds(STEREO) == pytest.approx(40 * FRAME_44100)
+    assert mp3_frames.mp3_duration_seconds(MONO) == pytest.approx(50 * FRAME_24000)
+
+
+def test_duration_skips_junk_prefix_and_truncated_tail():
+    assert mp3_frames.mp3_duration_seconds(JUNK) == pytest.approx(20 * FRAME_44100)
+
+
+def test_format_of_fixtures():
+    assert mp3_frames.mp3_format(STEREO) == mp3_frames.Mp3Format(version=1.0, sample_rate=44100, channels=2)
+    assert mp3_frames.mp3_format(MONO) == mp3_frames.Mp3Format(version=2.0, sample_rate=24000, channels=1)
+
+
+def test_unparseable_input_returns_none(tmp_path):
+    bogus = tmp_path / "bogus.mp3"
+    bogus.write_bytes(b"not an mp3 at all" * 100)
+    assert mp3_frames.parse_mp3(bogus) is None
+    assert mp3_frames.mp3_duration_seconds(bogus) is None
+    assert mp3_frames.mp3_duration_seconds(tmp_path / "missing.mp3") is None
+
+
+def test_concat_same_format(tmp_path):
+    out = tmp_path / "joined.mp3"
+    assert mp3_frames.concat_mp3_frames([STEREO, JUNK, STEREO], out)
+    assert mp3_frames.mp3_duration_seconds(out) == pytest.approx(100 * FRAME_44100)
+    # 标签 / 信息帧 / 垃圾字节全部剥离：输出只剩音频帧
+    assert out.stat().st_size == 100 * 417
+
+
+def test_concat_rejects_mixed_formats(tmp_path):
+    out = tmp_path / "mixed.mp3"
+    assert not mp3_frames.concat_mp3_frames([STEREO, MONO], out)
+    assert not out.exists()
+    assert not mp3_frames.concat_mp3_frames([], out)
+
+
+def test_pad_to_duration_appends_silence(tmp_path):
+    work = tmp_path / "mono.mp3"
+    work.write_bytes(MONO.read_bytes())
+    assert mp3_frames.pad_mp3_to_duration(work, seconds=3.0)
+    d = mp3_frames.mp3_duration_seconds(work)
+    assert 3.0 <= d < 3.0 + FRAME_24000
+    assert mp3_frames.mp3_format(work) == mp3_frames.mp3_format(MONO)
+
+
+def test_pad_is_noop_when_long_enough(tmp_path):
+    work = tmp_path / "stereo.mp3"
+    work.write_bytes(STEREO.read_bytes())
+    assert mp3_frames.pad_mp3_to_duration(work, seconds=0.5)
+    assert work.read_bytes() == STEREO.read_bytes()
+
+
+def test_write_silent_mp3(tmp_path):
+    out = tmp_path / "silent.mp3"
+    assert mp3_frames.write_silent_mp3(out, seconds=2.0)
+    assert mp3_frames.mp3_format(out) == mp3_frames.Mp3Format(version=1.0, sample_rate=44100, channels=2)
+    assert 2.0 <= mp3_frames.mp3_duration_seconds(out) < 2.0 + FRAME_44100
+    assert not mp3_frames.write_silent_mp3(tmp_path / "bad.mp3", seconds=1.0, sample_rate=12345)
+
+
+def test_ensure_44100_skip_decision(tmp_path):
+    # 已是 44.1kHz 立体声：ensure_mp3_44100 跳过重编码
+    assert not mp3_frames.needs_resample(STEREO)
+    assert not mp3_frames.needs_resample(JUNK)
+    # TTS 常见的 24kHz 单声道 / 无法解析：必须重编码
+    assert mp3_frames.needs_resample(MONO)
+    bogus = tmp_path / "bogus.mp3"
+    bogus.write_bytes(b"\x00" * 4096)
+    assert mp3_frames.needs_resample(bogus)
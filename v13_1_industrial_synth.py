@@ -1,5 +1,4 @@
 import argparse
-import os
 import random
 import re
 import subprocess
@@ -8,6 +7,13 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
+# V45.0：mp3 时长走纯 Python 帧头计时（省 ffprobe fork）
+from bot_logic.mp3_frames import mp3_duration_seconds
+# V45.6：素材元数据走共享探测缓存（与 bot.py 同一份）
+from bot_logic.probe_cache import probe_many
+# V46.5：中文字体与 bot.py 共用启动解析
+from bot_logic import fonts
+
 
 FINAL_OUT_DIR = Path(r"C:\Users\GIGABYTE\Desktop\Junshi_Bot冷酷军师\Final_Out").resolve()
 
@@ -20,6 +26,10 @@ class Segment:
 
 
 def _ffprobe_duration_seconds(p: Path) -> float:
+    if str(p).lower().endswith(".mp3"):
+        d = mp3_duration_seconds(p)
+        if d:
+            return max(0.1, d)
     r = subprocess.run(
         [
             "ffprobe",
@@ -93,24 +103,8 @@ def _escape_drawtext_text(s: str) -> str:
 
 
 def _pick_fontfile() -> str | None:
-    env_font = os.getenv("WATERMARK_FONT")
-    candidates: list[str] = []
-    if env_font:
-        candidates.append(env_font)
-    candidates.extend(
-        [
-            "C:/Windows/Fonts/msyh.ttc",
-            "C:/Windows/Fonts/simhei.ttf",
-            "C:/Windows/Fonts/simsun.ttc",
-        ]
-    )
-    for fp in candidates:
-        try:
-            if fp and os.path.exists(fp):
-                return fp
-        except Exception:
-            continue
-    return None
+    # V46.5：与 bot.py 共用中文字体解析（含 Linux fontconfig）
+    return fonts.resolve_cjk_font()
 
 
 def _ff_filter_path(path: str) -> str:
@@ -146,6 +140,9 @@ class VideoSynthesizer:
         out: list[Path] = []
         for p in self.material_folder.rglob("*"):
             try:
+                # V45.8：跳过隐藏目录（.mezz 夹层等非原始素材）
+                if any(part.startswith(".") for part in p.relative_to(self.material_folder).parts[:-1]):
+                    continue
                 if p.is_file() and p.suffix.lower() in exts:
                     out.append(p)
             except Exception:
@@ -174,12 +171,9 @@ class VideoSynthesizer:
             raise FileNotFoundError(f"素材为空: {self.material_folder}")
 
         # 探测素材时长（用于随机 start；失败则视为 0）
-        dur_map: dict[Path, float] = {}
-        for p in mats:
-            try:
-                dur_map[p] = _ffprobe_duration_seconds(p)
-            except Exception:
-                dur_map[p] = 0.0
+        # V45.6：共享探测缓存批量查询，未命中走有界并发探测
+        probed = probe_many(mats)
+        dur_map: dict[Path, float] = {p: (probed[p].duration if p in probed else 0.0) for p in mats}
 
         segs: list[Segment] = []
         t = 0.0
@@ -7,6 +7,11 @@ import time
 from dataclasses import dataclass
 from pathlib import Path
 
+# V45.0：mp3 时长走纯 Python 帧头计时（省 ffprobe fork）
+from bot_logic.mp3_frames import mp3_duration_seconds
+# V45.6：素材元数据走共享探测缓存（与 bot.py 同一份）
+from bot_logic.probe_cache import probe_many
+
 
 FACTORY_ROOT = Path(r"C:\Users\GIGABYTE\Desktop\Junshi_Bot冷酷军师\Jiumo_Auto_Factory").resolve()
 FINAL_OUT_DIR = Path(r"C:\Users\GIGABYTE\Desktop\Junshi_Bot冷酷军师\Final_Out").resolve()
@@ -24,6 +29,10 @@ class Segment:
 
 
 def _ffprobe_duration_seconds(p: Path) -> float:
+    if str(p).lower().endswith(".mp3"):
+        d = mp3_duration_seconds(p)
+        if d:
+            return max(0.1, d)
     r = subprocess.run(
         [
             "ffprobe",
@@ -65,6 +74,9 @@ def _list_video_assets(asset_dir: Path) -> list[Path]:
     out: list[Path] = []
     for p in asset_dir.rglob("*"):
         try:
+            # V45.8：跳过隐藏目录（.mezz 夹层等非原始素材）
+            if any(part.startswith(".") for part in p.relative_to(asset_dir).parts[:-1]):
+                continue
             if p.is_file() and p.suffix.lower() in exts:
                 out.append(p)
         except Exception:
@@ -76,8 +88,8 @@ def _build_segments(*, audio_dur: float, assets: list[Path], cut_min: float, cut
     if not assets:
         return []
 
-    # 缓存素材时长，避免重复探测
-    dur_map: dict[Path, float] = {}
+    # 缓存素材时长，避免重复探测（V45.6：一次性批量查共享缓存，未命中并发探测）
+    dur_map: dict[Path, float] = {p: info.duration for p, info in probe_many(assets).items()}
 
     segs: list[Segment] = []
     t = 0.0
@@ -90,12 +102,8 @@ def _build_segments(*, audio_dur: float, assets: list[Path], cut_min: float, cut
             dur = max(0.6, rem)
 
         src = random.choice(assets)
-        if src not in dur_map:
-            try:
-                dur_map[src] = _ffprobe_duration_seconds(src)
-            except Exception:
-                dur_map[src] = 0.0
-        sd = dur_map[src]
+        # 批量探测失败的素材视为 0 秒（与旧版异常兜底一致）
+        sd = dur_map.get(src, 0.0)
         if sd < dur + 0.8:
             # 换一个更长的素材
             continue